@@ -1,20 +1,27 @@
 import streamlit as st
+import streamlit.components.v1 as components
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 import sqlite3
 import json
-import plotly.graph_objects as go
-import plotly.express as px
-from datetime import datetime, timedelta, date
-import pandas as pd
+from datetime import datetime, timedelta, date, timezone
 import random
 import base64
 import io
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
-from reportlab.lib.enums import TA_CENTER, TA_LEFT
 import time
+import bisect
+import threading
+import hashlib
+import inspect
+import copy
+import functools
+import os
+import re
+import queue
+import secrets
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
 
 st.set_page_config(
     page_title="MedTimer - Medication Management",
@@ -23,9 +30,119 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
-def init_database():
+def start_rerun_profile():
+    """Start timing a rerun on this script thread; background threads never have a profile"""
+    profile = {'started': time.perf_counter(), 'functions': {}, 'stack': []}
+    threading.current_thread().medtimer_profile = profile
+    return profile
+
+def count_rendered_widgets():
+    """Count the widgets registered so far in this run, or None where the Streamlit release hides it"""
+    ctx = get_script_run_ctx()
+    # Newer releases keep the run's widget ids on a shared state object, as a thread-safe set
+    widget_ids = getattr(getattr(ctx, 'shared', ctx), 'widget_ids_this_run', None)
+    if hasattr(widget_ids, 'snapshot'):
+        widget_ids = widget_ids.snapshot()
+    return len(widget_ids) if widget_ids is not None else None
+
+def finish_rerun_profile(mode, section=None):
+    """Stop timing this thread's rerun and add it to the session's ring buffer of recent reruns"""
+    thread = threading.current_thread()
+    profile = getattr(thread, 'medtimer_profile', None) or start_rerun_profile()
+    thread.medtimer_profile = None
+    
+    categories = {}
+    for stats in profile['functions'].values():
+        categories[stats['category']] = categories.get(stats['category'], 0.0) + stats['self_ms']
+    record = {
+        'at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'mode': mode,
+        'section': section,
+        'ms': (time.perf_counter() - profile['started']) * 1000,
+        'widgets': count_rendered_widgets(),
+        'categories': categories,
+        'functions': profile['functions']
+    }
+    st.session_state.render_timings.append(record)
+    return record
+
+def profiled(category):
+    """Time each call into the current rerun's profile; nested calls count only toward their own category"""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profile = getattr(threading.current_thread(), 'medtimer_profile', None)
+            # A fragment rerunning by itself is not inside a profiled tab, so it is a rerun of its own
+            standalone = category == 'fragment' and not (profile and profile['stack'])
+            if standalone:
+                profile = start_rerun_profile()
+            if profile is None:
+                return func(*args, **kwargs)
+            
+            profile['stack'].append(0.0)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                child_ms = profile['stack'].pop()
+                if profile['stack']:
+                    profile['stack'][-1] += elapsed_ms
+                stats = profile['functions'].setdefault(func.__name__, {'category': category, 'calls': 0, 'ms': 0.0, 'self_ms': 0.0})
+                stats['calls'] += 1
+                stats['ms'] += elapsed_ms
+                stats['self_ms'] += elapsed_ms - child_ms
+                if standalone:
+                    finish_rerun_profile('Fragment', func.__name__)
+        return wrapper
+    return decorate
+
+def add_missing_column(c, table, column, definition):
+    """Add a column to an existing table if an older database does not have it yet, returning whether it was added"""
+    c.execute(f'PRAGMA table_info({table})')
+    if column in [row[1] for row in c.fetchall()]:
+        return False
+    c.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+    return True
+
+# Bumped by each entry in migrate_database; stored in the file as PRAGMA user_version
+SCHEMA_VERSION = 1
+
+def migrate_database(conn):
+    """Bring an older database up to SCHEMA_VERSION, applying each pending migration once in a single transaction"""
+    c = conn.cursor()
+    version = c.execute('PRAGMA user_version').fetchone()[0]
+    if version >= SCHEMA_VERSION:
+        return
+    
+    conn.commit()
+    c.execute('BEGIN IMMEDIATE')
+    try:
+        # 1: history timestamps on the user's clock; new databases create the column with no rows to move
+        if version < 1 and add_missing_column(c, 'medication_history', 'utc_offset_minutes', 'INTEGER'):
+            # Older rows hold the server's clock (UTC for missed doses); move them to the user's local time
+            server_offset = int(datetime.now().astimezone().utcoffset().total_seconds() // 60)
+            c.execute('''UPDATE medication_history
+                         SET utc_offset_minutes = COALESCE((SELECT u.utc_offset_minutes FROM user_day_state u
+                                                            WHERE u.username = medication_history.username), ?)''',
+                      (server_offset,))
+            c.execute('''UPDATE medication_history
+                         SET timestamp = datetime(timestamp, printf('%+d minutes',
+                                         utc_offset_minutes - CASE WHEN action = 'missed' THEN 0 ELSE ? END))
+                         WHERE datetime(timestamp) IS NOT NULL''',
+                      (server_offset,))
+        c.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+@profiled('db')
+def init_database(conn=None):
     """Initialize SQLite database with all tables"""
-    conn = sqlite3.connect('medtimer.db', check_same_thread=False)
+    close_conn = conn is None
+    if conn is None:
+        conn = sqlite3.connect('medtimer.db', check_same_thread=False)
     c = conn.cursor()
     
     c.execute('''CREATE TABLE IF NOT EXISTS users
@@ -61,6 +178,7 @@ def init_database():
                   instructions TEXT,
                   taken_today INTEGER,
                   created_at TEXT,
+                  reminder_times TEXT,
                   FOREIGN KEY(username) REFERENCES users(username))''')
     
     c.execute('''CREATE TABLE IF NOT EXISTS appointments
@@ -94,6 +212,8 @@ def init_database():
                   action TEXT,
                   timestamp TEXT,
                   date TEXT,
+                  slot_time TEXT,
+                  utc_offset_minutes INTEGER,
                   FOREIGN KEY(username) REFERENCES users(username))''')
     
     c.execute('''CREATE TABLE IF NOT EXISTS adherence_history
@@ -112,6 +232,11 @@ def init_database():
                   connected_at TEXT,
                   FOREIGN KEY(caregiver_username) REFERENCES users(username))''')
     
+    c.execute('''CREATE TABLE IF NOT EXISTS patient_access_codes
+                 (username TEXT PRIMARY KEY,
+                  access_code TEXT UNIQUE,
+                  FOREIGN KEY(username) REFERENCES users(username))''')
+    
     c.execute('''CREATE TABLE IF NOT EXISTS reminders
                  (id INTEGER PRIMARY KEY AUTOINCREMENT,
                   username TEXT,
@@ -121,13 +246,85 @@ def init_database():
                   created_at TEXT,
                   FOREIGN KEY(username) REFERENCES users(username))''')
     
+    # One row per scheduled dose, rewritten with the medications on every save
+    c.execute('''CREATE TABLE IF NOT EXISTS medication_slots
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  username TEXT,
+                  medication_id INTEGER,
+                  slot_time TEXT,
+                  slot_minute INTEGER,
+                  FOREIGN KEY(username) REFERENCES users(username))''')
+    
+    # The day each user currently has open, closed by the midnight rollover
+    c.execute('''CREATE TABLE IF NOT EXISTS user_day_state
+                 (username TEXT PRIMARY KEY,
+                  utc_offset_minutes INTEGER DEFAULT 0,
+                  open_date TEXT,
+                  FOREIGN KEY(username) REFERENCES users(username))''')
+    
+    # One row per badge a user has earned; unlocks are kept even if the condition later stops holding
+    c.execute('''CREATE TABLE IF NOT EXISTS achievement_unlocks
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  username TEXT,
+                  achievement_id TEXT,
+                  unlocked_at TEXT,
+                  UNIQUE (username, achievement_id),
+                  FOREIGN KEY(username) REFERENCES users(username))''')
+    
+    add_missing_column(c, 'medications', 'reminder_times', 'TEXT')
+    add_missing_column(c, 'medication_history', 'slot_time', 'TEXT')
+    migrate_database(conn)
+    # Snooze and escalation state for one dose slot on one day
+    add_missing_column(c, 'reminders', 'date', 'TEXT')
+    add_missing_column(c, 'reminders', 'due_at', 'INTEGER')
+    add_missing_column(c, 'reminders', 'fired_at', 'TEXT')
+    add_missing_column(c, 'reminders', 'ignored_count', 'INTEGER DEFAULT 0')
+    add_missing_column(c, 'reminders', 'escalated_at', 'TEXT')
+    add_missing_column(c, 'reminders', 'snoozed', 'INTEGER DEFAULT 0')
+    
+    c.execute('CREATE INDEX IF NOT EXISTS idx_medication_slots_user ON medication_slots (username, medication_id)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_medication_slots_minute ON medication_slots (slot_minute, username, medication_id, slot_time)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_medication_history_user_date ON medication_history (username, date, medication_id, slot_time)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_adherence_history_user_date ON adherence_history (username, date)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_connected_patients_caregiver ON connected_patients (caregiver_username, patient_username)')
+    c.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_reminders_dose ON reminders (username, medication_id, reminder_time, date)')
+    
     conn.commit()
-    conn.close()
+    if close_conn:
+        conn.close()
 
+@profiled('db')
 def get_db_connection():
     """Get database connection"""
     return sqlite3.connect('medtimer.db', check_same_thread=False)
 
+def get_user_utc_offset():
+    """Get the user's UTC offset in minutes from the browser, falling back to the server clock"""
+    try:
+        browser_offset = st.context.timezone_offset
+    except Exception:
+        browser_offset = None
+    if browser_offset is not None:
+        # The browser reports minutes behind UTC, so the sign is flipped
+        return -int(browser_offset)
+    return int(datetime.now().astimezone().utcoffset().total_seconds() // 60)
+
+def get_local_time(utc_offset_minutes):
+    """Get the current wall-clock time for a user at the given UTC offset"""
+    return datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(minutes=utc_offset_minutes)
+
+def get_local_date(utc_offset_minutes):
+    """Get today's date string for a user at the given UTC offset"""
+    return get_local_time(utc_offset_minutes).strftime("%Y-%m-%d")
+
+def get_session_local_time():
+    """Get the current wall-clock time in the logged-in user's timezone"""
+    return get_local_time(st.session_state.get('utc_offset_minutes', get_user_utc_offset()))
+
+def get_session_local_date():
+    """Get today's date string in the logged-in user's timezone"""
+    return get_session_local_time().strftime("%Y-%m-%d")
+
 def get_age_category(age):
     """Determine age category based on age"""
     if age < 18:
@@ -181,6 +378,14 @@ def format_time(time_str):
     except:
         return time_str
 
+def time_to_minutes(time_str):
+    """Convert an HH:MM time string to minutes after midnight"""
+    try:
+        hours, minutes = time_str.split(':')
+        return int(hours) * 60 + int(minutes)
+    except (AttributeError, ValueError):
+        return None
+
 def get_custom_medication_times(frequency):
     """Get default custom medication times based on frequency"""
     frequency_map = {
@@ -197,45 +402,124 @@ def get_custom_medication_times(frequency):
     }
     return frequency_map.get(frequency, ['09:00'])
 
+def get_tone_presets():
+    """Tone presets per age category: (frequency Hz, milliseconds) notes, with 0 Hz for a pause"""
+    return {
+        'youth': {
+            'reminder': {'notes': [(1047, 120), (1319, 120), (1568, 160), (0, 250)], 'gain_db': -8},
+            'notification': {'notes': [(1319, 90), (1568, 140)], 'gain_db': -10}
+        },
+        'adult': {
+            'reminder': {'notes': [(880, 180), (1175, 260), (0, 300)], 'gain_db': -8},
+            'notification': {'notes': [(988, 150)], 'gain_db': -10}
+        },
+        # Lower, longer and louder notes, since high frequencies are the first to fade with age
+        'senior': {
+            'reminder': {'notes': [(523, 350), (659, 350), (0, 150), (523, 350), (659, 450), (0, 350)], 'gain_db': -3},
+            'notification': {'notes': [(587, 250), (784, 300)], 'gain_db': -5}
+        }
+    }
+
+@st.cache_data(max_entries=16)
+def render_tone(age_category='adult', sound='reminder', sample_rate=8000):
+    """Synthesize a preset tone and encode it compactly, returning (bytes, mime type)"""
+    from pydub import AudioSegment
+    from pydub.generators import Sine
+    
+    preset = get_tone_presets().get(age_category, get_tone_presets()['adult'])[sound]
+    tone = AudioSegment.silent(duration=0, frame_rate=sample_rate)
+    for frequency, duration in preset['notes']:
+        if frequency:
+            note = Sine(frequency, sample_rate=sample_rate).to_audio_segment(duration=duration, volume=preset['gain_db'])
+            tone += note.fade_in(10).fade_out(min(60, duration // 3))
+        else:
+            tone += AudioSegment.silent(duration=duration, frame_rate=sample_rate)
+    tone = tone.set_channels(1)
+    
+    # Opus and MP3 need ffmpeg; 8-bit mono WAV needs nothing and stays small for short tones
+    for audio_format, mime_type, options in (('ogg', 'audio/ogg', {'codec': 'libopus', 'bitrate': '24k'}),
+                                             ('mp3', 'audio/mpeg', {'bitrate': '32k'})):
+        try:
+            buffer = io.BytesIO()
+            tone.export(buffer, format=audio_format, **options)
+            return buffer.getvalue(), mime_type
+        except Exception:
+            continue
+    buffer = io.BytesIO()
+    tone.set_sample_width(1).export(buffer, format='wav')
+    return buffer.getvalue(), 'audio/wav'
+
+@st.cache_resource
+def get_tone_url(age_category, sound):
+    """Get a preset tone as a data URI, encoded once per server"""
+    # Not a static file: Streamlit 1.50 serves static audio as text/plain with nosniff, which browsers won't play,
+    # and the tones are only a few KB
+    data, mime_type = render_tone(age_category, sound)
+    return f"data:{mime_type};base64,{base64.b64encode(data).decode()}"
+
+def get_session_age_category():
+    """Get the logged-in user's age category"""
+    return get_age_category((st.session_state.get('user_profile') or {}).get('age', 25))
+
+@profiled('media')
 def play_reminder_sound():
     """Play reminder sound using HTML audio"""
-    audio_html = """
+    audio_html = f"""
     <audio id="reminderSound" autoplay loop>
-        <source src="https://assets.mixkit.co/active_storage/sfx/2869/2869-preview.mp3" type="audio/mpeg">
+        <source src="{get_tone_url(get_session_age_category(), 'reminder')}">
     </audio>
     <script>
         var audio = document.getElementById('reminderSound');
         audio.volume = 0.7;
-        audio.play().catch(function(error) {
+        audio.play().catch(function(error) {{
             console.log('Audio play failed:', error);
-        });
-        setTimeout(function() {
+        }});
+        setTimeout(function() {{
             audio.pause();
             audio.currentTime = 0;
-        }, 10000);
+        }}, 10000);
     </script>
     """
     st.markdown(audio_html, unsafe_allow_html=True)
 
+@profiled('media')
 def play_notification_sound():
     """Play notification sound for reminders"""
-    audio_html = """
+    audio_html = f"""
     <audio id="notificationSound" autoplay>
-        <source src="https://assets.mixkit.co/active_storage/sfx/2869/2869-preview.mp3" type="audio/mpeg">
+        <source src="{get_tone_url(get_session_age_category(), 'notification')}">
     </audio>
     <script>
         var audio = document.getElementById('notificationSound');
         audio.volume = 0.6;
-        audio.play().catch(function(error) {
+        audio.play().catch(function(error) {{
             console.log('Audio play failed:', error);
-        });
+        }});
     </script>
     """
     st.markdown(audio_html, unsafe_allow_html=True)
 
+def benchmark_reminder_tones(repeats=100):
+    """Measure each tone's encoded size and synthesis time against a cached lookup"""
+    render_tone.clear()
+    result = {}
+    for age_category in get_tone_presets():
+        for sound in ('reminder', 'notification'):
+            started = time.perf_counter()
+            data, mime_type = render_tone(age_category, sound)
+            result[f"{age_category}_{sound}"] = {'bytes': len(data), 'mime_type': mime_type,
+                                                 'synthesis_ms': (time.perf_counter() - started) * 1000}
+    
+    started = time.perf_counter()
+    for _ in range(repeats):
+        render_tone('senior', 'reminder')
+    result['cached_ms'] = (time.perf_counter() - started) * 1000 / repeats
+    return result
+
 def categorize_medications_by_status():
     """Categorize medications into missed, upcoming, and taken"""
-    now = datetime.now()
+    # Slot times are the user's wall-clock times, so they are compared with the user's clock, not the server's
+    now = get_session_local_time()
     current_time = now.strftime("%H:%M")
     
     missed = []
@@ -245,13 +529,13 @@ def categorize_medications_by_status():
     for med in st.session_state.medications:
         med_time = med.get('time', '00:00')
         
-        # Track which time slots have been taken
-        taken_time_slots = med.get('taken_time_slots', [])
+        # Track which time slots have been taken or skipped
+        resolved_slots = get_resolved_slots(med)
         
         if med.get('reminder_times'):
             for time_slot in med['reminder_times']:
-                if time_slot in taken_time_slots:
-                    # This specific time slot has been taken
+                if time_slot in resolved_slots:
+                    # This specific time slot has been taken or skipped
                     continue
                 elif time_slot < current_time:
                     # Missed this time slot
@@ -279,7 +563,7 @@ def categorize_medications_by_status():
         # Handle the main medication time
         if med.get('taken_today', False):
             taken.append(med)
-        elif med_time < current_time and med_time not in taken_time_slots:
+        elif med_time < current_time and med_time not in resolved_slots:
             # Missed main time and not taken yet
             if not any(m['id'] == med['id'] and m['time'] == med_time for m in missed):
                 missed.append({
@@ -290,7 +574,7 @@ def categorize_medications_by_status():
                     'color': med.get('color', 'blue'),
                     'unique_key': f"{med['id']}_{med_time.replace(':', '')}"
                 })
-        elif med_time > current_time and med_time not in taken_time_slots:
+        elif med_time > current_time and med_time not in resolved_slots:
             # Upcoming main time and not taken yet
             if not any(m['id'] == med['id'] and m['time'] == med_time for m in upcoming):
                 upcoming.append({
@@ -387,6 +671,7 @@ def get_mascot_message(adherence, time_of_day):
 
 def update_mascot_mood(adherence):
     """Update mascot mood based on adherence"""
+    previous_mood = st.session_state.turtle_mood
     if adherence >= 90:
         st.session_state.turtle_mood = 'excited'
     elif adherence >= 70:
@@ -395,15 +680,18 @@ def update_mascot_mood(adherence):
         st.session_state.turtle_mood = 'neutral'
     else:
         st.session_state.turtle_mood = 'worried'
+    
+    # The first mood after login counts too, since it may match the default mood and not register as a change
+    if st.session_state.turtle_mood != previous_mood or not st.session_state.get('mood_checked'):
+        st.session_state.mood_checked = True
+        publish_achievement_event('mood_changed')
 
 def check_upcoming_reminders(upcoming_meds):
     """Check for upcoming medications and show reminders"""
-    now = datetime.now()
-    current_time = now.strftime("%H:%M")
+    now = get_session_local_time()
     
     for med in upcoming_meds[:3]:
-        med_time = datetime.strptime(med['time'], "%H:%M")
-        time_diff = (med_time - now).total_seconds() / 60
+        time_diff = time_to_minutes(med['time']) - (now.hour * 60 + now.minute)
         
         if 0 < time_diff <= 30:
             st.warning(f"⏰ **Upcoming Reminder:** {med['name']} ({med['dosageAmount']}) at {med['time']} - Take in {int(time_diff)} minutes!")
@@ -412,16 +700,16 @@ def check_upcoming_reminders(upcoming_meds):
 
 def check_due_medications(medications):
     """Check for medications that are due now and trigger reminders"""
-    now = datetime.now()
+    now = get_session_local_time()
     current_time = now.strftime("%H:%M")
     
     due_medications = []
     for med in medications:
-        taken_time_slots = med.get('taken_time_slots', [])
+        resolved_slots = get_resolved_slots(med)
         med_time = med.get('time', '00:00')
         
         # Check main medication time
-        if med_time not in taken_time_slots:
+        if med_time not in resolved_slots:
             med_datetime = datetime.strptime(med_time, "%H:%M").replace(
                 year=now.year, month=now.month, day=now.day
             )
@@ -433,7 +721,7 @@ def check_due_medications(medications):
         # Check reminder times
         if med.get('reminder_times'):
             for reminder_time in med['reminder_times']:
-                if reminder_time not in taken_time_slots:
+                if reminder_time not in resolved_slots:
                     reminder_datetime = datetime.strptime(reminder_time, "%H:%M").replace(
                         year=now.year, month=now.month, day=now.day
                     )
@@ -446,13 +734,111 @@ def check_due_medications(medications):
     return due_medications
 
 def calculate_adherence(medications):
-    """Calculate medication adherence percentage"""
+    """Calculate today's adherence as the percentage of scheduled dose slots taken"""
     if not medications:
         return 0
-    taken = sum(1 for med in medications if med.get('taken_today', False))
-    total = len(medications)
+    today_status = st.session_state.get('dose_status', {}).get(get_session_local_date(), {})
+    total = 0
+    taken = 0
+    for med in medications:
+        for slot in get_medication_slots(med):
+            total += 1
+            if today_status.get((med['id'], slot)) == 'taken':
+                taken += 1
     return (taken / total * 100) if total > 0 else 0
 
+def build_adherence_stats(adherence_history, through_date, streak_threshold=100):
+    """Build rolling adherence and streak state from every finished day up to through_date"""
+    import pandas as pd
+    import numpy as np
+    
+    stats = {
+        'last_date': None,
+        'values': np.zeros(64),
+        'prefix': np.zeros(65),
+        'length': 0,
+        'current_streak': 0,
+        'longest_streak': 0,
+        'streak_threshold': streak_threshold
+    }
+    by_date = {h['date']: h['adherence'] for h in adherence_history if h['date'] <= through_date}
+    if not by_date:
+        return stats
+    
+    # One slot per recorded day; a day with nothing scheduled has no record, so it neither breaks a streak nor counts as 0%
+    values = pd.Series(by_date, dtype=float).sort_index().to_numpy()
+    length = len(values)
+    
+    capacity = max(64, 2 * length)
+    stats['values'] = np.zeros(capacity)
+    stats['values'][:length] = values
+    stats['prefix'] = np.zeros(capacity + 1)
+    stats['prefix'][1:length + 1] = np.cumsum(values)
+    stats['length'] = length
+    stats['last_date'] = through_date
+    
+    # Run lengths of consecutive streak days from the edges of the boolean mask
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], (values >= streak_threshold).astype(int), [0]))))
+    runs = edges[1::2] - edges[::2]
+    if len(runs):
+        stats['longest_streak'] = int(runs.max())
+        stats['current_streak'] = int(runs[-1]) if values[-1] >= streak_threshold else 0
+    return stats
+
+def append_adherence_day(stats, adherence):
+    """Append one finished day to the adherence state without rescanning history"""
+    import numpy as np
+    
+    length = stats['length']
+    if length == len(stats['values']):
+        stats['values'] = np.concatenate((stats['values'], np.zeros(length)))
+        stats['prefix'] = np.concatenate((stats['prefix'], np.zeros(length)))
+    
+    stats['values'][length] = adherence
+    stats['prefix'][length + 1] = stats['prefix'][length] + adherence
+    stats['length'] = length + 1
+    
+    if adherence >= stats['streak_threshold']:
+        stats['current_streak'] += 1
+        stats['longest_streak'] = max(stats['longest_streak'], stats['current_streak'])
+    else:
+        stats['current_streak'] = 0
+
+def get_rolling_adherence(stats, window_days):
+    """Get average adherence over the last window_days logged days, or None before the first one"""
+    length = stats['length']
+    if length == 0:
+        return None
+    window = min(window_days, length)
+    return (stats['prefix'][length] - stats['prefix'][length - window]) / window
+
+@profiled('db')
+def sync_adherence_stats():
+    """Bring the session's adherence state up to yesterday, appending only days finished since the last sync"""
+    open_date = st.session_state.get('open_date') or get_session_local_date()
+    through_date = (datetime.strptime(open_date, "%Y-%m-%d") - timedelta(days=1)).strftime("%Y-%m-%d")
+    stats = st.session_state.get('adherence_stats')
+    previous_longest = stats['longest_streak'] if stats else None
+    
+    if stats is None or stats['last_date'] is None:
+        stats = build_adherence_stats(st.session_state.adherence_history, through_date)
+    elif stats['last_date'] < through_date:
+        # The history is ordered by date, so only its tail past the last sync is read
+        new_days = []
+        for h in reversed(st.session_state.adherence_history):
+            if h['date'] <= stats['last_date']:
+                break
+            if h['date'] <= through_date:
+                new_days.append(h['adherence'])
+        for adherence in reversed(new_days):
+            append_adherence_day(stats, adherence)
+        stats['last_date'] = through_date
+    
+    st.session_state.adherence_stats = stats
+    if previous_longest != stats['longest_streak']:
+        publish_achievement_event('streak_updated')
+    return stats
+
 def get_mascot_image(mood):
     mascot_images = {
         'happy': '💪',
@@ -462,6 +848,63 @@ def get_mascot_image(mood):
     }
     return mascot_images.get(mood, '🐢')
 
+def get_mascot_image_files():
+    """Image file shown for each mascot mood; moods without one keep their emoji"""
+    return {'excited': 'celebration.png', 'happy': 'happy.png', 'worried': 'worried.png'}
+
+@st.cache_data(max_entries=64)
+def render_image_variant(file_name, width, image_format='WEBP', modified_at=None):
+    """Resize a bundled image to a display width and encode it compactly; modified_at keys the cache to the file's version"""
+    from PIL import Image
+    
+    with Image.open(os.path.join(os.path.dirname(os.path.abspath(__file__)), file_name)) as image:
+        image = image.convert('RGBA')
+        image.thumbnail((width, width * 4), Image.LANCZOS)
+        buffer = io.BytesIO()
+        if image_format == 'WEBP':
+            image.save(buffer, 'WEBP', quality=80, method=4)
+        else:
+            # A 256-colour palette keeps PNG fallbacks close to WebP size
+            image.quantize(256, method=Image.Quantize.FASTOCTREE).save(buffer, 'PNG', optimize=True)
+    return buffer.getvalue()
+
+@st.cache_resource
+def get_image_variant_url(file_name, width, image_format='WEBP', modified_at=None):
+    """Get a URL for an image variant: a static file when static serving is on, otherwise a data URI; modified_at keys the cache to the file's version"""
+    data = render_image_variant(file_name, width, image_format, modified_at)
+    extension = image_format.lower()
+    url = publish_static_asset(f"{os.path.splitext(file_name)[0]}-{width}", data, extension)
+    return url or f"data:image/{extension};base64,{base64.b64encode(data).decode()}"
+
+@profiled('media')
+def get_mascot_html(mood, size):
+    """Mascot markup at a display size in pixels: a WebP/PNG picture when the mood has an image, otherwise its emoji"""
+    file_name = get_mascot_image_files().get(mood)
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), file_name or '')
+    if not file_name or not os.path.exists(path):
+        return f'<div style="font-size: {size}px;">{get_mascot_image(mood)}</div>'
+    
+    # 1x and 2x variants keep the mascot sharp on high-density screens without sending the full-size file
+    modified_at = os.path.getmtime(path)
+    webp = ', '.join(f"{get_image_variant_url(file_name, size * scale, 'WEBP', modified_at)} {scale}x" for scale in (1, 2))
+    png = get_image_variant_url(file_name, size, 'PNG', modified_at)
+    return (f'<picture><source type="image/webp" srcset="{webp}">'
+            f'<img src="{png}" alt="{mood} mascot" style="height: {size}px; width: auto;"></picture>')
+
+def benchmark_image_variants(widths=(48, 120, 240)):
+    """Compare the bundled PNG sizes with their resized WebP and PNG variants"""
+    result = {}
+    for file_name in ('celebration.png', 'happy.png', 'worried.png', 'logo.png'):
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), file_name)
+        variants = {'original': os.path.getsize(path)}
+        for width in widths:
+            started = time.perf_counter()
+            variants[f"webp_{width}"] = len(render_image_variant(file_name, width, 'WEBP', os.path.getmtime(path)))
+            variants[f"encode_ms_{width}"] = (time.perf_counter() - started) * 1000
+            variants[f"png_{width}"] = len(render_image_variant(file_name, width, 'PNG', os.path.getmtime(path)))
+        result[file_name] = variants
+    return result
+
 def get_severity_color(severity):
     """Get color for severity level"""
     colors = {'Mild': '#10b981', 'Moderate': '#f59e0b', 'Severe': '#ef4444'}
@@ -501,7 +944,7 @@ def days_until(date_str):
 
 def get_time_of_day():
     """Get current time of day greeting"""
-    hour = datetime.now().hour
+    hour = get_session_local_time().hour
     if hour < 12:
         return "Good Morning"
     elif hour < 18:
@@ -509,18 +952,85 @@ def get_time_of_day():
     else:
         return "Good Evening"
 
-def check_medication_conflicts(medications, new_medication):
+def get_medication_slots(med):
+    """Get the sorted list of scheduled dose times for a medication"""
+    slots = med.get('reminder_times') or [med.get('time', '00:00')]
+    return sorted(set(slots))
+
+def find_schedule_conflicts(medications, window_minutes=30):
+    """Find every pair of dose slots from different medications scheduled within the window"""
+    slots = []
+    for index, med in enumerate(medications):
+        for slot in get_medication_slots(med):
+            minutes = time_to_minutes(slot)
+            if minutes is not None:
+                slots.append((minutes, index, slot))
+    slots.sort()
+    
+    # Wrap the earliest slots past midnight so 23:50 and 00:10 are compared too
+    count = len(slots)
+    wrapped = slots + [(minutes + 1440, index, slot) for minutes, index, slot in slots if minutes < window_minutes]
+    
+    conflicts = []
+    for i in range(count):
+        minutes, index, slot = wrapped[i]
+        j = i + 1
+        while j < len(wrapped) and wrapped[j][0] - minutes < window_minutes:
+            other_minutes, other_index, other_slot = wrapped[j]
+            if j >= count and j - count >= i:
+                break
+            if other_index != index:
+                conflicts.append({
+                    'first_index': index,
+                    'first': medications[index].get('name', ''),
+                    'first_time': slot,
+                    'second_index': other_index,
+                    'second': medications[other_index].get('name', ''),
+                    'second_time': other_slot,
+                    'gap_minutes': other_minutes - minutes
+                })
+            j += 1
+    return conflicts
+
+def suggest_conflict_free_slots(medications, preferred_time, window_minutes=30, count=3, step_minutes=5):
+    """Suggest the nearest dose times that are at least the window away from every scheduled slot"""
+    preferred = time_to_minutes(preferred_time)
+    if preferred is None:
+        return []
+    
+    occupied = sorted({time_to_minutes(slot) for med in medications for slot in get_medication_slots(med)} - {None})
+    
+    def circular_distance(a, b):
+        diff = abs(a - b) % 1440
+        return min(diff, 1440 - diff)
+    
+    def is_free(minutes):
+        if not occupied:
+            return True
+        # Only the neighbours on either side of the insertion point can be within the window
+        position = bisect.bisect_left(occupied, minutes)
+        neighbours = (occupied[position % len(occupied)], occupied[position - 1])
+        return all(circular_distance(minutes, other) >= window_minutes for other in neighbours)
+    
+    candidates = [m for m in range(0, 1440, step_minutes) if is_free(m)]
+    candidates.sort(key=lambda m: (circular_distance(m, preferred), m))
+    return [f"{m // 60:02d}:{m % 60:02d}" for m in candidates[:count]]
+
+def check_medication_conflicts(medications, new_medication, window_minutes=30):
     """Check for potential medication time conflicts"""
+    all_medications = list(medications) + [new_medication]
+    new_index = len(all_medications) - 1
+    
     conflicts = []
-    new_time = new_medication.get('time', '00:00')
-    for med in medications:
-        med_time = med.get('time', '00:00')
-        time_diff = abs(
-            datetime.strptime(new_time, "%H:%M") - 
-            datetime.strptime(med_time, "%H:%M")
-        )
-        if time_diff.total_seconds() < 1800:
-            conflicts.append(med['name'])
+    for conflict in find_schedule_conflicts(all_medications, window_minutes):
+        if conflict['first_index'] == new_index:
+            name = conflict['second']
+        elif conflict['second_index'] == new_index:
+            name = conflict['first']
+        else:
+            continue
+        if name not in conflicts:
+            conflicts.append(name)
     return conflicts
 
 def generate_patient_code():
@@ -542,7 +1052,9 @@ def initialize_session_state():
     if 'turtle_mood' not in st.session_state:
         st.session_state.turtle_mood = 'happy'
     if 'achievements' not in st.session_state:
-        st.session_state.achievements = []
+        st.session_state.achievements = {}
+    if 'new_achievements' not in st.session_state:
+        st.session_state.new_achievements = []
     if 'signup_step' not in st.session_state:
         st.session_state.signup_step = 1
     if 'signup_data' not in st.session_state:
@@ -565,12 +1077,30 @@ def initialize_session_state():
         st.session_state.undo_stack = []
     if 'last_action' not in st.session_state:
         st.session_state.last_action = None
+    if 'open_date' not in st.session_state:
+        st.session_state.open_date = None
+    if 'dose_status' not in st.session_state:
+        st.session_state.dose_status = {}
+    if 'history_version' not in st.session_state:
+        st.session_state.history_version = 0
+    if 'adherence_stats' not in st.session_state:
+        st.session_state.adherence_stats = None
+    if 'dashboard_section' not in st.session_state:
+        st.session_state.dashboard_section = 'dashboard'
+    if 'render_timings' not in st.session_state:
+        # A ring buffer of this session's recent rerun profiles
+        st.session_state.render_timings = deque(maxlen=50)
+    if 'rendered_fragments' not in st.session_state:
+        st.session_state.rendered_fragments = set()
+    if 'sort_indices' not in st.session_state:
+        st.session_state.sort_indices = {}
     
     # NEW: Initialize taken_time_slots for all existing medications
     for med in st.session_state.medications:
         if 'taken_time_slots' not in med:
             med['taken_time_slots'] = []
 
+@profiled('db')
 def save_user_data():
     """Save user data to SQLite database"""
     if not st.session_state.user_profile:
@@ -602,18 +1132,34 @@ def save_user_data():
             c.execute('INSERT INTO diseases (username, name, type, notes) VALUES (?, ?, ?, ?)',
                      (username, disease.get('name'), disease.get('type'), disease.get('notes', '')))
         
+        # Keep medication ids stable across saves so history and slot rows keep pointing at them
+        c.execute('SELECT id FROM medications WHERE username = ?', (username,))
+        own_ids = {row[0] for row in c.fetchall()}
         c.execute('DELETE FROM medications WHERE username = ?', (username,))
+        c.execute('DELETE FROM medication_slots WHERE username = ?', (username,))
+        saved_ids = set()
         for med in st.session_state.medications:
-            # Serialize taken_time_slots to JSON string for storage
-            taken_slots_json = json.dumps(med.get('taken_time_slots', []))
+            med_id = med.get('id') if med.get('id') in own_ids and med.get('id') not in saved_ids else None
+            reminder_times_json = json.dumps(med['reminder_times']) if med.get('reminder_times') else None
             
             c.execute('''INSERT INTO medications 
-                         (username, name, dosage_type, dosage_amount, frequency, time, color, instructions, taken_today, created_at)
-                         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                     (username, med.get('name'), med.get('dosageType'), med.get('dosageAmount'),
+                         (id, username, name, dosage_type, dosage_amount, frequency, time, color, instructions, taken_today, created_at, reminder_times)
+                         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                     (med_id, username, med.get('name'), med.get('dosageType'), med.get('dosageAmount'),
                       med.get('frequency'), med.get('time'), med.get('color'),
                       med.get('instructions', ''), int(med.get('taken_today', False)),
-                      med.get('created_at', datetime.now().strftime("%Y-%m-%d %H:%M:%S"))))
+                      med.get('created_at', datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
+                      reminder_times_json))
+            if med_id is None:
+                med['id'] = c.lastrowid
+            saved_ids.add(med['id'])
+            
+            c.executemany('INSERT INTO medication_slots (username, medication_id, slot_time, slot_minute) VALUES (?, ?, ?, ?)',
+                          [(username, med['id'], slot, time_to_minutes(slot)) for slot in get_medication_slots(med)])
+        
+        utc_offset = st.session_state.get('utc_offset_minutes', get_user_utc_offset())
+        c.execute('INSERT OR IGNORE INTO user_day_state (username, utc_offset_minutes, open_date) VALUES (?, ?, ?)',
+                  (username, utc_offset, get_local_date(utc_offset)))
         
         c.execute('DELETE FROM appointments WHERE username = ?', (username,))
         for appt in st.session_state.appointments:
@@ -640,6 +1186,7 @@ def save_user_data():
         st.error(f"Error saving data: {e}")
         return False
 
+@profiled('db')
 def load_user_data(username):
     """Load user data from SQLite database"""
     try:
@@ -695,6 +1242,8 @@ def load_user_data(username):
                 'created_at': med[10],
                 'taken_time_slots': []  # Initialize empty taken_time_slots
             }
+            if med[11]:
+                med_obj['reminder_times'] = json.loads(med[11])
             st.session_state.medications.append(med_obj)
         
         c.execute('SELECT * FROM appointments WHERE username = ?', (username,))
@@ -727,7 +1276,7 @@ def load_user_data(username):
                 'reported_at': effect[7]
             })
         
-        c.execute('SELECT * FROM medication_history WHERE username = ?', (username,))
+        c.execute('SELECT * FROM medication_history WHERE username = ? ORDER BY id', (username,))
         hist = c.fetchall()
         st.session_state.medication_history = []
         for h in hist:
@@ -735,10 +1284,12 @@ def load_user_data(username):
                 'medication_id': h[2],
                 'action': h[3],
                 'timestamp': h[4],
-                'date': h[5]
+                'date': h[5],
+                'slot_time': h[6],
+                'utc_offset_minutes': h[7]
             })
         
-        c.execute('SELECT * FROM adherence_history WHERE username = ?', (username,))
+        c.execute('SELECT * FROM adherence_history WHERE username = ? ORDER BY date', (username,))
         adh = c.fetchall()
         st.session_state.adherence_history = []
         for a in adh:
@@ -748,12 +1299,31 @@ def load_user_data(username):
                 'updated': a[4]
             })
         
+        c.execute('SELECT utc_offset_minutes, open_date FROM user_day_state WHERE username = ?', (username,))
+        day_state = c.fetchone()
+        if day_state:
+            st.session_state.utc_offset_minutes = day_state[0]
+            st.session_state.open_date = day_state[1]
+        else:
+            st.session_state.utc_offset_minutes = get_user_utc_offset()
+            st.session_state.open_date = get_local_date(st.session_state.utc_offset_minutes)
+        
+        st.session_state.dose_status = rebuild_dose_status(st.session_state.medication_history, st.session_state.medications)
+        st.session_state.history_version = len(st.session_state.medication_history)
+        refresh_medication_flags()
+        
+        c.execute('SELECT achievement_id, unlocked_at FROM achievement_unlocks WHERE username = ?', (username,))
+        st.session_state.achievements = {row[0]: row[1] for row in c.fetchall()}
+        
         conn.close()
+        st.session_state.mood_checked = False
+        publish_achievement_event('session_loaded')
         return True
     except Exception as e:
         st.error(f"Error loading data: {e}")
         return False
 
+@profiled('db')
 def user_exists(username):
     """Check if user exists"""
     conn = get_db_connection()
@@ -763,38 +1333,110 @@ def user_exists(username):
     conn.close()
     return result is not None
 
-def update_medication_history(medication_id, action='taken'):
+@profiled('db')
+def update_medication_history(medication_id, action='taken', slot_time=None):
     """Update medication history"""
     if not st.session_state.user_profile:
-        return
+        return None
     
     username = st.session_state.user_profile['username']
+    utc_offset = st.session_state.get('utc_offset_minutes', get_user_utc_offset())
+    # Taken-at is the user's wall-clock time, so it compares directly with the local date and slot time
+    local_now = get_local_time(utc_offset)
+    event = {
+        'medication_id': medication_id,
+        'action': action,
+        'timestamp': local_now.strftime("%Y-%m-%d %H:%M:%S"),
+        'date': local_now.strftime("%Y-%m-%d"),
+        'slot_time': slot_time,
+        'utc_offset_minutes': utc_offset
+    }
+    
     conn = get_db_connection()
     c = conn.cursor()
     
-    c.execute('''INSERT INTO medication_history (username, medication_id, action, timestamp, date)
-                 VALUES (?, ?, ?, ?, ?)''',
-             (username, medication_id, action,
-              datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-              datetime.now().strftime("%Y-%m-%d")))
+    c.execute('''INSERT INTO medication_history (username, medication_id, action, timestamp, date, slot_time, utc_offset_minutes)
+                 VALUES (?, ?, ?, ?, ?, ?, ?)''',
+             (username, medication_id, action, event['timestamp'], event['date'], slot_time, utc_offset))
     
     conn.commit()
     conn.close()
+    return event
+
+def apply_dose_event(dose_status, event, medications_by_id=None):
+    """Fold one dose event into the per-day status projection"""
+    day = dose_status.setdefault(event['date'], {})
+    
+    if event.get('slot_time'):
+        slots = [event['slot_time']]
+    else:
+        # Older history rows have no slot time and apply to every slot of the medication
+        med = (medications_by_id or {}).get(event['medication_id'])
+        slots = get_medication_slots(med) if med else []
+    
+    for slot in slots:
+        key = (event['medication_id'], slot)
+        if event['action'] == 'untaken':
+            day.pop(key, None)
+        else:
+            day[key] = event['action']
 
+def rebuild_dose_status(medication_history, medications):
+    """Replay the whole dose event log into a per-day status projection"""
+    medications_by_id = {med['id']: med for med in medications}
+    dose_status = {}
+    for event in medication_history:
+        apply_dose_event(dose_status, event, medications_by_id)
+    return dose_status
+
+def refresh_medication_flags():
+    """Derive each medication's taken and skipped slots and its taken flag from today's dose status"""
+    today_status = st.session_state.dose_status.get(get_session_local_date(), {})
+    for med in st.session_state.medications:
+        slots = get_medication_slots(med)
+        med['taken_time_slots'] = [slot for slot in slots if today_status.get((med['id'], slot)) == 'taken']
+        med['skipped_time_slots'] = [slot for slot in slots if today_status.get((med['id'], slot)) == 'skipped']
+        med['taken_today'] = len(med['taken_time_slots']) == len(slots)
+
+def get_resolved_slots(med):
+    """Slots taken or skipped today, which are no longer reported as missed, upcoming or due"""
+    return med.get('taken_time_slots', []) + med.get('skipped_time_slots', [])
+
+def get_dose_status(med):
+    """Today's status of a medication: Taken when every slot is taken, Skipped when the rest were skipped, otherwise Pending"""
+    if med.get('taken_today', False):
+        return 'Taken'
+    if med.get('skipped_time_slots') and len(get_resolved_slots(med)) == len(get_medication_slots(med)):
+        return 'Skipped'
+    return 'Pending'
+
+@profiled('db')
+def record_dose_event(medication_id, slot_time, action='taken'):
+    """Log a take, untake, skip or snooze and update the cached daily status incrementally"""
+    event = update_medication_history(medication_id, action, slot_time)
+    if event is None:
+        return
+    
+    st.session_state.medication_history.append(event)
+    apply_dose_event(st.session_state.dose_status, event)
+    st.session_state.history_version += 1
+    refresh_medication_flags()
+    
+    if action in ('taken', 'skipped'):
+        acknowledge_dose_reminder(medication_id, slot_time)
+    if action == 'taken':
+        publish_achievement_event('dose_taken')
+
+@profiled('db')
 def update_adherence_history():
     """Update daily adherence history"""
     if not st.session_state.user_profile:
         return
     
     username = st.session_state.user_profile['username']
-    today = datetime.now().strftime("%Y-%m-%d")
+    today = get_session_local_date()
     
-    if st.session_state.medications:
-        taken = sum(1 for med in st.session_state.medications if med.get('taken_today', False))
-        total = len(st.session_state.medications)
-        adherence = (taken / total * 100) if total > 0 else 0
-    else:
-        adherence = 0
+    adherence = calculate_adherence(st.session_state.medications)
     
     conn = get_db_connection()
     c = conn.cursor()
@@ -812,13 +1454,953 @@ def update_adherence_history():
     conn.commit()
     conn.close()
 
+def run_midnight_rollover(conn=None, now=None):
+    """Close out the open day for every user whose local midnight has passed, in one batch"""
+    started = time.perf_counter()
+    close_conn = conn is None
+    if conn is None:
+        conn = get_db_connection()
+    c = conn.cursor()
+    
+    now = now or datetime.now(timezone.utc)
+    now_str = now.strftime("%Y-%m-%d %H:%M:%S")
+    server_offset = int(datetime.now().astimezone().utcoffset().total_seconds() // 60)
+    
+    # Users created before the rollover existed start on their current local day
+    c.execute('''INSERT OR IGNORE INTO user_day_state (username, utc_offset_minutes, open_date)
+                 SELECT username, ?, date(?, printf('%+d minutes', ?))
+                 FROM users WHERE user_type = 'patient' ''',
+              (server_offset, now_str, server_offset))
+    
+    c.execute('DROP TABLE IF EXISTS temp.rollover_batch')
+    c.execute('''CREATE TEMP TABLE rollover_batch
+                 (username TEXT PRIMARY KEY,
+                  closing_date TEXT,
+                  new_date TEXT,
+                  utc_offset_minutes INTEGER)''')
+    c.execute('''INSERT INTO rollover_batch (username, closing_date, new_date, utc_offset_minutes)
+                 SELECT username, open_date, date(?, printf('%+d minutes', utc_offset_minutes)), utc_offset_minutes
+                 FROM user_day_state
+                 WHERE date(?, printf('%+d minutes', utc_offset_minutes)) > open_date''',
+              (now_str, now_str))
+    users_closed = c.rowcount
+    
+    # The latest event for every slot on the closing day, looked up once and shared by the steps below;
+    # older history rows have no slot time and count for every slot of the medication
+    c.execute('DROP TABLE IF EXISTS temp.rollover_slots')
+    c.execute('''CREATE TEMP TABLE rollover_slots AS
+                 SELECT s.username, s.medication_id, s.slot_time, b.closing_date, b.utc_offset_minutes,
+                        COALESCE((SELECT action FROM medication_history WHERE id =
+                                      (SELECT MAX(h.id) FROM medication_history h
+                                       WHERE h.username = s.username AND h.date = b.closing_date
+                                         AND h.medication_id = s.medication_id
+                                         AND (h.slot_time = s.slot_time OR h.slot_time IS NULL))), '') AS action
+                 FROM rollover_batch b
+                 JOIN medication_slots s ON s.username = b.username''')
+    
+    # Every slot not taken or skipped becomes a missed dose, stamped with the user's local time like other history
+    c.execute('''INSERT INTO medication_history (username, medication_id, action, timestamp, date, slot_time, utc_offset_minutes)
+                 SELECT username, medication_id, 'missed', datetime(?, printf('%+d minutes', utc_offset_minutes)),
+                        closing_date, slot_time, utc_offset_minutes
+                 FROM rollover_slots
+                 WHERE action NOT IN ('taken', 'skipped')''',
+              (now_str,))
+    missed_slots = c.rowcount
+    
+    # Adherence is weighted by dose slot, so a medication taken three times a day counts three times
+    c.execute('''DELETE FROM adherence_history WHERE id IN
+                 (SELECT a.id FROM adherence_history a
+                  JOIN rollover_batch b ON a.username = b.username AND a.date = b.closing_date)''')
+    c.execute('''INSERT INTO adherence_history (username, date, adherence, updated)
+                 SELECT username, closing_date, 100.0 * SUM(action = 'taken') / COUNT(*), ?
+                 FROM rollover_slots
+                 GROUP BY username''',
+              (datetime.now().strftime("%H:%M:%S"),))
+    c.execute('DROP TABLE temp.rollover_slots')
+    
+    c.execute('''UPDATE reminders SET acknowledged = 1
+                 WHERE acknowledged = 0 AND username IN (SELECT username FROM rollover_batch)''')
+    c.execute('''UPDATE medications SET taken_today = 0
+                 WHERE taken_today != 0 AND username IN (SELECT username FROM rollover_batch)''')
+    c.execute('''UPDATE user_day_state
+                 SET open_date = (SELECT b.new_date FROM rollover_batch b WHERE b.username = user_day_state.username)
+                 WHERE username IN (SELECT username FROM rollover_batch)''')
+    c.execute('DROP TABLE temp.rollover_batch')
+    
+    conn.commit()
+    if close_conn:
+        conn.close()
+    
+    return {
+        'users_closed': users_closed,
+        'missed_slots': missed_slots,
+        'seconds': time.perf_counter() - started
+    }
+
+def compute_dose_adherence(conn, start_date, end_date, usernames=None, on_time_minutes=None):
+    """Compute dose-weighted adherence per user and day over a date range in one query"""
+    user_filter = ''
+    params = [start_date, end_date]
+    if usernames is not None:
+        user_filter = f"WHERE s.username IN ({', '.join('?' for _ in usernames)})"
+        params.extend(usernames)
+    
+    c = conn.cursor()
+    # Each day of the range is crossed with the user's current slots, then each slot's latest event
+    # that day decides it; older history rows have no slot time and count for every slot
+    c.execute(f'''WITH RECURSIVE days (day) AS (
+                      SELECT date(?)
+                      UNION ALL
+                      SELECT date(day, '+1 day') FROM days WHERE day < date(?)
+                  ),
+                  latest AS (
+                      SELECT s.username, d.day, s.slot_minute,
+                             (SELECT MAX(h.id) FROM medication_history h
+                              WHERE h.username = s.username AND h.date = d.day
+                                AND h.medication_id = s.medication_id
+                                AND (h.slot_time = s.slot_time OR h.slot_time IS NULL)) AS event_id
+                      FROM medication_slots s CROSS JOIN days d
+                      {user_filter}
+                  ),
+                  scored AS (
+                      -- Taken-at and slot times are both the user's local wall-clock time, so they compare directly
+                      SELECT l.username, l.day, l.event_id, h.action,
+                             (CAST(substr(h.timestamp, 12, 2) AS INTEGER) * 60
+                              + CAST(substr(h.timestamp, 15, 2) AS INTEGER) - l.slot_minute + 1440) % 1440 AS offset_minutes
+                      FROM latest l
+                      LEFT JOIN medication_history h ON h.id = l.event_id
+                  )
+                  SELECT username, day, COUNT(*), SUM(action = 'taken'),
+                         SUM(action = 'taken' AND MIN(offset_minutes, 1440 - offset_minutes) <= ?)
+                  FROM scored
+                  GROUP BY username, day
+                  HAVING COUNT(event_id) > 0
+                  ORDER BY username, day''',
+              params + [on_time_minutes])
+    
+    results = []
+    for username, day, scheduled, taken, on_time in c.fetchall():
+        result = {
+            'username': username,
+            'date': day,
+            'scheduled': scheduled,
+            'taken': taken or 0,
+            'adherence': 100.0 * (taken or 0) / scheduled
+        }
+        if on_time_minutes is not None:
+            result['on_time'] = on_time or 0
+            result['on_time_adherence'] = 100.0 * (on_time or 0) / scheduled
+        results.append(result)
+    return results
+
+def fill_missing_medication_slots(conn):
+    """Create dose slot rows from the medication's own times for medications saved before slots existed"""
+    c = conn.cursor()
+    c.execute('''SELECT m.id, m.username, m.time, m.reminder_times FROM medications m
+                 WHERE NOT EXISTS (SELECT 1 FROM medication_slots s
+                                   WHERE s.username = m.username AND s.medication_id = m.id)''')
+    slots = []
+    for med_id, username, med_time, reminder_times in c.fetchall():
+        med = {'time': med_time or '00:00', 'reminder_times': json.loads(reminder_times) if reminder_times else None}
+        slots.extend((username, med_id, slot, time_to_minutes(slot)) for slot in get_medication_slots(med))
+    c.executemany('INSERT INTO medication_slots (username, medication_id, slot_time, slot_minute) VALUES (?, ?, ?, ?)', slots)
+    conn.commit()
+    return len(slots)
+
+def backfill_dose_adherence(conn=None, batch_days=31):
+    """Rewrite stored adherence history with dose-weighted values, one month of days per batch"""
+    started = time.perf_counter()
+    close_conn = conn is None
+    if conn is None:
+        conn = get_db_connection()
+    c = conn.cursor()
+    
+    # Past days are scored against each user's current schedule, since earlier schedules are not kept
+    slots_added = fill_missing_medication_slots(conn)
+    c.execute('SELECT MIN(date), MAX(date) FROM adherence_history')
+    first_date, last_date = c.fetchone()
+    updated = 0
+    if first_date:
+        batch_start = datetime.strptime(first_date, "%Y-%m-%d")
+        last = datetime.strptime(last_date, "%Y-%m-%d")
+        while batch_start <= last:
+            batch_end = min(batch_start + timedelta(days=batch_days - 1), last)
+            rows = compute_dose_adherence(conn, batch_start.strftime("%Y-%m-%d"), batch_end.strftime("%Y-%m-%d"))
+            c.executemany('UPDATE adherence_history SET adherence = ? WHERE username = ? AND date = ?',
+                          [(row['adherence'], row['username'], row['date']) for row in rows])
+            updated += c.rowcount
+            conn.commit()
+            batch_start = batch_end + timedelta(days=1)
+    
+    if close_conn:
+        conn.close()
+    return {'rows_updated': updated, 'slots_added': slots_added, 'seconds': time.perf_counter() - started}
+
+@st.cache_resource
+def start_rollover_scheduler(interval_seconds=60):
+    """Start one background thread per server process that runs the midnight rollover and reminder timers"""
+    wheel = get_reminder_wheel()
+    
+    def rollover_loop():
+        while True:
+            try:
+                run_midnight_rollover()
+                process_reminder_timers(wheel)
+            except sqlite3.Error:
+                pass
+            time.sleep(interval_seconds)
+    
+    thread = threading.Thread(target=rollover_loop, name='medtimer-rollover', daemon=True)
+    thread.start()
+    return thread
+
+def get_push_settings():
+    """Read where the push endpoint listens, the page origin allowed to read it and the URL browsers use for it"""
+    return {
+        # Loopback by default, so only a reverse proxy on the same machine reaches it
+        'host': os.environ.get('MEDTIMER_PUSH_HOST', '127.0.0.1'),
+        'port': int(os.environ.get('MEDTIMER_PUSH_PORT', 8765)),
+        'origin': os.environ.get('MEDTIMER_PUSH_ORIGIN', f"http://localhost:{st.get_option('server.port')}"),
+        'url': os.environ.get('MEDTIMER_PUSH_URL')
+    }
+
+@st.cache_resource
+def get_push_hub():
+    """Get the process-wide hub that hands due-dose events to the dashboards listening for them"""
+    return {'subscribers': {}, 'sent': {}, 'lock': threading.Lock(), 'port': None}
+
+def subscribe_push(username):
+    """Give this session a token for the push endpoint, tied to its user"""
+    hub = get_push_hub()
+    if not st.session_state.get('push_token'):
+        st.session_state.push_token = secrets.token_urlsafe(16)
+    with hub['lock']:
+        subscriber = hub['subscribers'].setdefault(st.session_state.push_token, {'queues': []})
+        subscriber['username'] = username
+        subscriber['seen'] = time.time()
+    return st.session_state.push_token
+
+def deliver_push_events(hub, now=None, lookback_seconds=90):
+    """Push doses that just came due and reminders that rang again to users with a dashboard open"""
+    now = now or datetime.now(timezone.utc)
+    with hub['lock']:
+        # Tokens of sessions that closed long ago are dropped along with events too old to repeat
+        for token, subscriber in list(hub['subscribers'].items()):
+            if not subscriber['queues'] and now.timestamp() - subscriber['seen'] > 86400:
+                del hub['subscribers'][token]
+        for key, sent_at in list(hub['sent'].items()):
+            if now.timestamp() - sent_at > 86400:
+                del hub['sent'][key]
+        usernames = {s['username'] for s in hub['subscribers'].values() if s['queues']}
+    if not usernames:
+        return 0
+    
+    # Only users with a dashboard connected are looked up, not every user on the server
+    usernames = sorted(usernames)
+    conn = get_db_connection()
+    events = [{
+        'username': dose['username'],
+        'key': f"{dose['date']}-{dose['medication_id']}-{dose['time']}",
+        'title': f"💊 Time for {dose['name']}",
+        'body': f"{dose['dosageAmount']} at {format_time(dose['time'])}"
+    } for dose in get_due_doses(window_minutes=1, conn=conn, now=now, usernames=usernames)]
+    
+    # Snoozed and repeating reminders are rung by the timer wheel, which stamps fired_at in server time
+    since = datetime.fromtimestamp(now.timestamp() - lookback_seconds).strftime("%Y-%m-%d %H:%M:%S")
+    c = conn.cursor()
+    c.execute(f'''SELECT r.username, r.medication_id, r.reminder_time, r.date, r.fired_at, m.name, m.dosage_amount
+                  FROM reminders r JOIN medications m ON m.id = r.medication_id
+                  WHERE r.acknowledged = 0 AND r.fired_at >= ?
+                    AND r.username IN ({', '.join('?' for _ in usernames)})''', [since] + usernames)
+    for username, medication_id, slot_time, due_date, fired_at, name, dosage_amount in c.fetchall():
+        events.append({
+            'username': username,
+            'key': f"{due_date}-{medication_id}-{slot_time}-{fired_at}",
+            'title': f"🔔 Reminder: {name}",
+            'body': f"{dosage_amount} was due at {format_time(slot_time)}"
+        })
+    conn.close()
+    
+    delivered = 0
+    with hub['lock']:
+        for event in events:
+            if event['key'] in hub['sent']:
+                continue
+            hub['sent'][event['key']] = now.timestamp()
+            for subscriber in hub['subscribers'].values():
+                if subscriber['username'] == event['username']:
+                    for events_queue in subscriber['queues']:
+                        events_queue.put(event)
+                        delivered += 1
+    return delivered
+
+@st.cache_resource
+def start_push_server(host=None, port=None, interval_seconds=30):
+    """Serve due-dose events to open dashboards as server-sent events, with one feeding thread per server process"""
+    hub = get_push_hub()
+    settings = get_push_settings()
+    host = host or settings['host']
+    port = int(port or settings['port'])
+    
+    class PushHandler(BaseHTTPRequestHandler):
+        def send_cors_headers(self):
+            # Only the app's own page may read the stream; behind a same-origin proxy the header is never needed
+            self.send_header('Access-Control-Allow-Origin', settings['origin'])
+            self.send_header('Vary', 'Origin')
+        
+        def do_OPTIONS(self):
+            # Preflight for the Authorization header the dashboard sends from another origin
+            self.send_response(204)
+            self.send_cors_headers()
+            self.send_header('Access-Control-Allow-Methods', 'GET')
+            self.send_header('Access-Control-Allow-Headers', 'Authorization')
+            self.send_header('Access-Control-Max-Age', '86400')
+            self.end_headers()
+        
+        def do_GET(self):
+            # The token travels in a header, so it stays out of URLs, proxy logs and browser history
+            authorization = self.headers.get('Authorization', '')
+            token = authorization[len('Bearer '):] if authorization.startswith('Bearer ') else ''
+            events_queue = queue.Queue()
+            with hub['lock']:
+                subscriber = hub['subscribers'].get(token) if token and urlparse(self.path).path == '/events' else None
+                if subscriber:
+                    subscriber['queues'].append(events_queue)
+            if not subscriber:
+                self.send_error(404)
+                return
+            
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_cors_headers()
+            self.end_headers()
+            try:
+                while True:
+                    # The connection sleeps on the queue; comments keep proxies from closing it
+                    try:
+                        event = events_queue.get(timeout=25)
+                        message = f"data: {json.dumps(event)}\n\n"
+                    except queue.Empty:
+                        message = ": keepalive\n\n"
+                    self.wfile.write(message.encode())
+                    self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            finally:
+                with hub['lock']:
+                    subscriber['queues'].remove(events_queue)
+                    subscriber['seen'] = time.time()
+        
+        def log_message(self, format, *args):
+            pass
+    
+    try:
+        server = ThreadingHTTPServer((host, port), PushHandler)
+    except OSError:
+        # Another process owns the port, so dashboards fall back to their local schedule
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='medtimer-push-server', daemon=True).start()
+    
+    def push_loop():
+        while True:
+            try:
+                deliver_push_events(hub)
+            except sqlite3.Error:
+                pass
+            time.sleep(interval_seconds)
+    
+    threading.Thread(target=push_loop, name='medtimer-push', daemon=True).start()
+    hub['port'] = port
+    return port
+
+@st.cache_resource
+def get_push_component():
+    """Declare the browser side of the push channel, which shows notifications and reruns its fragment"""
+    return components.declare_component('dose_push', path=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'components', 'dose_push'))
+
+def sync_session_day():
+    """Reload the user's data once their local day has rolled over since it was loaded"""
+    if not st.session_state.get('open_date'):
+        st.session_state.open_date = get_session_local_date()
+        return
+    
+    if get_session_local_date() > st.session_state.open_date:
+        run_midnight_rollover()
+        load_user_data(st.session_state.user_profile['username'])
+        st.session_state.undo_stack = []
+
+def create_timer_wheel(tick_seconds=60, num_buckets=512, now=None):
+    """Create a hashed timer wheel: timers live in buckets by due tick so advancing only touches elapsed buckets"""
+    now = time.time() if now is None else now
+    return {
+        'tick_seconds': tick_seconds,
+        'num_buckets': num_buckets,
+        'buckets': [{} for _ in range(num_buckets)],
+        'locations': {},
+        'current_tick': int(now // tick_seconds),
+        'lock': threading.Lock()
+    }
+
+def schedule_timer(wheel, key, due_at):
+    """Schedule or move a timer; timers already overdue fire on the next advance"""
+    with wheel['lock']:
+        cancel_timer_locked(wheel, key)
+        tick = max(int(due_at // wheel['tick_seconds']), wheel['current_tick'] + 1)
+        bucket = tick % wheel['num_buckets']
+        wheel['buckets'][bucket][key] = tick
+        wheel['locations'][key] = bucket
+
+def cancel_timer_locked(wheel, key):
+    """Remove a timer from the wheel while the wheel lock is held"""
+    bucket = wheel['locations'].pop(key, None)
+    if bucket is not None:
+        wheel['buckets'][bucket].pop(key, None)
+
+def cancel_timer(wheel, key):
+    """Remove a timer from the wheel if it is scheduled"""
+    with wheel['lock']:
+        cancel_timer_locked(wheel, key)
+
+def advance_timer_wheel(wheel, now=None):
+    """Move the wheel up to now and return the keys of every timer that expired"""
+    now = time.time() if now is None else now
+    target_tick = int(now // wheel['tick_seconds'])
+    expired = []
+    
+    with wheel['lock']:
+        elapsed = target_tick - wheel['current_tick']
+        if elapsed <= 0:
+            return expired
+        
+        # Buckets hold timers for later laps too, so only pop the ones whose tick has come
+        for step in range(1, min(elapsed, wheel['num_buckets']) + 1):
+            bucket = wheel['buckets'][(wheel['current_tick'] + step) % wheel['num_buckets']]
+            for key, tick in list(bucket.items()):
+                if tick <= target_tick:
+                    del bucket[key]
+                    del wheel['locations'][key]
+                    expired.append(key)
+        
+        wheel['current_tick'] = target_tick
+    return expired
+
+@st.cache_resource
+def get_reminder_wheel():
+    """Get the process-wide reminder timer wheel, reloaded from the database after a restart"""
+    wheel = create_timer_wheel()
+    conn = get_db_connection()
+    c = conn.cursor()
+    c.execute('''SELECT id, due_at FROM reminders
+                 WHERE acknowledged = 0 AND due_at IS NOT NULL''')
+    for reminder_id, due_at in c.fetchall():
+        schedule_timer(wheel, reminder_id, due_at)
+    conn.close()
+    return wheel
+
+@profiled('db')
+def process_reminder_timers(wheel=None, now=None, escalate_after=3, repeat_minutes=10, conn=None):
+    """Ring every snoozed or repeating reminder that came due, escalating ones ignored too many times"""
+    wheel = wheel or get_reminder_wheel()
+    now = time.time() if now is None else now
+    expired = advance_timer_wheel(wheel, now)
+    if not expired:
+        return []
+    
+    close_conn = conn is None
+    if conn is None:
+        conn = get_db_connection()
+    c = conn.cursor()
+    fired_at = datetime.fromtimestamp(now).strftime("%Y-%m-%d %H:%M:%S")
+    escalated = []
+    
+    for reminder_id in expired:
+        c.execute('SELECT ignored_count, escalated_at, snoozed, fired_at FROM reminders WHERE id = ? AND acknowledged = 0', (reminder_id,))
+        row = c.fetchone()
+        if row is None:
+            continue
+        
+        if row[2] and row[3] is None:
+            # The end of a snooze the patient asked for is not an ignored ring
+            due_at = None if row[1] else int(now + repeat_minutes * 60)
+            c.execute('UPDATE reminders SET fired_at = ?, due_at = ? WHERE id = ?', (fired_at, due_at, reminder_id))
+            if due_at:
+                schedule_timer(wheel, reminder_id, due_at)
+        elif row[1]:
+            # Already with the caregiver; a snoozed escalation just rings for the patient again
+            c.execute('UPDATE reminders SET fired_at = ?, due_at = NULL WHERE id = ?', (fired_at, reminder_id))
+        elif (row[0] or 0) + 1 >= escalate_after:
+            c.execute('''UPDATE reminders SET fired_at = ?, ignored_count = ignored_count + 1, escalated_at = ?, due_at = NULL
+                         WHERE id = ?''', (fired_at, fired_at, reminder_id))
+            escalated.append(reminder_id)
+        else:
+            # Keep nagging until the dose is taken, skipped or escalated
+            due_at = int(now + repeat_minutes * 60)
+            c.execute('''UPDATE reminders SET fired_at = ?, ignored_count = ignored_count + 1, due_at = ?
+                         WHERE id = ?''', (fired_at, due_at, reminder_id))
+            schedule_timer(wheel, reminder_id, due_at)
+    
+    conn.commit()
+    if close_conn:
+        conn.close()
+    return escalated
+
+@profiled('db')
+def start_dose_reminder(medication_id, slot_time, repeat_minutes=10):
+    """Start ringing a due dose's reminder the first time it is shown, so ignoring it can escalate"""
+    username = st.session_state.user_profile['username']
+    now = time.time()
+    
+    conn = get_db_connection()
+    c = conn.cursor()
+    c.execute('''INSERT OR IGNORE INTO reminders
+                 (username, medication_id, reminder_time, acknowledged, created_at, date, due_at, fired_at, ignored_count)
+                 VALUES (?, ?, ?, 0, ?, ?, ?, ?, 0)''',
+              (username, medication_id, slot_time, datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+               get_session_local_date(), int(now + repeat_minutes * 60), None))
+    if c.rowcount:
+        schedule_timer(get_reminder_wheel(), c.lastrowid, now + repeat_minutes * 60)
+    conn.commit()
+    conn.close()
+
+@profiled('db')
+def snooze_dose(medication_id, slot_time, minutes):
+    """Snooze one dose slot for a number of minutes"""
+    username = st.session_state.user_profile['username']
+    due_at = int(time.time() + minutes * 60)
+    today = get_session_local_date()
+    
+    conn = get_db_connection()
+    c = conn.cursor()
+    c.execute('''INSERT INTO reminders
+                 (username, medication_id, reminder_time, acknowledged, created_at, date, due_at, fired_at, ignored_count, snoozed)
+                 VALUES (?, ?, ?, 0, ?, ?, ?, NULL, 0, 1)
+                 ON CONFLICT (username, medication_id, reminder_time, date)
+                 DO UPDATE SET due_at = excluded.due_at, fired_at = NULL, snoozed = 1''',
+              (username, medication_id, slot_time, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), today, due_at))
+    c.execute('''SELECT id FROM reminders
+                 WHERE username = ? AND medication_id = ? AND reminder_time = ? AND date = ?''',
+              (username, medication_id, slot_time, today))
+    reminder_id = c.fetchone()[0]
+    conn.commit()
+    conn.close()
+    
+    schedule_timer(get_reminder_wheel(), reminder_id, due_at)
+    record_dose_event(medication_id, slot_time, 'snoozed')
+
+@profiled('db')
+def acknowledge_dose_reminder(medication_id, slot_time):
+    """Stop the reminder for a dose slot once it has been taken or skipped"""
+    username = st.session_state.user_profile['username']
+    
+    conn = get_db_connection()
+    c = conn.cursor()
+    c.execute('''SELECT id FROM reminders
+                 WHERE username = ? AND medication_id = ? AND reminder_time = ? AND date = ? AND acknowledged = 0''',
+              (username, medication_id, slot_time, get_session_local_date()))
+    row = c.fetchone()
+    if row:
+        c.execute('UPDATE reminders SET acknowledged = 1, due_at = NULL WHERE id = ?', (row[0],))
+        cancel_timer(get_reminder_wheel(), row[0])
+    conn.commit()
+    conn.close()
+
+@profiled('db')
+def get_open_dose_reminders():
+    """Get today's unacknowledged reminders for the logged-in patient, keyed by (medication_id, slot)"""
+    conn = get_db_connection()
+    c = conn.cursor()
+    c.execute('''SELECT medication_id, reminder_time, fired_at, ignored_count, escalated_at, snoozed FROM reminders
+                 WHERE username = ? AND date = ? AND acknowledged = 0''',
+              (st.session_state.user_profile['username'], get_session_local_date()))
+    reminders = {}
+    for medication_id, slot_time, fired_at, ignored_count, escalated_at, snoozed in c.fetchall():
+        reminders[(medication_id, slot_time)] = {
+            'ringing': fired_at is not None,
+            'snoozed': bool(snoozed),
+            'ignored_count': ignored_count or 0,
+            'escalated': escalated_at is not None
+        }
+    conn.close()
+    return reminders
+
+@profiled('db')
+def get_escalated_reminders(caregiver_username):
+    """Get escalated, still unanswered reminders for every patient linked to a caregiver"""
+    conn = get_db_connection()
+    c = conn.cursor()
+    c.execute('''SELECT u.name, m.name, m.dosage_amount, r.reminder_time, r.date, r.ignored_count, r.escalated_at
+                 FROM connected_patients cp
+                 JOIN reminders r ON r.username = cp.patient_username
+                 JOIN users u ON u.username = r.username
+                 JOIN medications m ON m.id = r.medication_id
+                 WHERE cp.caregiver_username = ? AND r.escalated_at IS NOT NULL AND r.acknowledged = 0
+                 ORDER BY r.escalated_at DESC''',
+              (caregiver_username,))
+    escalations = []
+    for patient_name, med_name, dosage, slot_time, day, ignored_count, escalated_at in c.fetchall():
+        escalations.append({
+            'patient': patient_name,
+            'medication': med_name,
+            'dosageAmount': dosage,
+            'time': slot_time,
+            'date': day,
+            'ignored_count': ignored_count,
+            'escalated_at': escalated_at
+        })
+    conn.close()
+    return escalations
+
+@profiled('db')
+def get_patient_access_code(username, conn=None):
+    """Get the code a patient gives caregivers to connect, creating it on first use"""
+    close_conn = conn is None
+    if conn is None:
+        conn = get_db_connection()
+    c = conn.cursor()
+    c.execute('SELECT access_code FROM patient_access_codes WHERE username = ?', (username,))
+    row = c.fetchone()
+    access_code = row[0] if row else None
+    while access_code is None:
+        # Codes are unique, so draw again on the rare clash
+        candidate = generate_patient_code()
+        c.execute('INSERT OR IGNORE INTO patient_access_codes (username, access_code) VALUES (?, ?)', (username, candidate))
+        if c.rowcount:
+            access_code = candidate
+    conn.commit()
+    if close_conn:
+        conn.close()
+    return access_code
+
+@profiled('db')
+def connect_caregiver(caregiver_username, access_code, conn=None):
+    """Link a caregiver to the patient with this access code, returning the patient's username or None"""
+    close_conn = conn is None
+    if conn is None:
+        conn = get_db_connection()
+    c = conn.cursor()
+    c.execute('''SELECT pc.username FROM patient_access_codes pc
+                 JOIN users u ON u.username = pc.username AND u.user_type = 'patient'
+                 WHERE pc.access_code = ?''', (access_code,))
+    row = c.fetchone()
+    patient_username = row[0] if row else None
+    if patient_username:
+        c.execute('''INSERT INTO connected_patients (caregiver_username, patient_username, access_code, connected_at)
+                     SELECT ?, ?, ?, ?
+                     WHERE NOT EXISTS (SELECT 1 FROM connected_patients
+                                       WHERE caregiver_username = ? AND patient_username = ?)''',
+                  (caregiver_username, patient_username, access_code, datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                   caregiver_username, patient_username))
+        conn.commit()
+    if close_conn:
+        conn.close()
+    return patient_username
+
+@profiled('db')
+def disconnect_caregiver(caregiver_username, patient_username, conn=None):
+    """Remove the link between a caregiver and a patient"""
+    close_conn = conn is None
+    if conn is None:
+        conn = get_db_connection()
+    conn.execute('DELETE FROM connected_patients WHERE caregiver_username = ? AND patient_username = ?',
+                 (caregiver_username, patient_username))
+    conn.commit()
+    if close_conn:
+        conn.close()
+
+@profiled('db')
+def load_connected_patients(caregiver_username, conn=None):
+    """Load the patients linked to a caregiver, with their medication count and latest adherence"""
+    close_conn = conn is None
+    if conn is None:
+        conn = get_db_connection()
+    c = conn.cursor()
+    c.execute('''SELECT cp.id, cp.patient_username, COALESCE(u.name, cp.patient_username), u.age, cp.access_code,
+                        (SELECT COUNT(*) FROM medications m WHERE m.username = cp.patient_username),
+                        (SELECT a.adherence FROM adherence_history a WHERE a.username = cp.patient_username
+                         ORDER BY a.date DESC LIMIT 1),
+                        (SELECT MAX(h.date) FROM medication_history h WHERE h.username = cp.patient_username)
+                 FROM connected_patients cp
+                 LEFT JOIN users u ON u.username = cp.patient_username
+                 WHERE cp.caregiver_username = ?
+                 GROUP BY cp.patient_username
+                 ORDER BY cp.id''', (caregiver_username,))
+    patients = [{
+        'id': row_id,
+        'username': username,
+        'name': name,
+        'age': age,
+        'access_code': access_code,
+        'medications': medication_count,
+        'adherence': round(adherence or 0),
+        'last_contact': last_contact or 'N/A'
+    } for row_id, username, name, age, access_code, medication_count, adherence, last_contact in c.fetchall()]
+    if close_conn:
+        conn.close()
+    return patients
+
+@profiled('db')
+def get_due_doses(window_minutes=30, conn=None, now=None, usernames=None):
+    """Find every unresolved dose, across all users or only the given ones, that falls due in the next window of minutes"""
+    close_conn = conn is None
+    if conn is None:
+        conn = get_db_connection()
+    c = conn.cursor()
+    
+    now = now or datetime.now(timezone.utc)
+    params = {'now': now.strftime("%Y-%m-%d %H:%M:%S"), 'window': window_minutes}
+    offset_filter = slot_filter = ''
+    if usernames is not None:
+        names = {f"user{index}": username for index, username in enumerate(usernames)}
+        placeholders = ', '.join(f":{name}" for name in names)
+        offset_filter = f"WHERE username IN ({placeholders})"
+        slot_filter = f"AND s.username IN ({placeholders})"
+        params.update(names)
+    
+    # Users are grouped by UTC offset so each group becomes one or two range scans on the slot minute index;
+    # the CROSS JOIN keeps SQLite from scanning every slot instead
+    c.execute(f'''WITH local_now AS (
+                     SELECT utc_offset,
+                            CAST(strftime('%H', :now, printf('%+d minutes', utc_offset)) AS INTEGER) * 60
+                              + CAST(strftime('%M', :now, printf('%+d minutes', utc_offset)) AS INTEGER) AS now_minute,
+                            date(:now, printf('%+d minutes', utc_offset)) AS local_date
+                     FROM (SELECT DISTINCT utc_offset_minutes AS utc_offset FROM user_day_state {offset_filter})
+                 ),
+                 windows AS (
+                     SELECT utc_offset, now_minute, local_date AS due_date,
+                            now_minute AS start_minute, MIN(now_minute + :window, 1440) - 1 AS end_minute
+                     FROM local_now
+                     UNION ALL
+                     SELECT utc_offset, now_minute, date(local_date, '+1 day'),
+                            0, now_minute + :window - 1441
+                     FROM local_now WHERE now_minute + :window > 1440
+                 )
+                 SELECT s.username, s.medication_id, m.name, m.dosage_amount, s.slot_time, w.due_date,
+                        (s.slot_minute - w.now_minute + 1440) % 1440 AS minutes_until
+                 FROM windows w
+                 CROSS JOIN medication_slots s ON s.slot_minute BETWEEN w.start_minute AND w.end_minute
+                 CROSS JOIN user_day_state u ON u.username = s.username AND u.utc_offset_minutes = w.utc_offset
+                 JOIN medications m ON m.id = s.medication_id
+                 WHERE COALESCE((SELECT action FROM medication_history WHERE id =
+                                     (SELECT MAX(h.id) FROM medication_history h
+                                      WHERE h.username = s.username AND h.date = w.due_date
+                                        AND h.medication_id = s.medication_id
+                                        AND (h.slot_time = s.slot_time OR h.slot_time IS NULL))), '') NOT IN ('taken', 'skipped')
+                   {slot_filter}
+                 ORDER BY minutes_until, s.username''',
+              params)
+    rows = c.fetchall()
+    
+    if close_conn:
+        conn.close()
+    
+    return [{
+        'username': row[0],
+        'medication_id': row[1],
+        'name': row[2],
+        'dosageAmount': row[3],
+        'time': row[4],
+        'date': row[5],
+        'minutes_until': row[6]
+    } for row in rows]
+
+def seed_synthetic_users(conn, num_users, meds_per_user=3, taken_ratio=0.7, open_date=None):
+    """Fill a database with synthetic patients, medications, dose slots and taken history"""
+    c = conn.cursor()
+    open_date = open_date or (datetime.now(timezone.utc) - timedelta(days=1)).strftime("%Y-%m-%d")
+    frequencies = ['once-daily', 'twice-daily', 'three-times-daily']
+    usernames = [f"user{i}" for i in range(num_users)]
+    c.executemany("INSERT INTO users (username, name, age, user_type) VALUES (?, ?, 30, 'patient')",
+                  [(u, u) for u in usernames])
+    c.executemany('INSERT INTO user_day_state (username, utc_offset_minutes, open_date) VALUES (?, ?, ?)',
+                  [(u, random.choice([-300, 0, 60, 330]), open_date) for u in usernames])
+    
+    medications = []
+    slots = []
+    history = []
+    med_id = 0
+    for u in usernames:
+        for _ in range(meds_per_user):
+            med_id += 1
+            medications.append((med_id, u, f"Medication {med_id}", random.randint(0, 1)))
+            for default_time in get_custom_medication_times(random.choice(frequencies)):
+                minutes = (time_to_minutes(default_time) + random.randint(-60, 60)) % 1440
+                slot = f"{minutes // 60:02d}:{minutes % 60:02d}"
+                slots.append((u, med_id, slot, minutes))
+                if random.random() < taken_ratio:
+                    history.append((u, med_id, 'taken', f"{open_date} {slot}:00", open_date, slot))
+    c.executemany('INSERT INTO medications (id, username, name, taken_today) VALUES (?, ?, ?, ?)', medications)
+    c.executemany('INSERT INTO medication_slots (username, medication_id, slot_time, slot_minute) VALUES (?, ?, ?, ?)', slots)
+    c.executemany('''INSERT INTO medication_history (username, medication_id, action, timestamp, date, slot_time)
+                     VALUES (?, ?, ?, ?, ?, ?)''', history)
+    conn.commit()
+    return {'users': num_users, 'medications': len(medications), 'slots': len(slots)}
+
+def benchmark_midnight_rollover(num_users=100000, meds_per_user=3):
+    """Time the batched midnight rollover against an in-memory database of synthetic users"""
+    conn = sqlite3.connect(':memory:')
+    init_database(conn)
+    
+    started = time.perf_counter()
+    result = seed_synthetic_users(conn, num_users, meds_per_user)
+    result['seed_seconds'] = time.perf_counter() - started
+    
+    result.update(run_midnight_rollover(conn, now=datetime.now(timezone.utc) + timedelta(days=1)))
+    conn.close()
+    return result
+
+def benchmark_due_doses(num_users=100000, meds_per_user=3, window_minutes=30):
+    """Time the fleet-wide due-dose query with and without the slot minute index"""
+    conn = sqlite3.connect(':memory:')
+    init_database(conn)
+    
+    started = time.perf_counter()
+    result = seed_synthetic_users(conn, num_users, meds_per_user,
+                                  open_date=datetime.now(timezone.utc).strftime("%Y-%m-%d"))
+    result['seed_seconds'] = time.perf_counter() - started
+    
+    started = time.perf_counter()
+    due = get_due_doses(window_minutes, conn)
+    result['indexed_seconds'] = time.perf_counter() - started
+    result['due_doses'] = len(due)
+    
+    conn.execute('DROP INDEX idx_medication_slots_minute')
+    started = time.perf_counter()
+    get_due_doses(window_minutes, conn)
+    result['full_scan_seconds'] = time.perf_counter() - started
+    
+    conn.close()
+    return result
+
+@profiled('db')
+def load_cohort_adherence(caregiver_username, days=30, end_date=None, conn=None):
+    """Load daily adherence for every patient linked to a caregiver as a patients x days array"""
+    import pandas as pd
+    import numpy as np
+    
+    close_conn = conn is None
+    if conn is None:
+        conn = get_db_connection()
+    c = conn.cursor()
+    
+    end = datetime.strptime(end_date, "%Y-%m-%d") if end_date else datetime.now()
+    dates = [(end - timedelta(days=offset)).strftime("%Y-%m-%d") for offset in range(days - 1, -1, -1)]
+    
+    c.execute('''SELECT cp.patient_username, COALESCE(u.name, cp.patient_username),
+                        (SELECT COUNT(*) FROM medications m WHERE m.username = cp.patient_username)
+                 FROM connected_patients cp
+                 LEFT JOIN users u ON u.username = cp.patient_username
+                 WHERE cp.caregiver_username = ?
+                 GROUP BY cp.patient_username
+                 ORDER BY cp.patient_username''', (caregiver_username,))
+    patients = c.fetchall()
+    
+    c.execute('''SELECT a.username, a.date, a.adherence
+                 FROM adherence_history a
+                 JOIN (SELECT DISTINCT patient_username FROM connected_patients WHERE caregiver_username = ?) cp
+                   ON cp.patient_username = a.username
+                 WHERE a.date BETWEEN ? AND ?''', (caregiver_username, dates[0], dates[-1]))
+    rows = c.fetchall()
+    if close_conn:
+        conn.close()
+    
+    # Days with no adherence row stay NaN so they drop out of every average
+    matrix = np.full((len(patients), days), np.nan)
+    if rows:
+        patient_index = {patient[0]: i for i, patient in enumerate(patients)}
+        usernames, row_dates, values = zip(*rows)
+        row_positions = np.array([patient_index[username] for username in usernames])
+        day_positions = (pd.to_datetime(pd.Series(row_dates)) - pd.Timestamp(dates[0])).dt.days.to_numpy()
+        matrix[row_positions, day_positions] = np.array(values, dtype=float)
+    
+    return {
+        'usernames': [patient[0] for patient in patients],
+        'names': [patient[1] for patient in patients],
+        'medication_counts': np.array([patient[2] for patient in patients], dtype=int),
+        'dates': dates,
+        'matrix': matrix
+    }
+
+def compute_cohort_metrics(matrix, recent_days=7, at_risk_adherence=70, at_risk_slope=-1.0):
+    """Compute per-patient and cohort adherence statistics over a patients x days array"""
+    import numpy as np
+    
+    num_patients, num_days = matrix.shape
+    observed = ~np.isnan(matrix)
+    filled = np.where(observed, matrix, 0.0)
+    counts = observed.sum(axis=1)
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        overall = filled.sum(axis=1) / counts
+        recent = filled[:, -recent_days:].sum(axis=1) / observed[:, -recent_days:].sum(axis=1)
+        
+        # Least-squares slope in points per day, fitted only over observed days of each patient
+        x = np.broadcast_to(np.arange(num_days, dtype=float), matrix.shape)
+        x_mean = np.where(observed, x, 0.0).sum(axis=1) / counts
+        dx = np.where(observed, x - x_mean[:, None], 0.0)
+        slope = (dx * (filled - overall[:, None]) * observed).sum(axis=1) / (dx ** 2).sum(axis=1)
+        
+        cohort_daily = filled.sum(axis=0) / observed.sum(axis=0)
+    
+    slope = np.where(counts >= 2, slope, np.nan)
+    latest_index = np.where(observed.any(axis=1), num_days - 1 - np.argmax(observed[:, ::-1], axis=1), -1)
+    latest = np.where(latest_index >= 0, filled[np.arange(num_patients), np.maximum(latest_index, 0)], np.nan)
+    at_risk = (recent < at_risk_adherence) | (slope < at_risk_slope)
+    
+    # Lowest recent adherence first, with falling trends breaking ties
+    risk_order = np.lexsort((np.nan_to_num(slope, nan=0.0), np.nan_to_num(recent, nan=-1.0)))
+    valid_overall = overall[~np.isnan(overall)]
+    percentiles = dict(zip((25, 50, 75, 90), np.percentile(valid_overall, (25, 50, 75, 90)))) if len(valid_overall) else {}
+    
+    return {
+        'overall': overall,
+        'recent': recent,
+        'slope': slope,
+        'latest': latest,
+        'at_risk': at_risk,
+        'risk_order': risk_order,
+        'cohort_daily': cohort_daily,
+        'cohort_average': float(valid_overall.mean()) if len(valid_overall) else None,
+        'percentiles': percentiles
+    }
+
+def benchmark_cohort_analytics(num_patients=200, days=90):
+    """Time loading and analysing a caregiver cohort from an in-memory database"""
+    conn = sqlite3.connect(':memory:')
+    init_database(conn)
+    
+    end = datetime.now()
+    usernames = [f"patient{i}" for i in range(num_patients)]
+    conn.executemany('INSERT INTO connected_patients (caregiver_username, patient_username) VALUES (?, ?)',
+                     [('carer', username) for username in usernames])
+    conn.executemany('INSERT INTO adherence_history (username, date, adherence, updated) VALUES (?, ?, ?, ?)',
+                     [(username, (end - timedelta(days=offset)).strftime("%Y-%m-%d"), random.uniform(40, 100), '')
+                      for username in usernames for offset in range(days) if random.random() < 0.95])
+    conn.commit()
+    
+    started = time.perf_counter()
+    cohort = load_cohort_adherence('carer', days, end.strftime("%Y-%m-%d"), conn)
+    loaded = time.perf_counter()
+    metrics = compute_cohort_metrics(cohort['matrix'])
+    finished = time.perf_counter()
+    conn.close()
+    return {
+        'patients': num_patients,
+        'days': days,
+        'load_seconds': loaded - started,
+        'metrics_seconds': finished - loaded,
+        'at_risk': int(metrics['at_risk'].sum())
+    }
+
 def clear_session_data():
     """Clear all session data (logout)"""
     st.session_state.user_profile = None
     st.session_state.medications = []
     st.session_state.appointments = []
     st.session_state.side_effects = []
-    st.session_state.achievements = []
+    st.session_state.achievements = {}
+    st.session_state.new_achievements = []
     st.session_state.medication_history = []
     st.session_state.adherence_history = []
     st.session_state.connected_patients = []
@@ -828,6 +2410,12 @@ def clear_session_data():
     st.session_state.editing_medication = None
     st.session_state.undo_stack = []
     st.session_state.last_action = None
+    st.session_state.open_date = None
+    st.session_state.pop('utc_offset_minutes', None)
+    st.session_state.dose_status = {}
+    st.session_state.history_version = 0
+    st.session_state.adherence_stats = None
+    st.session_state.dashboard_section = 'dashboard'
 
 def push_undo_state(action_type, data):
     """Push state to undo stack"""
@@ -848,10 +2436,11 @@ def undo_last_action():
     
     if last_action['action_type'] == 'medication_taken':
         med_id = last_action['data']['med_id']
+        slots = last_action['data'].get('slots') or [last_action['data'].get('time')]
         for med in st.session_state.medications:
             if med['id'] == med_id:
-                med['taken_today'] = False
-                update_medication_history(med_id, 'untaken')
+                for slot_time in slots:
+                    record_dose_event(med_id, slot_time, 'untaken')
                 update_adherence_history()
                 save_user_data()
                 st.session_state.last_action = f"Undid taking {med['name']}"
@@ -900,8 +2489,8 @@ def show_undo_button():
                 else:
                     st.error("Nothing to undo")
 
-def inject_custom_css(age_category='adult'):
-    """Inject custom CSS into Streamlit app with age-based styling"""
+def build_theme_css(age_category='adult'):
+    """Build the custom CSS for the Streamlit app with age-based styling"""
     primary_color = get_primary_color(age_category)
     secondary_color = get_secondary_color(age_category)
     font_size = get_font_size(age_category)
@@ -1041,6 +2630,17 @@ def inject_custom_css(age_category='adult'):
         box-shadow: 0 2px 4px rgba(239, 68, 68, 0.3);
     }}
     
+    .status-skipped {{
+        background: linear-gradient(135deg, #9ca3af, #6b7280);
+        color: white !important;
+        padding: 6px 16px;
+        border-radius: 20px;
+        font-size: {font_size};
+        font-weight: 700;
+        display: inline-block;
+        box-shadow: 0 2px 4px rgba(107, 114, 128, 0.3);
+    }}
+    
     .status-upcoming {{
         background: linear-gradient(135deg, #f59e0b, #d97706);
         color: white !important;
@@ -1117,39 +2717,105 @@ def inject_custom_css(age_category='adult'):
         margin: 10px 0;
         border-left: 4px solid #f59e0b;
     }}
-    
-    .datetime-display {{
-        background: rgba(255, 255, 255, 0.15);
-        backdrop-filter: blur(10px);
-        border-radius: 16px;
-        padding: 20px 30px;
-        text-align: center;
-        box-shadow: 0 8px 32px rgba(0, 0, 0, 0.1);
-        border: 1px solid rgba(255, 255, 255, 0.2);
-        margin-bottom: 20px;
-    }}
-    
-    .datetime-display h2 {{
-        color: #ffffff !important;
-        margin: 0;
-        font-size: 48px;
-        font-weight: 900;
-        text-shadow: 2px 2px 4px rgba(0, 0, 0, 0.2);
-    }}
-    
-    .datetime-display p {{
-        color: #ffffff !important;
-        margin: 5px 0 0 0;
-        font-size: 20px;
-        font-weight: 500;
-        opacity: 0.9;
-    }}
     </style>
     """
     return css
 
-def create_adherence_line_chart(adherence_history, age_category='adult'):
+def minify_css(css):
+    """Strip style tags, comments and whitespace from a stylesheet"""
+    css = re.sub(r'</?style>|/\*.*?\*/', '', css, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,>])\s*|(:)\s+', r'\1\2', css)
+    return css.replace(';}', '}').strip()
+
+def publish_static_asset(name, data, extension):
+    """Write generated bytes to the static folder and return their URL, or None when static serving is off"""
+    if not st.get_option('server.enableStaticServing'):
+        return None
+    
+    # The content hash in the name lets browsers cache the file until it changes
+    file_name = f"{name}-{hashlib.blake2b(data, digest_size=6).hexdigest()}.{extension}"
+    static_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+    try:
+        os.makedirs(static_dir, exist_ok=True)
+        with open(os.path.join(static_dir, file_name), 'wb') as f:
+            f.write(data)
+    except OSError:
+        return None
+    return f"app/static/{file_name}"
+
+@st.cache_resource
+def get_theme_assets():
+    """Compile each age category's stylesheet into its inline style markup once per server"""
+    return {age_category: f"<style>{minify_css(build_theme_css(age_category))}</style>"
+            for age_category in ('youth', 'adult', 'senior')}
+
+@profiled('css')
+def inject_custom_css(age_category='adult'):
+    """Get the markup that applies the age category's precompiled stylesheet"""
+    # Inline rather than a static .css link: Streamlit 1.50 serves static .css as text/plain with nosniff,
+    # so browsers refuse it as a stylesheet
+    return get_theme_assets().get(age_category) or get_theme_assets()['adult']
+
+def benchmark_theme_css(age_category='senior'):
+    """Compare the stylesheet bytes sent per rerun before and after precompiling"""
+    return {
+        # main() and the patient dashboard both injected the full stylesheet
+        'bytes_before': 2 * len(build_theme_css(age_category).encode()),
+        'bytes_inline': len(get_theme_assets()[age_category].encode())
+    }
+
+def lttb_downsample(x, y, target_points):
+    """Pick target_points indices that keep the visual shape of a series (largest triangle three buckets)"""
+    import numpy as np
+    
+    length = len(y)
+    if target_points >= length or target_points < 3:
+        return np.arange(length)
+    
+    # First and last points are always kept; the rest are split into equal buckets
+    edges = np.linspace(1, length - 1, target_points - 1).astype(int)
+    selected = np.empty(target_points, dtype=int)
+    selected[0] = 0
+    selected[-1] = length - 1
+    
+    for bucket in range(target_points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else length
+        next_x = x[end:next_end].mean() if next_end > end else x[-1]
+        next_y = y[end:next_end].mean() if next_end > end else y[-1]
+        
+        prev = selected[bucket]
+        areas = np.abs((x[prev] - next_x) * (y[start:end] - y[prev]) - (x[prev] - x[start:end]) * (next_y - y[prev]))
+        selected[bucket + 1] = start + int(np.argmax(areas))
+    return selected
+
+def minmax_downsample(y, target_points):
+    """Keep the minimum and maximum of each bucket so spikes and dips survive downsampling"""
+    import numpy as np
+    
+    length = len(y)
+    if target_points >= length or target_points < 2:
+        return np.arange(length)
+    
+    num_buckets = target_points // 2
+    edges = np.linspace(0, length, num_buckets + 1).astype(int)
+    starts = edges[:-1]
+    bucket_of = np.repeat(np.arange(num_buckets), np.diff(edges))
+    
+    # Sort by (bucket, value) once; each bucket's first and last entries are its min and max
+    order = np.lexsort((y, bucket_of))
+    firsts = order[starts]
+    lasts = order[edges[1:] - 1]
+    return np.unique(np.concatenate((firsts, lasts)))
+
+@profiled('chart')
+def create_adherence_line_chart(adherence_history, age_category='adult', max_points=500, webgl_threshold=1000,
+                                date_range=None, method='lttb'):
     """Create line chart showing adherence over time"""
+    import plotly.graph_objects as go
+    import numpy as np
+    
     if not adherence_history:
         fig = go.Figure()
         fig.add_annotation(
@@ -1163,16 +2829,36 @@ def create_adherence_line_chart(adherence_history, age_category='adult'):
         return fig
     
     sorted_history = sorted(adherence_history, key=lambda x: x['date'])
-    dates = [h['date'] for h in sorted_history]
-    adherence = [h['adherence'] for h in sorted_history]
+    dates = np.array([h['date'] for h in sorted_history])
+    adherence = np.array([h['adherence'] for h in sorted_history], dtype=float)
+    
+    # A narrower date range keeps more of its own points, so zooming in raises the resolution
+    if date_range:
+        in_range = (dates >= date_range[0]) & (dates <= date_range[1])
+        dates = dates[in_range]
+        adherence = adherence[in_range]
+    
+    raw_points = len(adherence)
+    if raw_points > max_points:
+        day_numbers = dates.astype('datetime64[D]').astype(float)
+        if method == 'minmax':
+            keep = minmax_downsample(adherence, max_points)
+        else:
+            keep = lttb_downsample(day_numbers, adherence, max_points)
+        dates = dates[keep]
+        adherence = adherence[keep]
     
     primary_color = get_primary_color(age_category)
     secondary_color = get_secondary_color(age_category)
     
+    # WebGL draws long series far faster than SVG; markers are only useful while points are sparse
+    scatter = go.Scattergl if raw_points > webgl_threshold else go.Scatter
+    show_markers = len(adherence) <= 120
+    
     fig = go.Figure()
-    fig.add_trace(go.Scatter(
-        x=dates, y=adherence, mode='lines+markers', name='Adherence',
-        line=dict(color=primary_color, width=4),
+    fig.add_trace(scatter(
+        x=dates.tolist(), y=adherence.round(1).tolist(), mode='lines+markers' if show_markers else 'lines', name='Adherence',
+        line=dict(color=primary_color, width=4 if show_markers else 2),
         marker=dict(size=10, color=secondary_color, line=dict(width=2, color=primary_color)),
         fill='tozeroy',
         fillcolor=f'rgba({int(primary_color[1:3], 16)}, {int(primary_color[3:5], 16)}, {int(primary_color[5:7], 16)}, 0.2)'
@@ -1181,8 +2867,12 @@ def create_adherence_line_chart(adherence_history, age_category='adult'):
     fig.add_hline(y=100, line_dash="dash", line_color="green",
                   annotation_text="100% Goal", annotation_position="right")
     
+    title = '📈 Medication Adherence Trend'
+    if raw_points > len(adherence):
+        title += f' ({len(adherence)} of {raw_points} days shown)'
+    
     fig.update_layout(
-        title={'text': '📈 Medication Adherence Trend', 'font': {'size': 24, 'color': '#1f2937', 'family': 'Arial Black'}},
+        title={'text': title, 'font': {'size': 24, 'color': '#1f2937', 'family': 'Arial Black'}},
         xaxis_title='Date', yaxis_title='Adherence Rate (%)',
         yaxis=dict(range=[0, 105], ticksuffix='%'),
         height=450, plot_bgcolor='#f9fafb', paper_bgcolor='white',
@@ -1190,8 +2880,31 @@ def create_adherence_line_chart(adherence_history, age_category='adult'):
     )
     return fig
 
+def benchmark_adherence_chart(history_days=(90, 365, 1825, 3650), max_points=500, repeats=3):
+    """Compare figure payload size and build time for full and downsampled adherence trends"""
+    results = []
+    end = datetime.now()
+    for days in history_days:
+        history = [{'date': (end - timedelta(days=offset)).strftime("%Y-%m-%d"),
+                    'adherence': random.uniform(40, 100)} for offset in range(days)]
+        row = {'days': days}
+        # The full variant matches the old chart: every point, drawn as SVG
+        for label, points, webgl_threshold in (('full', days + 1, float('inf')), ('downsampled', max_points, 1000)):
+            timings = []
+            for _ in range(repeats):
+                started = time.perf_counter()
+                payload = create_adherence_line_chart(history, max_points=points, webgl_threshold=webgl_threshold).to_json()
+                timings.append(time.perf_counter() - started)
+            row[f'{label}_bytes'] = len(payload)
+            row[f'{label}_seconds'] = min(timings)
+        results.append(row)
+    return results
+
+@profiled('chart')
 def create_medication_pie_chart(medications, age_category='adult'):
     """Create pie chart showing medications by type"""
+    import plotly.graph_objects as go
+    
     if not medications:
         fig = go.Figure()
         fig.add_annotation(
@@ -1225,8 +2938,11 @@ def create_medication_pie_chart(medications, age_category='adult'):
     )
     return fig
 
+@profiled('chart')
 def create_daily_schedule_bar_chart(medications, age_category='adult'):
     """Create bar chart showing medication schedule throughout the day"""
+    import plotly.graph_objects as go
+    
     if not medications:
         fig = go.Figure()
         fig.add_annotation(
@@ -1270,8 +2986,11 @@ def create_daily_schedule_bar_chart(medications, age_category='adult'):
     )
     return fig
 
+@profiled('chart')
 def create_side_effects_bar_chart(side_effects):
     """Create bar chart showing side effects by severity"""
+    import plotly.graph_objects as go
+    
     if not side_effects:
         fig = go.Figure()
         fig.add_annotation(
@@ -1305,8 +3024,11 @@ def create_side_effects_bar_chart(side_effects):
     )
     return fig
 
+@profiled('chart')
 def create_medication_status_donut(medications):
     """Create donut chart showing taken vs pending medications"""
+    import plotly.graph_objects as go
+    
     if not medications:
         fig = go.Figure()
         fig.add_annotation(
@@ -1317,12 +3039,14 @@ def create_medication_status_donut(medications):
         fig.update_layout(height=400, plot_bgcolor='white', paper_bgcolor='white')
         return fig
     
-    taken = sum(1 for med in medications if med.get('taken_today', False))
-    pending = len(medications) - taken
+    statuses = [get_dose_status(med) for med in medications]
+    taken = statuses.count('Taken')
+    skipped = statuses.count('Skipped')
+    pending = len(medications) - taken - skipped
     
-    labels = ['Taken ✅', 'Pending ⏰']
-    values = [taken, pending]
-    colors = ['#10b981', '#f59e0b']
+    labels = ['Taken ✅', 'Skipped ⏭️', 'Pending ⏰']
+    values = [taken, skipped, pending]
+    colors = ['#10b981', '#9ca3af', '#f59e0b']
     
     fig = go.Figure(data=[go.Pie(
         labels=labels, values=values, hole=0.5,
@@ -1344,8 +3068,308 @@ def create_medication_status_donut(medications):
     )
     return fig
 
-def create_weekly_heatmap(medication_history):
+@profiled('chart')
+@st.cache_data(max_entries=32)
+def compute_weekly_heatmap(username, history_version, _medication_history, schedule, bucket_hours=3, days_back=28, end_date=None):
+    """Bucket taken doses by weekday and time of day against scheduled doses, cached per history version"""
+    import pandas as pd
+    import numpy as np
+    
+    # Buckets must tile the day exactly, or late-evening hours fall past the last bucket
+    if bucket_hours not in (1, 2, 3, 4, 6, 8, 12, 24):
+        raise ValueError(f"bucket_hours must divide 24, got {bucket_hours}")
+    num_buckets = 24 // bucket_hours
+    taken = np.zeros((7, num_buckets))
+    scheduled = np.zeros((7, num_buckets))
+    if not _medication_history or not schedule:
+        return taken, scheduled
+    
+    history = pd.DataFrame(_medication_history, columns=['medication_id', 'action', 'timestamp', 'date', 'slot_time'])
+    end = pd.Timestamp(end_date) if end_date else pd.Timestamp(history['date'].max())
+    start = end - pd.Timedelta(days=days_back - 1) if days_back else pd.Timestamp(history['date'].min())
+    history['day'] = pd.to_datetime(history['date'], errors='coerce')
+    history = history[(history['day'] >= start) & (history['day'] <= end)]
+    
+    # The latest event for a dose slot decides it, so undone takes drop out
+    history = history.drop_duplicates(subset=['day', 'medication_id', 'slot_time'], keep='last')
+    schedule_ids = [medication_id for medication_id, _ in schedule]
+    history = history[(history['action'] == 'taken') & history['medication_id'].isin(schedule_ids)]
+    
+    if len(history):
+        # Bucket by the dose's scheduled slot so late takes still land against their schedule
+        slot_hour = pd.to_numeric(history['slot_time'].str[:2], errors='coerce')
+        taken_hour = pd.to_datetime(history['timestamp'], errors='coerce').dt.hour
+        hours = slot_hour.fillna(taken_hour).fillna(0).to_numpy(dtype=int)
+        cells = history['day'].dt.weekday.to_numpy() * num_buckets + hours // bucket_hours
+        taken = np.bincount(cells, minlength=7 * num_buckets).reshape(7, num_buckets).astype(float)
+    
+    # Every scheduled slot happens once on each calendar day of the window
+    window_weekdays = pd.date_range(start, end, freq='D').weekday.to_numpy()
+    weekday_counts = np.bincount(window_weekdays, minlength=7)
+    slot_hours = np.array([int(slot_time[:2]) for _, slot_time in schedule])
+    slot_counts = np.bincount(slot_hours // bucket_hours, minlength=num_buckets)
+    scheduled = np.outer(weekday_counts, slot_counts).astype(float)
+    return taken, scheduled
+
+@profiled('chart')
+@st.cache_data(max_entries=32)
+def compute_dose_timeliness(username, history_version, local_date, _medication_history):
+    """Join every taken dose to its scheduled slot and measure its delay, cached per history version and day"""
+    import pandas as pd
+    
+    columns = ['medication_id', 'date', 'slot_time', 'delay_minutes']
+    if not _medication_history:
+        return pd.DataFrame(columns=columns)
+    
+    history = pd.DataFrame(_medication_history, columns=['medication_id', 'action', 'timestamp', 'date', 'slot_time'])
+    history = history[history['slot_time'].notna()]
+    history = history.drop_duplicates(subset=['date', 'medication_id', 'slot_time'], keep='last')
+    history = history[history['action'] == 'taken']
+    if history.empty:
+        return pd.DataFrame(columns=columns)
+    
+    taken_at = pd.to_datetime(history['timestamp'], errors='coerce')
+    taken_minute = taken_at.dt.hour * 60 + taken_at.dt.minute
+    slot_minute = pd.to_numeric(history['slot_time'].str[:2], errors='coerce') * 60 + pd.to_numeric(history['slot_time'].str[3:5], errors='coerce')
+    # Wrap into -12h..+12h so a dose taken just after midnight counts as late, not 23 hours early
+    delay = ((taken_minute - slot_minute + 720) % 1440) - 720
+    
+    doses = pd.DataFrame({
+        'medication_id': history['medication_id'].to_numpy(),
+        'date': history['date'].to_numpy(),
+        'slot_time': history['slot_time'].to_numpy(),
+        'delay_minutes': delay.to_numpy()
+    })
+    return doses[doses['delay_minutes'].notna()].reset_index(drop=True)
+
+def get_session_dose_timeliness():
+    """Get the logged-in user's taken doses with their delays"""
+    medication_history = st.session_state.get('medication_history', [])
+    return compute_dose_timeliness(
+        (st.session_state.get('user_profile') or {}).get('username'),
+        st.session_state.get('history_version', len(medication_history)),
+        get_session_local_date(),
+        medication_history
+    )
+
+def summarize_dose_timeliness(doses, medications, on_time_minutes=30, start_date=None, end_date=None):
+    """Summarize dose delays overall, per medication and per time of day"""
+    import pandas as pd
+    import numpy as np
+    
+    if start_date:
+        doses = doses[doses['date'] >= start_date]
+    if end_date:
+        doses = doses[doses['date'] <= end_date]
+    
+    names = {med['id']: med['name'] for med in medications}
+    delays = doses['delay_minutes'].astype(float)
+    slot_hours = pd.to_numeric(doses['slot_time'].str[:2], errors='coerce')
+    doses = doses.assign(
+        medication=doses['medication_id'].map(names).fillna('Removed medication'),
+        time_of_day=np.select(
+            [(slot_hours >= 5) & (slot_hours < 12), (slot_hours >= 12) & (slot_hours < 17), (slot_hours >= 17) & (slot_hours < 21)],
+            ['Morning', 'Afternoon', 'Evening'],
+            default='Night'
+        ),
+        on_time=delays.abs() <= on_time_minutes,
+        late=delays > on_time_minutes
+    )
+    
+    def summarize(grouped):
+        summary = grouped.agg(
+            doses=('delay_minutes', 'size'),
+            median_delay=('delay_minutes', 'median'),
+            on_time_pct=('on_time', 'mean'),
+            late_pct=('late', 'mean')
+        )
+        summary.insert(2, 'p90_delay', grouped['delay_minutes'].quantile(0.9))
+        summary[['on_time_pct', 'late_pct']] *= 100
+        return summary.round(1).reset_index()
+    
+    return {
+        'doses': len(doses),
+        'median_delay': float(delays.median()) if len(doses) else None,
+        'on_time_pct': float(doses['on_time'].mean() * 100) if len(doses) else None,
+        'on_time_minutes': on_time_minutes,
+        'delays': delays.to_numpy(),
+        'by_medication': summarize(doses.groupby('medication')) if len(doses) else pd.DataFrame(),
+        'by_time_of_day': summarize(doses.groupby('time_of_day')) if len(doses) else pd.DataFrame()
+    }
+
+@profiled('chart')
+def create_timeliness_histogram(timeliness):
+    """Create histogram of how early or late doses were taken"""
+    import plotly.graph_objects as go
+    import numpy as np
+    
+    if not timeliness['doses']:
+        fig = go.Figure()
+        fig.add_annotation(
+            text="No timed doses yet.<br>Take a dose from a reminder to see your timing!",
+            xref="paper", yref="paper", x=0.5, y=0.5, showarrow=False,
+            font=dict(size=16, color="#6b7280")
+        )
+        fig.update_layout(height=400, xaxis=dict(visible=False), yaxis=dict(visible=False),
+                         plot_bgcolor='white', paper_bgcolor='white')
+        return fig
+    
+    # Counts are binned here so the figure carries 37 bars instead of every dose
+    window = timeliness['on_time_minutes']
+    edges = np.arange(-180, 191, 10)
+    counts, _ = np.histogram(np.clip(timeliness['delays'], -180, 180), bins=edges)
+    centers = edges[:-1] + 5
+    bar_colors = np.where(np.abs(centers) <= window, '#10b981', np.where(centers > 0, '#ef4444', '#f59e0b'))
+    
+    fig = go.Figure(data=[go.Bar(
+        x=centers, y=counts, marker=dict(color=bar_colors.tolist()),
+        hovertemplate='%{x:+d} min: %{y} doses<extra></extra>'
+    )])
+    fig.update_layout(
+        title={'text': f"⏱️ Dose Timing (median {timeliness['median_delay']:+.0f} min, {timeliness['on_time_pct']:.0f}% on time)",
+               'font': {'size': 22, 'color': '#1f2937', 'family': 'Arial Black'}},
+        xaxis_title='Minutes from scheduled time (early < 0 < late)', yaxis_title='Doses',
+        height=420, plot_bgcolor='#f9fafb', paper_bgcolor='white', showlegend=False, font=dict(size=14), bargap=0.05
+    )
+    return fig
+
+@profiled('chart')
+def create_timeliness_by_time_of_day_chart(timeliness):
+    """Create bar chart of on-time percentage by time of day"""
+    import plotly.graph_objects as go
+    
+    by_time = timeliness['by_time_of_day']
+    if by_time.empty:
+        fig = go.Figure()
+        fig.add_annotation(
+            text="No timed doses yet.",
+            xref="paper", yref="paper", x=0.5, y=0.5, showarrow=False,
+            font=dict(size=16, color="#6b7280")
+        )
+        fig.update_layout(height=400, xaxis=dict(visible=False), yaxis=dict(visible=False),
+                         plot_bgcolor='white', paper_bgcolor='white')
+        return fig
+    
+    order = ['Morning', 'Afternoon', 'Evening', 'Night']
+    time_colors = {'Morning': '#fbbf24', 'Afternoon': '#60a5fa', 'Evening': '#a78bfa', 'Night': '#1e3a8a'}
+    by_time = by_time.set_index('time_of_day').reindex([t for t in order if t in set(by_time['time_of_day'])]).reset_index()
+    
+    fig = go.Figure(data=[go.Bar(
+        x=by_time['time_of_day'], y=by_time['on_time_pct'],
+        marker=dict(color=[time_colors[t] for t in by_time['time_of_day']], line=dict(color='white', width=2)),
+        text=[f"{pct:.0f}%" for pct in by_time['on_time_pct']], textposition='outside',
+        customdata=by_time[['median_delay', 'doses']].to_numpy(),
+        hovertemplate='%{x}<br>On time: %{y:.0f}%<br>Median delay: %{customdata[0]:+.0f} min<br>Doses: %{customdata[1]}<extra></extra>'
+    )])
+    fig.update_layout(
+        title={'text': '🌓 On-Time Doses by Time of Day', 'font': {'size': 22, 'color': '#1f2937', 'family': 'Arial Black'}},
+        xaxis_title='Time of Day', yaxis_title='On Time (%)', yaxis=dict(range=[0, 110]),
+        height=420, plot_bgcolor='#f9fafb', paper_bgcolor='white', showlegend=False, font=dict(size=14)
+    )
+    return fig
+
+@profiled('chart')
+@st.cache_data(max_entries=32)
+def compute_side_effect_associations(username, data_version, local_date, _side_effects, _medications, _adherence_history,
+                                     _doses, on_time_minutes=30, min_days=14, min_reports=2):
+    """Rank how often side effects are reported under each medication, dose timing, adherence change and time on a medication"""
+    import pandas as pd
+    import numpy as np
+    
+    columns = ['factor', 'group', 'reports', 'severe_reports', 'days', 'rate_per_100_days', 'relative_rate']
+    if not _side_effects or not _medications:
+        return pd.DataFrame(columns=columns)
+    
+    end = pd.Timestamp(local_date)
+    effects = pd.DataFrame(_side_effects, columns=['medication', 'severity', 'date'])
+    effects['day'] = pd.to_datetime(effects['date'], errors='coerce')
+    
+    # A medication is exposed from the day it was added (or its first report, if earlier) until today
+    meds = pd.DataFrame([{'medication_id': med['id'], 'medication': med['name'],
+                          'created': (med.get('created_at') or local_date)[:10]} for med in _medications])
+    first_report = effects.groupby('medication')['day'].min()
+    meds['start'] = pd.concat([pd.to_datetime(meds['created'], errors='coerce'),
+                               meds['medication'].map(first_report)], axis=1).min(axis=1).fillna(end).clip(upper=end)
+    
+    # One row per medication-day, built with repeat/arange instead of a loop over days
+    lengths = (end - meds['start']).dt.days.to_numpy() + 1
+    med_index = np.repeat(np.arange(len(meds)), lengths)
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    panel = pd.DataFrame({
+        'medication_id': meds['medication_id'].to_numpy()[med_index],
+        'medication': meds['medication'].to_numpy()[med_index],
+        'day': meds['start'].to_numpy()[med_index] + offsets.astype('timedelta64[D]'),
+        'days_on_medication': offsets
+    })
+    
+    report_counts = effects.assign(severe=effects['severity'] == 'Severe').groupby(['medication', 'day']).agg(
+        reports=('severity', 'size'), severe_reports=('severe', 'sum'))
+    panel = panel.join(report_counts, on=['medication', 'day'])
+    panel[['reports', 'severe_reports']] = panel[['reports', 'severe_reports']].fillna(0)
+    
+    # Dose timing that day: any late dose wins over an early one, otherwise on time or nothing logged
+    timing = pd.DataFrame(index=pd.MultiIndex.from_arrays([[], []], names=['medication_id', 'day']), columns=['max_delay', 'min_delay'])
+    if len(_doses):
+        timing = _doses.assign(day=pd.to_datetime(_doses['date'], errors='coerce')).groupby(['medication_id', 'day'])['delay_minutes'].agg(
+            max_delay='max', min_delay='min')
+    panel = panel.join(timing, on=['medication_id', 'day'])
+    panel['dose_timing'] = np.select(
+        [panel['max_delay'] > on_time_minutes, panel['min_delay'] < -on_time_minutes, panel['max_delay'].notna()],
+        [f'Late dose (>{on_time_minutes} min)', f'Early dose (>{on_time_minutes} min)', 'On-time doses'],
+        default='No dose logged'
+    )
+    
+    # Change in adherence against the 7 days before
+    adherence = pd.Series({pd.Timestamp(h['date']): h['adherence'] for h in _adherence_history}, dtype=float).sort_index()
+    change = (adherence - adherence.rolling(7, min_periods=1).mean().shift(1)).rename('adherence_change')
+    panel = panel.join(change, on='day')
+    panel['adherence_trend'] = np.select(
+        [panel['adherence_change'] <= -20, panel['adherence_change'] >= 20, panel['adherence_change'].notna()],
+        ['Adherence dropped 20+ pts', 'Adherence rose 20+ pts', 'Adherence steady'],
+        default='No adherence data'
+    )
+    
+    panel['time_on_medication'] = pd.cut(panel['days_on_medication'], [-1, 7, 30, 90, np.inf],
+                                         labels=['First week', 'Days 8-30', 'Days 31-90', 'Over 90 days']).astype(str)
+    
+    overall_rate = panel['reports'].sum() / len(panel) * 100
+    associations = []
+    for factor, column in (('Medication', 'medication'), ('Dose timing', 'dose_timing'),
+                           ('Adherence change', 'adherence_trend'), ('Time on medication', 'time_on_medication')):
+        grouped = panel.groupby(column).agg(reports=('reports', 'sum'), severe_reports=('severe_reports', 'sum'),
+                                            days=('reports', 'size')).reset_index().rename(columns={column: 'group'})
+        grouped.insert(0, 'factor', factor)
+        associations.append(grouped)
+    
+    associations = pd.concat(associations, ignore_index=True)
+    # A single report on a handful of days gives a huge rate, so only groups with enough days and reports are ranked
+    associations = associations[(associations['days'] >= min_days) & (associations['reports'] >= min_reports)].reset_index(drop=True)
+    associations['rate_per_100_days'] = (associations['reports'] / associations['days'] * 100).round(2)
+    associations['relative_rate'] = (associations['rate_per_100_days'] / overall_rate).round(2) if overall_rate else 0.0
+    associations[['reports', 'severe_reports']] = associations[['reports', 'severe_reports']].astype(int)
+    return associations.sort_values(['relative_rate', 'reports'], ascending=False, ignore_index=True)[columns]
+
+def get_session_side_effect_associations():
+    """Get side-effect associations for the logged-in user, recomputed only when their data changes"""
+    side_effects = st.session_state.side_effects
+    medications = st.session_state.medications
+    data_version = fingerprint_inputs(
+        st.session_state.get('history_version', 0),
+        [(e.get('medication'), e.get('severity'), e.get('date')) for e in side_effects],
+        [(med['id'], med['name'], med.get('created_at')) for med in medications],
+        [(h['date'], h['adherence']) for h in st.session_state.get('adherence_history', [])]
+    )
+    return compute_side_effect_associations(
+        (st.session_state.get('user_profile') or {}).get('username'), data_version, get_session_local_date(),
+        side_effects, medications, st.session_state.get('adherence_history', []), get_session_dose_timeliness()
+    )
+
+@profiled('chart')
+def create_weekly_heatmap(medication_history, medications=None, bucket_hours=3, days_back=28):
     """Create heatmap showing medication adherence by day and time"""
+    import plotly.graph_objects as go
+    import numpy as np
+    
     if not medication_history:
         fig = go.Figure()
         fig.add_annotation(
@@ -1357,26 +3381,103 @@ def create_weekly_heatmap(medication_history):
                          plot_bgcolor='white', paper_bgcolor='white')
         return fig
     
+    schedule = tuple((med['id'], slot) for med in (medications or []) for slot in get_medication_slots(med))
+    username = (st.session_state.get('user_profile') or {}).get('username')
+    taken, scheduled = compute_weekly_heatmap(
+        username, st.session_state.get('history_version', len(medication_history)), medication_history,
+        schedule, bucket_hours, days_back, get_session_local_date()
+    )
+    
     days = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
-    hours = [f"{h:02d}:00" for h in range(0, 24, 3)]
-    data = [[random.randint(0, 3) for _ in hours] for _ in days]
+    hours = [f"{h:02d}:00" for h in range(0, 24, bucket_hours)]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        data = np.where(scheduled > 0, np.minimum(taken / scheduled, 1) * 100, np.nan)
     
     fig = go.Figure(data=go.Heatmap(
-        z=data, x=hours, y=days,
+        z=data, x=hours, y=days, zmin=0, zmax=100,
+        customdata=np.dstack([taken, scheduled]),
         colorscale=[[0, '#f3f4f6'], [0.33, '#fef3c7'], [0.66, '#a7f3d0'], [1, '#10b981']],
-        showscale=True, colorbar=dict(title='Medications<br>Taken'),
-        hovertemplate='Day: %{y}<br>Time: %{x}<br>Medications: %{z}<extra></extra>'
+        showscale=True, colorbar=dict(title='Doses<br>Taken %'),
+        hovertemplate='Day: %{y}<br>Time: %{x}<br>Taken: %{customdata[0]:.0f} of %{customdata[1]:.0f} (%{z:.0f}%)<extra></extra>'
     ))
     
     fig.update_layout(
-        title={'text': '📅 Weekly Medication Heatmap', 'font': {'size': 24, 'color': '#1f2937', 'family': 'Arial Black'}},
+        title={'text': f'📅 Weekly Medication Heatmap (last {days_back} days)', 'font': {'size': 24, 'color': '#1f2937', 'family': 'Arial Black'}},
         xaxis_title='Time of Day', yaxis_title='Day of Week',
         height=400, plot_bgcolor='white', paper_bgcolor='white', font=dict(size=14)
     )
     return fig
 
+@st.cache_resource
+def get_figure_cache(max_entries=128, max_bytes=32 * 1024 * 1024):
+    """Get the process-wide LRU cache of built plotly figures"""
+    return {
+        'entries': OrderedDict(),
+        'max_entries': max_entries,
+        'max_bytes': max_bytes,
+        'bytes': 0,
+        'hits': 0,
+        'misses': 0,
+        'evictions': 0,
+        'lock': threading.Lock()
+    }
+
+def fingerprint_inputs(*parts):
+    """Get a short stable hash of chart inputs"""
+    payload = json.dumps(parts, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+@profiled('chart')
+def cached_figure(chart_name, fingerprint, build_figure):
+    """Return a cached figure for these inputs, building and storing it on a miss"""
+    cache = get_figure_cache()
+    key = (chart_name, fingerprint)
+    
+    with cache['lock']:
+        entry = cache['entries'].get(key)
+        if entry is not None:
+            cache['entries'].move_to_end(key)
+            cache['hits'] += 1
+            return entry[0]
+        cache['misses'] += 1
+    
+    fig = build_figure()
+    size = len(fig.to_json())
+    
+    with cache['lock']:
+        if key not in cache['entries']:
+            cache['entries'][key] = (fig, size)
+            cache['bytes'] += size
+        # Evict least recently used figures until both limits hold
+        while cache['entries'] and (len(cache['entries']) > cache['max_entries'] or cache['bytes'] > cache['max_bytes']):
+            _, (_, evicted_size) = cache['entries'].popitem(last=False)
+            cache['bytes'] -= evicted_size
+            cache['evictions'] += 1
+    return fig
+
+def get_figure_cache_stats():
+    """Get hit, miss and memory counters for the figure cache"""
+    cache = get_figure_cache()
+    with cache['lock']:
+        lookups = cache['hits'] + cache['misses']
+        return {
+            'entries': len(cache['entries']),
+            'bytes': cache['bytes'],
+            'hits': cache['hits'],
+            'misses': cache['misses'],
+            'evictions': cache['evictions'],
+            'hit_rate': cache['hits'] / lookups if lookups else 0.0
+        }
+
 def generate_pdf_report(report_data, report_type="Complete Health Report"):
     """Generate PDF report using ReportLab"""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib import colors
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import inch
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
+    from reportlab.lib.enums import TA_CENTER
+    
     buffer = io.BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=A4)
     styles = getSampleStyleSheet()
@@ -1427,7 +3528,7 @@ def generate_pdf_report(report_data, report_type="Complete Health Report"):
     if medications:
         med_data = [['Name', 'Dosage', 'Type', 'Frequency', 'Time', 'Status']]
         for med in medications:
-            status = "Taken" if med.get('taken_today', False) else "Pending"
+            status = get_dose_status(med)
             med_data.append([
                 med.get('name', 'N/A'),
                 med.get('dosageAmount', 'N/A'),
@@ -1454,6 +3555,32 @@ def generate_pdf_report(report_data, report_type="Complete Health Report"):
     
     story.append(Spacer(1, 20))
     
+    timeliness = report_data.get('timeliness')
+    if timeliness and timeliness['doses']:
+        story.append(Paragraph(f"⏱️ DOSE TIMELINESS ({timeliness['doses']} timed doses)", heading_style))
+        story.append(Spacer(1, 10))
+        story.append(Paragraph(f"<b>Median delay:</b> {timeliness['median_delay']:+.0f} min &nbsp; "
+                               f"<b>On time (within {timeliness['on_time_minutes']} min):</b> {timeliness['on_time_pct']:.0f}%", normal_style))
+        
+        timing_data = [['Medication', 'Doses', 'Median Delay', '90th Pct Delay', 'On Time', 'Late']]
+        for row in timeliness['by_medication'].itertuples():
+            timing_data.append([row.medication, row.doses, f"{row.median_delay:+.0f} min", f"{row.p90_delay:+.0f} min",
+                                f"{row.on_time_pct:.0f}%", f"{row.late_pct:.0f}%"])
+        
+        timing_table = Table(timing_data, colWidths=[2.5*inch, 0.8*inch, 1.2*inch, 1.2*inch, 0.9*inch, 0.8*inch])
+        timing_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#8B5CF6')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ]))
+        story.append(timing_table)
+        story.append(Spacer(1, 20))
+    
     appointments = report_data.get('appointments', [])
     story.append(Paragraph(f"👨‍⚕️ APPOINTMENTS ({len(appointments)})", heading_style))
     story.append(Spacer(1, 10))
@@ -1520,9 +3647,84 @@ def generate_pdf_report(report_data, report_type="Complete Health Report"):
     story.append(Paragraph("Generated by MedTimer - Your Medication Management Companion", normal_style))
     story.append(Paragraph("=" * 70, normal_style))
     
-    doc.build(story)
-    buffer.seek(0)
-    return buffer.getvalue()
+    doc.build(story)
+    buffer.seek(0)
+    return buffer.getvalue()
+
+@st.cache_resource
+def get_report_jobs(max_workers=2, max_entries=32):
+    """Get the worker pool that builds PDF reports and the recent builds, keyed by what each report contains"""
+    return {
+        'pool': ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='medtimer-report'),
+        'jobs': OrderedDict(),
+        'max_entries': max_entries,
+        'lock': threading.Lock()
+    }
+
+def get_report_data_version(report_data):
+    """Fingerprint the data a report is built from"""
+    # The dose history is append-only, so its version stands in for hashing every event
+    return fingerprint_inputs(
+        st.session_state.get('history_version', 0),
+        report_data['profile'],
+        report_data['medications'],
+        report_data['appointments'],
+        report_data['side_effects'],
+        report_data['adherence_history']
+    )
+
+def submit_report_job(report_data, report_type):
+    """Queue a PDF build unless the same report is already built or building; returns (key, reused)"""
+    jobs = get_report_jobs()
+    key = fingerprint_inputs(report_type, report_data['start_date'], report_data['end_date'], get_report_data_version(report_data))
+    
+    with jobs['lock']:
+        job = jobs['jobs'].get(key)
+        reused = job is not None and not (job['future'].done() and job['future'].exception() is not None)
+        if not reused:
+            # The worker gets its own copy, so later edits in the session can't change a report mid-build
+            jobs['jobs'][key] = job = {
+                'future': jobs['pool'].submit(generate_pdf_report, copy.deepcopy(report_data), report_type),
+                'report_type': report_type,
+                'submitted': time.time()
+            }
+        jobs['jobs'].move_to_end(key)
+        # Drop the least recently requested reports, but never one that is still building
+        while len(jobs['jobs']) > jobs['max_entries'] and next(iter(jobs['jobs'].values()))['future'].done():
+            jobs['jobs'].popitem(last=False)
+    return key, reused
+
+def report_job_panel(building):
+    """Show the session's PDF job: its progress while it builds, then the download"""
+    job = get_report_jobs()['jobs'].get(st.session_state.get('report_job'))
+    if job is None:
+        return
+    future = job['future']
+    
+    if not future.done():
+        state = "Building" if future.running() else "Waiting for a free worker"
+        with st.status(f"⏳ {state}: {job['report_type']} PDF ({time.time() - job['submitted']:.0f}s)", state='running'):
+            st.caption("You can keep using MedTimer while the report is built; the download appears here.")
+        return
+    if building:
+        # A full rerun draws the finished panel without the once-a-second refresh
+        st.rerun()
+    
+    if future.exception() is not None:
+        st.error(f"The PDF report could not be generated: {future.exception()}")
+        return
+    
+    st.success("PDF report generated successfully!")
+    if st.session_state.get('report_job_reused'):
+        st.caption("Nothing in this report changed since it was last built, so it was ready straight away.")
+    st.download_button(
+        label="⬇️ Download PDF Report",
+        data=future.result(),
+        file_name=f"medtimer_report_{datetime.fromtimestamp(job['submitted']).strftime('%Y%m%d_%H%M%S')}.pdf",
+        mime="application/pdf",
+        key="download_report_pdf",
+        use_container_width=True
+    )
 
 def account_type_selection_page():
     """Landing page for selecting account type"""
@@ -1645,8 +3847,11 @@ def caregiver_login_page():
             
             if st.button("🔗 Connect", use_container_width=True):
                 if caregiver_username and patient_code:
-                    st.info(f"Demo: Connecting {caregiver_username} to patient with code {patient_code}")
-                    if load_user_data(caregiver_username):
+                    if not load_user_data(caregiver_username):
+                        st.error("Caregiver not found. Please sign up first!")
+                    elif not connect_caregiver(caregiver_username, patient_code):
+                        st.error("No patient has this access code. Please check it with your patient.")
+                    else:
                         st.session_state.page = 'caregiver_dashboard'
                         st.rerun()
         
@@ -1797,7 +4002,7 @@ def patient_signup_page():
             if st.button("➕ Add Medication"):
                 if med_name and dosage_amount:
                     med_data = {
-                        'id': len(st.session_state.signup_data['medications']) + 1,
+                        'id': max((m['id'] for m in st.session_state.signup_data['medications']), default=0) + 1,
                         'name': med_name,
                         'dosageType': dosage_type.lower(),
                         'dosageAmount': dosage_amount,
@@ -1860,6 +4065,7 @@ def patient_signup_page():
                 
                 st.session_state.medications = st.session_state.signup_data.get('medications', [])
                 save_user_data()
+                publish_achievement_event('session_loaded')
                 
                 st.session_state.signup_step = 1
                 st.session_state.signup_data = {}
@@ -1938,38 +4144,187 @@ def get_mascot_text_color(mood):
     }
     return colors.get(mood, '#374151')
 
-def display_datetime_header():
-    """Display real-time date and time header - FIXED VERSION WITHOUT AUTO-REFRESH"""
-    now = datetime.now()
-    current_time = now.strftime("%I:%M:%S %p")
-    current_date = now.strftime("%A, %B %d, %Y")
-    
-    st.markdown(f"""
-    <div class='datetime-display'>
-        <h2>{current_time}</h2>
-        <p>{current_date}</p>
+def get_clock_schedule(upcoming, limit=5):
+    """Upcoming doses for the live clock, with due times as epoch milliseconds"""
+    # Slot times are in the user's timezone, and upcoming is picked on the user's clock too,
+    # so the epoch comes from their offset rather than the server's clock
+    utc_offset = st.session_state.get('utc_offset_minutes', get_user_utc_offset())
+    user_tz = timezone(timedelta(minutes=utc_offset))
+    today = get_local_date(utc_offset)
+    return [{
+        'label': f"{med['name']} ({med['dosageAmount']})",
+        'time': format_time(med['time']),
+        'due': int(datetime.strptime(f"{today} {med['time']}", "%Y-%m-%d %H:%M").replace(tzinfo=user_tz).timestamp() * 1000)
+    } for med in upcoming[:limit]]
+
+@profiled('media')
+def display_datetime_header(upcoming=None):
+    """Display a live clock and upcoming-dose countdowns that tick in the browser without reruns"""
+    schedule = get_clock_schedule(upcoming or [])
+    # The markup only changes with the schedule, so reruns leave the running clock in place
+    clock_html = f"""
+    <div style="background: rgba(255, 255, 255, 0.15); border-radius: 16px; padding: 16px 30px; text-align: center;
+                border: 1px solid rgba(255, 255, 255, 0.2); font-family: 'Source Sans Pro', sans-serif; color: #ffffff;">
+        <h2 id="clock-time" style="margin: 0; font-size: 48px; font-weight: 900; text-shadow: 2px 2px 4px rgba(0, 0, 0, 0.2);"></h2>
+        <p id="clock-date" style="margin: 5px 0 0 0; font-size: 20px; font-weight: 500; opacity: 0.9;"></p>
+        <div id="clock-doses" style="margin-top: 8px; font-size: 16px;"></div>
     </div>
-    """, unsafe_allow_html=True)
+    <script>
+        const doses = {json.dumps(schedule)};
+        function pad(value) {{ return String(value).padStart(2, '0'); }}
+        function tick() {{
+            const now = new Date();
+            document.getElementById('clock-time').textContent = now.toLocaleTimeString([], {{hour: '2-digit', minute: '2-digit', second: '2-digit'}});
+            document.getElementById('clock-date').textContent = now.toLocaleDateString([], {{weekday: 'long', year: 'numeric', month: 'long', day: 'numeric'}});
+            // A dose stays listed as due for five minutes, matching the reminder window
+            document.getElementById('clock-doses').innerHTML = doses
+                .filter(dose => dose.due - now > -5 * 60000)
+                .map(dose => {{
+                    const seconds = Math.round((dose.due - now) / 1000);
+                    const countdown = seconds <= 0 ? '🔔 due now'
+                        : seconds < 3600 ? `⏰ in ${{Math.floor(seconds / 60)}}:${{pad(seconds % 60)}}`
+                        : `at ${{dose.time}}`;
+                    return `<div style="font-weight: ${{seconds <= 1800 ? 700 : 400}};">${{dose.label}} ${{countdown}}</div>`;
+                }})
+                .join('');
+        }}
+        tick();
+        setInterval(tick, 1000);
+    </script>
+    """
+    components.html(clock_html, height=130 + 24 * len(schedule))
+
+def get_fragment_dependencies():
+    """Map each kind of change to the dashboard fragments that display it"""
+    return {
+        'doses': ['dose_overview', 'medication_list'],
+        'reminders': ['dose_overview']
+    }
+
+def dashboard_fragment(fragment_key, run_every=None):
+    """Make a fragment that callbacks can rerun by key, where the Streamlit release supports it"""
+    if 'key' in inspect.signature(st.fragment).parameters:
+        return st.fragment(key=fragment_key, run_every=run_every)
+    return st.fragment(run_every=run_every)
+
+def mark_fragment_rendered(fragment_key):
+    """Note that a fragment is on screen, or hand the rerun to the full app when a change asked for one"""
+    if st.session_state.pop('full_rerun_requested', False):
+        st.rerun()
+    st.session_state.rendered_fragments.add(fragment_key)
+
+def refresh_fragments(change, previous_mood=None):
+    """Rerun only the on-screen fragments that show a change; call from a widget callback"""
+    fragment_keys = [key for key in get_fragment_dependencies()[change] if key in st.session_state.rendered_fragments]
+    mood_changed = False
+    if previous_mood is not None:
+        refresh_mascot_mood(calculate_adherence(st.session_state.medications), sync_adherence_stats())
+        mood_changed = st.session_state.turtle_mood != previous_mood
+    keyed_reruns = 'key' in inspect.signature(st.fragment).parameters
+    # The header mascot and achievement toasts live outside the fragments, so changes to them need the full app.
+    # Without keyed reruns only the clicked fragment reruns, which is enough when it is the one fragment showing the change.
+    if not fragment_keys or mood_changed or st.session_state.new_achievements or (not keyed_reruns and len(fragment_keys) > 1):
+        # st.rerun() does nothing inside callbacks on older releases, so the fragment that reruns next passes it on
+        st.session_state.full_rerun_requested = True
+        return
+    if keyed_reruns:
+        st.rerun(fragment_keys)
+
+def handle_dose_action(medication_id, slot_times, action='taken', play_sound=False):
+    """Take or skip dose slots from a button, then refresh the views that show doses"""
+    previous_mood = st.session_state.turtle_mood
+    med = next((m for m in st.session_state.medications if m['id'] == medication_id), None)
+    if not med:
+        return
     
-    # REMOVED: time.sleep(0.1) and st.rerun() - This was causing the infinite loop
+    for slot_time in slot_times:
+        record_dose_event(medication_id, slot_time, action)
+    update_adherence_history()
+    if action == 'taken':
+        push_undo_state('medication_taken', {'med_id': medication_id, 'med_name': med['name'],
+                                             'time': slot_times[0] if slot_times else med.get('time', '00:00'), 'slots': list(slot_times)})
+        st.session_state.pending_dose_sound = play_sound
+    save_user_data()
+    refresh_fragments('doses', previous_mood)
+
+def handle_snooze_action(medication_id, slot_time, minutes):
+    """Snooze a due dose from a button and refresh the due-now panel"""
+    snooze_dose(medication_id, slot_time, minutes)
+    refresh_fragments('reminders')
+
+def play_pending_dose_sound():
+    """Play the sound queued by a dose action once the refreshed view is drawn"""
+    if st.session_state.pop('pending_dose_sound', False):
+        play_notification_sound()
+
+def refresh_mascot_mood(adherence, adherence_stats):
+    """Set the mascot mood from the past week, or from today until there is a week of history"""
+    weekly_adherence = get_rolling_adherence(adherence_stats, 7)
+    # The mood follows the past week once there is one, so mornings do not start out worried
+    update_mascot_mood(weekly_adherence if weekly_adherence is not None else adherence)
 
+@profiled('tab')
 def dashboard_overview_tab(age_category):
     """Dashboard overview with stats and today's schedule"""
     st.markdown("<h3 style='color: #ffffff;'>📊 Your Health Overview</h3>", unsafe_allow_html=True)
     
-    # Display real-time date/time
-    display_datetime_header()
+    dose_overview_fragment(age_category)
+    
+    with st.expander("🤝 Share with a Caregiver", expanded=False):
+        st.code(get_patient_access_code(st.session_state.user_profile['username']), language=None)
+        st.caption("Give this access code to a caregiver so they can follow your adherence and be alerted about ignored reminders.")
+
+@dashboard_fragment('dose_overview')
+@profiled('fragment')
+def dose_overview_fragment(age_category):
+    """Stat cards, due-now panel, status donut and today's schedule, rerun together after a dose action"""
+    # One fragment rather than one per panel: without keyed reruns (Streamlit 1.50) a change shown by
+    # several fragments costs a full app rerun, while this reruns once on any release
+    # Fragment reruns skip the page's day check, so a new day goes back to the full app
+    if st.session_state.open_date and get_session_local_date() > st.session_state.open_date:
+        st.rerun()
+    mark_fragment_rendered('dose_overview')
+    
+    dose_stats_panel()
+
+    col_sound_left, col_sound_right = st.columns([4, 1])
+    with col_sound_right:
+        if st.button("🔊" if st.session_state.sound_enabled else "🔇", use_container_width=True):
+            st.session_state.sound_enabled = not st.session_state.sound_enabled
+            st.rerun()
+
+    st.markdown("<h3 style='color: #ffffff;'>### 🕐 Today's Medication Schedule</h3>", unsafe_allow_html=True)
+    
+    due_now_panel()
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        dose_status_chart_panel()
+    
+    with col2:
+        st.plotly_chart(create_medication_pie_chart(st.session_state.medications, age_category), use_container_width=True)
     
+    st.markdown("<br>", unsafe_allow_html=True)
+    
+    todays_schedule_panel()
+
+@profiled('fragment')
+def dose_stats_panel():
+    """Stat cards, streaks and the mascot message"""
     missed, upcoming, taken = categorize_medications_by_status()
     
+    # Live date/time and countdowns, redrawn here so a dose action drops the dose from the countdown
+    display_datetime_header(upcoming)
+    
     col1, col2, col3, col4 = st.columns(4)
     
     total_meds = len(st.session_state.medications)
     taken_today = sum(1 for med in st.session_state.medications if med.get('taken_today', False))
     total_appointments = len(st.session_state.appointments)
     adherence = calculate_adherence(st.session_state.medications)
-    
-    update_mascot_mood(adherence)
+    adherence_stats = sync_adherence_stats()
+    refresh_mascot_mood(adherence, adherence_stats)
     
     with col1:
         st.markdown(f"""
@@ -2006,16 +4361,39 @@ def dashboard_overview_tab(age_category):
     
     st.markdown("<br>", unsafe_allow_html=True)
     
+    streak_cols = st.columns(4)
+    with streak_cols[0]:
+        st.markdown(f"""
+        <div class='stat-card'>
+            <div class='stat-number'>🔥 {adherence_stats['current_streak']}</div>
+            <div class='stat-label'>Logged-Day Streak (best {adherence_stats['longest_streak']})</div>
+        </div>
+        """, unsafe_allow_html=True)
+    for col, window_days in zip(streak_cols[1:], (7, 30, 90)):
+        rolling = get_rolling_adherence(adherence_stats, window_days)
+        rolling_label = '-' if rolling is None else f"{rolling:.0f}%"
+        with col:
+            st.markdown(f"""
+            <div class='stat-card'>
+                <div class='stat-number'>{rolling_label}</div>
+                <div class='stat-label'>Last {window_days} Logged Days</div>
+            </div>
+            """, unsafe_allow_html=True)
+    st.caption("Streaks and averages count the days you have an adherence record for; days without one are left out, not counted as 0%.")
+    
+    st.markdown("<br>", unsafe_allow_html=True)
+    
     show_undo_button()
     
     time_of_day = get_time_of_day().lower().replace('👋 ', '')
     mascot_message = get_mascot_message(adherence, time_of_day)
+    if adherence_stats['current_streak'] >= 3:
+        mascot_message += f" 🔥 {adherence_stats['current_streak']} perfect logged days in a row!"
     mascot_color = get_mascot_text_color(st.session_state.turtle_mood)
-    mascot_img = get_mascot_image(st.session_state.turtle_mood)
     st.markdown(
         f"""
         <div style="background: #f06060; border-radius: 16px; padding: 20px; box-shadow: 0 6px 12px rgba(0,0,0,0.12); text-align: center;">
-            <div style="font-size: 48px; margin-bottom: 10px;">{mascot_img}</div>
+            <div style="margin-bottom: 10px;">{get_mascot_html(st.session_state.turtle_mood, 48)}</div>
             <p style="font-size: 18px; color: #000000 !important;">
                 {mascot_message}
             </p>
@@ -2024,78 +4402,79 @@ def dashboard_overview_tab(age_category):
         unsafe_allow_html=True
     )
 
-    col_sound_left, col_sound_right = st.columns([4, 1])
-    with col_sound_right:
-        if st.button("🔊" if st.session_state.sound_enabled else "🔇", use_container_width=True):
-            st.session_state.sound_enabled = not st.session_state.sound_enabled
-            st.rerun()
-
-    st.markdown("<h3 style='color: #ffffff;'>### 🕐 Today's Medication Schedule</h3>", unsafe_allow_html=True)
-    
-    due_meds = check_due_medications(st.session_state.medications)
-    
-    if due_meds:
+@profiled('fragment')
+def due_now_panel():
+    """Doses due now and in the next 30 minutes, refreshed when the push channel says a dose came due"""
+    missed, upcoming, taken = categorize_medications_by_status()
+    # A push event sets the component's value, which reruns just the overview fragment; nothing polls in between
+    get_push_component()(port=start_push_server(), url=get_push_settings()['url'],
+                         token=subscribe_push(st.session_state.user_profile['username']),
+                         schedule=get_clock_schedule(upcoming), key='dose_push', default=None)
+    process_reminder_timers()
+    open_reminders = get_open_dose_reminders()
+    due_doses = []
+    for med in check_due_medications(st.session_state.medications):
+        # Find the due time for this medication
+        med_time = med.get('time', '00:00')
+        
+        # Check if any reminder time is due
+        if med.get('reminder_times'):
+            resolved_slots = get_resolved_slots(med)
+            now = get_session_local_time()
+            
+            for reminder_time in med['reminder_times']:
+                if reminder_time not in resolved_slots:
+                    reminder_datetime = datetime.strptime(reminder_time, "%H:%M").replace(
+                        year=now.year, month=now.month, day=now.day
+                    )
+                    time_diff = abs((now - reminder_datetime).total_seconds() / 60)
+                    if time_diff <= 5:
+                        med_time = reminder_time
+                        break
+        
+        reminder = open_reminders.get((med['id'], med_time))
+        # A snoozed dose stays hidden until its timer rings again
+        if reminder and reminder['snoozed'] and not reminder['ringing']:
+            continue
+        if not reminder:
+            start_dose_reminder(med['id'], med_time)
+        due_doses.append((med, med_time))
+    
+    # Snoozed reminders ring again here once their timer fires, even after the due window
+    for (med_id, slot_time), reminder in open_reminders.items():
+        if reminder['snoozed'] and reminder['ringing'] and not any(med['id'] == med_id and med_time == slot_time for med, med_time in due_doses):
+            for med in st.session_state.medications:
+                if med['id'] == med_id and slot_time not in get_resolved_slots(med):
+                    due_doses.append((med, slot_time))
+    
+    if due_doses:
         if st.session_state.sound_enabled:
             play_reminder_sound()
         
-        for med in due_meds:
-            # Find the due time for this medication
-            med_time = med.get('time', '00:00')
+        for med, med_time in due_doses:
             due_time_display = format_time(med_time)
-            
-            # Check if any reminder time is due
-            if med.get('reminder_times'):
-                taken_time_slots = med.get('taken_time_slots', [])
-                now = datetime.now()
-                current_time = now.strftime("%H:%M")
-                
-                for reminder_time in med['reminder_times']:
-                    if reminder_time not in taken_time_slots:
-                        reminder_datetime = datetime.strptime(reminder_time, "%H:%M").replace(
-                            year=now.year, month=now.month, day=now.day
-                        )
-                        time_diff = abs((now - reminder_datetime).total_seconds() / 60)
-                        if time_diff <= 5:
-                            med_time = reminder_time
-                            due_time_display = format_time(reminder_time)
-                            break
+            reminder = open_reminders.get((med['id'], med_time))
             
             st.markdown(f"""
             <div class='reminder-item'>
                 <strong>🔔 REMINDER NOW:</strong> {med['name']} ({med['dosageAmount']}) at {due_time_display}
             </div>
             """, unsafe_allow_html=True)
+            if reminder and reminder['escalated']:
+                st.caption("🚨 This reminder was ignored several times and your caregiver has been alerted.")
             
-            if st.button("✓ Take Now", key=f"take_due_{med['id']}_{med_time.replace(':', '')}", use_container_width=True):
-                for m in st.session_state.medications:
-                    if m['id'] == med['id']:
-                        # Initialize taken_time_slots if not exists
-                        if 'taken_time_slots' not in m:
-                            m['taken_time_slots'] = []
-                        
-                        # Mark this specific time slot as taken
-                        if med_time not in m['taken_time_slots']:
-                            m['taken_time_slots'].append(med_time)
-                        
-                        # Mark medication as taken if all time slots are taken
-                        all_slots_taken = True
-                        if m.get('reminder_times'):
-                            for slot in m['reminder_times']:
-                                if slot not in m.get('taken_time_slots', []):
-                                    all_slots_taken = False
-                                    break
-                        
-                        # If no reminder times, or main time just taken
-                        if not m.get('reminder_times'):
-                            all_slots_taken = True
-                        
-                        m['taken_today'] = all_slots_taken
-                        
-                        update_medication_history(m['id'], 'taken')
-                        update_adherence_history()
-                        push_undo_state('medication_taken', {'med_id': med['id'], 'med_name': med['name'], 'time': med_time})
-                        save_user_data()
-                        st.rerun()
+            slot_key = f"{med['id']}_{med_time.replace(':', '')}"
+            take_col, skip_col, *snooze_cols = st.columns([3, 1, 1, 1, 1])
+            with take_col:
+                st.button("✓ Take Now", key=f"take_due_{slot_key}", use_container_width=True,
+                          on_click=handle_dose_action, args=(med['id'], [med_time], 'taken'))
+            with skip_col:
+                st.button("✕ Skip", key=f"skip_due_{slot_key}", use_container_width=True,
+                          on_click=handle_dose_action, args=(med['id'], [med_time], 'skipped'))
+            for snooze_col, minutes in zip(snooze_cols, (5, 10, 30)):
+                with snooze_col:
+                    st.button(f"💤 {minutes}m", key=f"snooze_due_{slot_key}_{minutes}", help=f"Snooze for {minutes} minutes",
+                              use_container_width=True, on_click=handle_snooze_action, args=(med['id'], med_time, minutes))
     else:
         st.info("No medications due right now.")
     
@@ -2103,10 +4482,9 @@ def dashboard_overview_tab(age_category):
     st.markdown("<h4 style='color: #ffffff;'>#### 📅 Upcoming Reminders (Next 30 minutes)</h4>", unsafe_allow_html=True)
     
     upcoming_count = 0
+    now = get_session_local_time()
     for med in upcoming[:5]:
-        med_time = datetime.strptime(med['time'], "%H:%M")
-        now = datetime.now()
-        time_diff = (med_time - now).total_seconds() / 60
+        time_diff = time_to_minutes(med['time']) - (now.hour * 60 + now.minute)
         
         if 0 < time_diff <= 30:
             st.markdown(f"""
@@ -2123,16 +4501,20 @@ def dashboard_overview_tab(age_category):
     
     if has_upcoming_reminder:
         st.markdown("<br>", unsafe_allow_html=True)
-    
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        st.plotly_chart(create_medication_status_donut(st.session_state.medications), use_container_width=True)
-    
-    with col2:
-        st.plotly_chart(create_medication_pie_chart(st.session_state.medications, age_category), use_container_width=True)
-    
-    st.markdown("<br>", unsafe_allow_html=True)
+
+@profiled('fragment')
+def dose_status_chart_panel():
+    """Today's taken/missed/upcoming donut"""
+    st.plotly_chart(create_medication_status_donut(st.session_state.medications), use_container_width=True)
+
+@profiled('fragment')
+def todays_schedule_panel():
+    """Missed, upcoming, taken and skipped medication cards for today"""
+    play_pending_dose_sound()
+    missed, upcoming, taken = categorize_medications_by_status()
+    # Snoozed doses belong to the due-now panel, which shows them again when their timer rings
+    today_status = st.session_state.dose_status.get(get_session_local_date(), {})
+    missed = [med for med in missed if today_status.get((med['id'], med['time'])) != 'snoozed']
     
     st.markdown("<h3 style='color: #ffffff;'>### 📅 Active Reminders</h3>", unsafe_allow_html=True)
     if st.session_state.medications:
@@ -2152,44 +4534,14 @@ def dashboard_overview_tab(age_category):
                 </div>
                 """, unsafe_allow_html=True)
                 
-                col1, col2 = st.columns([3, 1])
+                col1, col2, col3 = st.columns([2, 1, 1])
+                unique_key = med.get('unique_key', f"missed_{med['id']}")
                 with col2:
-                    unique_key = med.get('unique_key', f"missed_{med['id']}")
-                    if st.button("✓ Take Now", key=f"take_missed_{unique_key}", use_container_width=True):
-                        for m in st.session_state.medications:
-                            if m['id'] == med['id']:
-                                # Initialize taken_time_slots if not exists
-                                if 'taken_time_slots' not in m:
-                                    m['taken_time_slots'] = []
-                                
-                                # Mark this specific time slot as taken
-                                missed_time = med['time']
-                                if missed_time not in m['taken_time_slots']:
-                                    m['taken_time_slots'].append(missed_time)
-                                
-                                # Check if all time slots are now taken
-                                all_slots_taken = True
-                                if m.get('reminder_times'):
-                                    for slot in m['reminder_times']:
-                                        if slot not in m.get('taken_time_slots', []):
-                                            all_slots_taken = False
-                                            break
-                                
-                                # If no reminder times, or main time just taken
-                                if not m.get('reminder_times'):
-                                    all_slots_taken = True
-                                
-                                # Also check main time
-                                if m.get('time') in m['taken_time_slots']:
-                                    all_slots_taken = True
-                                
-                                m['taken_today'] = all_slots_taken
-                                
-                                update_medication_history(m['id'], 'taken')
-                                push_undo_state('medication_taken', {'med_id': med['id'], 'med_name': med['name'], 'time': missed_time})
-                        update_adherence_history()
-                        save_user_data()
-                        st.rerun()
+                    st.button("✓ Take Now", key=f"take_missed_{unique_key}", use_container_width=True,
+                              on_click=handle_dose_action, args=(med['id'], [med['time']], 'taken'))
+                with col3:
+                    st.button("✕ Skip", key=f"skip_missed_{unique_key}", use_container_width=True,
+                              on_click=handle_dose_action, args=(med['id'], [med['time']], 'skipped'))
                 st.markdown("", unsafe_allow_html=True)
         
         if upcoming:
@@ -2212,42 +4564,8 @@ def dashboard_overview_tab(age_category):
                 col1, col2 = st.columns([3, 1])
                 with col2:
                     unique_key = med.get('unique_key', f"upcoming_{med['id']}")
-                    if st.button("\u2713 Take Now", key=f"take_upcoming_{unique_key}", use_container_width=True):
-                        for m in st.session_state.medications:
-                            if m['id'] == med['id']:
-                                # Initialize taken_time_slots if not exists
-                                if 'taken_time_slots' not in m:
-                                    m['taken_time_slots'] = []
-                                
-                                # Mark this specific time slot as taken
-                                upcoming_time = med['time']
-                                if upcoming_time not in m['taken_time_slots']:
-                                    m['taken_time_slots'].append(upcoming_time)
-                                
-                                # Check if all time slots are now taken
-                                all_slots_taken = True
-                                if m.get('reminder_times'):
-                                    for slot in m['reminder_times']:
-                                        if slot not in m.get('taken_time_slots', []):
-                                            all_slots_taken = False
-                                            break
-                                
-                                # If no reminder times, or main time just taken
-                                if not m.get('reminder_times'):
-                                    all_slots_taken = True
-                                
-                                # Also check main time
-                                if m.get('time') in m['taken_time_slots']:
-                                    all_slots_taken = True
-                                
-                                m['taken_today'] = all_slots_taken
-                                
-                                update_medication_history(m['id'], 'taken')
-                                play_notification_sound()
-                                push_undo_state('medication_taken', {'med_id': med['id'], 'med_name': med['name'], 'time': upcoming_time})
-                        update_adherence_history()
-                        save_user_data()
-                        st.rerun()
+                    st.button("\u2713 Take Now", key=f"take_upcoming_{unique_key}", use_container_width=True,
+                              on_click=handle_dose_action, args=(med['id'], [med['time']], 'taken', True))
                 st.markdown("", unsafe_allow_html=True)
         
         if taken:
@@ -2264,34 +4582,190 @@ def dashboard_overview_tab(age_category):
                     <span class='status-taken'>✅ Taken</span>
                 </div>
                 """, unsafe_allow_html=True)
+        
+        skipped = [med for med in st.session_state.medications if get_dose_status(med) == 'Skipped']
+        if skipped:
+            st.markdown("<h4 style='color: #ffffff;'>#### ⏭️ Skipped Medications</h4>", unsafe_allow_html=True)
+            for med in skipped:
+                color_hex = get_medication_color_hex(med.get('color', 'blue'))
+                st.markdown(f"""
+                <div class='medication-card' style='border-left: 4px solid #9ca3af; background: linear-gradient(to right, #f3f4f6, white);'>
+                    <div style='display: flex; align-items: center;'>
+                        <div class='color-dot' style='background-color: {color_hex};'></div>
+                        <strong>{med['name']}</strong> ({med['dosageAmount']})
+                    </div>
+                    <p style='margin: 5px 0;'>⏰ {format_time(med.get('time', 'N/A'))}</p>
+                    <span class='status-skipped'>⏭️ Skipped</span>
+                </div>
+                """, unsafe_allow_html=True)
     else:
         st.info("No medications scheduled. Add medications in the Medications tab.")
 
+def get_adherence_trend_figure(adherence_history, age_category, trend_range='All'):
+    """Get the cached adherence trend chart for a 1M/3M/1Y/All range"""
+    range_days = {'1M': 30, '3M': 90, '1Y': 365}.get(trend_range)
+    date_range = None
+    if range_days:
+        today = get_session_local_date()
+        date_range = ((datetime.strptime(today, "%Y-%m-%d") - timedelta(days=range_days - 1)).strftime("%Y-%m-%d"), today)
+    return cached_figure('adherence_line', fingerprint_inputs([(h['date'], h['adherence']) for h in adherence_history], age_category, date_range),
+                         lambda: create_adherence_line_chart(adherence_history, age_category, date_range=date_range))
+
+def get_history_fingerprint(medication_history, medications):
+    """Fingerprint the logged-in user's dose history and schedule for figure caching"""
+    # The history is append-only, so its version stands in for hashing every event
+    return fingerprint_inputs(
+        (st.session_state.get('user_profile') or {}).get('username'),
+        st.session_state.get('history_version', len(medication_history)),
+        [(med['id'], get_medication_slots(med)) for med in medications],
+        get_session_local_date()
+    )
+
+def get_weekly_heatmap_figure(medication_history, medications):
+    """Get the cached weekly heatmap for the logged-in user"""
+    return cached_figure('weekly_heatmap', get_history_fingerprint(medication_history, medications),
+                         lambda: create_weekly_heatmap(medication_history, medications))
+
+def get_prefetch_key():
+    """Get a cheap marker of the data behind the hidden sections, so their caches are warmed once per change"""
+    adherence_history = st.session_state.get('adherence_history', [])
+    latest_adherence = adherence_history[-1] if adherence_history else {}
+    return (
+        (st.session_state.get('user_profile') or {}).get('username'),
+        st.session_state.get('history_version', 0),
+        len(st.session_state.side_effects),
+        len(adherence_history),
+        (latest_adherence.get('date'), latest_adherence.get('adherence')),
+        tuple((med['id'], tuple(get_medication_slots(med))) for med in st.session_state.medications),
+        st.session_state.get('adherence_trend_range'),
+        get_session_local_date()
+    )
+
+def prefetch_analytics(age_category):
+    """Warm the caches behind the analytics tab's most expensive charts"""
+    get_adherence_trend_figure(st.session_state.get('adherence_history', []), age_category,
+                               st.session_state.get('adherence_trend_range', 'All'))
+    get_weekly_heatmap_figure(st.session_state.get('medication_history', []), st.session_state.medications)
+    get_session_dose_timeliness()
+
+@profiled('tab')
 def analytics_tab(age_category):
     """Analytics tab with comprehensive graphs"""
     st.markdown("<h3 style='color: #ffffff;'>📊 Medication Analytics & Insights</h3>", unsafe_allow_html=True)
     
+    adherence_history = st.session_state.get('adherence_history', [])
+    medications = st.session_state.medications
+    side_effects = st.session_state.side_effects
+    medication_history = st.session_state.get('medication_history', [])
+    
     st.markdown("<h4 style='color: #ffffff;'>#### Adherence Trend</h4>", unsafe_allow_html=True)
-    st.plotly_chart(
-        create_adherence_line_chart(st.session_state.get('adherence_history', []), age_category),
-        use_container_width=True
-    )
+    trend_range = st.radio("Range", ["1M", "3M", "1Y", "All"], index=3, horizontal=True, key="adherence_trend_range")
+    st.plotly_chart(get_adherence_trend_figure(adherence_history, age_category, trend_range), use_container_width=True)
     
     st.markdown("<br>", unsafe_allow_html=True)
     
     col1, col2 = st.columns(2)
     
     with col1:
-        st.plotly_chart(create_daily_schedule_bar_chart(st.session_state.medications, age_category), use_container_width=True)
+        schedule_inputs = [(med.get('time'), med.get('color')) for med in medications]
+        st.plotly_chart(
+            cached_figure('daily_schedule', fingerprint_inputs(schedule_inputs, age_category),
+                          lambda: create_daily_schedule_bar_chart(medications, age_category)),
+            use_container_width=True
+        )
     
     with col2:
-        st.plotly_chart(create_side_effects_bar_chart(st.session_state.side_effects), use_container_width=True)
+        severities = [effect.get('severity', 'Mild') for effect in side_effects]
+        st.plotly_chart(
+            cached_figure('side_effects', fingerprint_inputs(severities),
+                          lambda: create_side_effects_bar_chart(side_effects)),
+            use_container_width=True
+        )
     
     st.markdown("<br>", unsafe_allow_html=True)
     
     st.markdown("<h4 style='color: #ffffff;'>#### Weekly Medication Pattern</h4>", unsafe_allow_html=True)
-    st.plotly_chart(create_weekly_heatmap(st.session_state.get('medication_history', [])), use_container_width=True)
+    st.plotly_chart(get_weekly_heatmap_figure(medication_history, medications), use_container_width=True)
+    
+    st.markdown("<br>", unsafe_allow_html=True)
+    
+    st.markdown("<h4 style='color: #ffffff;'>#### Dose Timeliness</h4>", unsafe_allow_html=True)
+    timeliness = summarize_dose_timeliness(get_session_dose_timeliness(), medications)
+    timeliness_key = get_history_fingerprint(medication_history, medications)
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.plotly_chart(cached_figure('timeliness_histogram', timeliness_key, lambda: create_timeliness_histogram(timeliness)),
+                        use_container_width=True)
+    
+    with col2:
+        st.plotly_chart(cached_figure('timeliness_time_of_day', timeliness_key, lambda: create_timeliness_by_time_of_day_chart(timeliness)),
+                        use_container_width=True)
+    
+    if not timeliness['by_medication'].empty:
+        st.dataframe(
+            timeliness['by_medication'].rename(columns={
+                'medication': 'Medication', 'doses': 'Doses', 'median_delay': 'Median Delay (min)',
+                'p90_delay': '90th Percentile Delay (min)', 'on_time_pct': 'On Time %', 'late_pct': 'Late %'
+            }),
+            hide_index=True,
+            use_container_width=True
+        )
+
+def get_sort_index(list_name, items, sort_name, sort_key):
+    """Ids of the items in sorted order, kept between reruns and re-placing only items whose sort key changed"""
+    index = st.session_state.sort_indices.setdefault((list_name, sort_name), {'keys': {}, 'entries': []})
+    keys = {item['id']: sort_key(item) for item in items}
+    previous = index['keys']
+    changed = [item_id for item_id, key in keys.items() if previous.get(item_id) != key]
+    removed = [item_id for item_id in previous if item_id not in keys]
+    
+    # A fresh load changes most keys at once, where one sort beats many insertions
+    if len(changed) + len(removed) > len(keys) // 2:
+        index['entries'] = sorted((key, item_id) for item_id, key in keys.items())
+    else:
+        for item_id in removed + changed:
+            if item_id in previous:
+                del index['entries'][bisect.bisect_left(index['entries'], (previous[item_id], item_id))]
+        for item_id in changed:
+            bisect.insort(index['entries'], (keys[item_id], item_id))
+    index['keys'] = keys
+    return [item_id for _, item_id in index['entries']]
+
+def get_sorted_items(list_name, items, sort_name, sort_key, descending=False):
+    """Items in the order of their sort index, without copying and re-sorting the list"""
+    by_id = {item['id']: item for item in items}
+    item_ids = get_sort_index(list_name, items, sort_name, sort_key)
+    return [by_id[item_id] for item_id in (reversed(item_ids) if descending else item_ids)]
+
+def turn_page(page_key, step):
+    """Move a paginated list forward or back a page"""
+    st.session_state[page_key] += step
+
+def paginate(list_name, items, page_size=10):
+    """Show page controls for a long list and return only the items on the current page"""
+    page_key = f"{list_name}_page"
+    page_count = max(1, -(-len(items) // page_size))
+    # Deleting or filtering can leave the saved page past the end
+    page = min(st.session_state.get(page_key, 0), page_count - 1)
+    st.session_state[page_key] = page
+    start = page * page_size
+    
+    if page_count > 1:
+        prev_col, label_col, next_col = st.columns([1, 3, 1])
+        with prev_col:
+            st.button("◀ Previous", key=f"{list_name}_prev", disabled=page == 0, use_container_width=True,
+                      on_click=turn_page, args=(page_key, -1))
+        with label_col:
+            st.markdown(f"<p style='text-align: center; color: #ffffff;'>Showing {start + 1}–{min(start + page_size, len(items))} "
+                        f"of {len(items)} (page {page + 1} of {page_count})</p>", unsafe_allow_html=True)
+        with next_col:
+            st.button("Next ▶", key=f"{list_name}_next", disabled=page == page_count - 1, use_container_width=True,
+                      on_click=turn_page, args=(page_key, 1))
+    return items[start:start + page_size]
 
+@profiled('tab')
 def medications_tab():
     """Medications tab content"""
     st.markdown("<h3 style='color: #ffffff;'>💊 Your Medications</h3>", unsafe_allow_html=True)
@@ -2412,10 +4886,21 @@ def medications_tab():
                 "Blue", "Green", "Purple", "Pink", "Orange", "Red", "Yellow", "Indigo"
             ], key="new_color")
         
+        # Check the chosen times against every scheduled dose before the medication is added
+        tentative_med = {'name': new_med_name, 'time': reminder_times_input[0] if reminder_times_input else '09:00'}
+        if len(reminder_times_input) > 1:
+            tentative_med['reminder_times'] = reminder_times_input
+        conflicts = check_medication_conflicts(st.session_state.medications, tentative_med)
+        if conflicts:
+            suggestions = suggest_conflict_free_slots(st.session_state.medications, tentative_med['time'])
+            suggestion_text = f" Nearest free times: {', '.join(format_time(s) for s in suggestions)}." if suggestions else ""
+            st.warning(f"⚠️ Time conflict detected with: {', '.join(conflicts)}. Medications are scheduled close together.{suggestion_text}")
+        
         if st.button("Add Medication", use_container_width=True, key="add_med_btn"):
             if new_med_name and new_dosage_amount:
                 new_med = {
-                    'id': len(st.session_state.medications) + 1,
+                    # Never reuse a saved id: save_user_data keeps ids it already owns, with their history and slots
+                    'id': max((m['id'] for m in st.session_state.medications), default=0) + 1,
                     'name': new_med_name,
                     'dosageType': new_dosage_type,
                     'dosageAmount': new_dosage_amount,
@@ -2430,13 +4915,10 @@ def medications_tab():
                 if len(reminder_times_input) > 1:
                     new_med['reminder_times'] = reminder_times_input
                 
-                conflicts = check_medication_conflicts(st.session_state.medications, new_med)
-                if conflicts:
-                    st.warning(f"⚠️ Time conflict detected with: {', '.join(conflicts)}. Medications are scheduled close together.")
-                
                 st.session_state.medications.append(new_med)
                 push_undo_state('medication_added', {'med_index': len(st.session_state.medications) - 1, 'med_name': new_med_name})
                 save_user_data()
+                publish_achievement_event('medication_added')
                 st.success(f"Added {new_med_name}!")
                 st.rerun()
             else:
@@ -2444,32 +4926,36 @@ def medications_tab():
     
     st.markdown("<br>", unsafe_allow_html=True)
     
+    medication_list_fragment()
+
+@dashboard_fragment('medication_list')
+@profiled('fragment')
+def medication_list_fragment():
+    """Sortable, filterable medication list; sort and filter changes rerun only this list"""
+    mark_fragment_rendered('medication_list')
+    play_pending_dose_sound()
+    
     col1, col2 = st.columns(2)
     with col1:
         sort_by = st.selectbox("Sort by", ["Time", "Name", "Type", "Status"], key="sort_meds")
     with col2:
-        filter_by = st.selectbox("Filter by", ["All", "Taken", "Pending"], key="filter_meds")
+        filter_by = st.selectbox("Filter by", ["All", "Taken", "Skipped", "Pending"], key="filter_meds")
     
-    sorted_meds = st.session_state.medications.copy()
-    
-    if sort_by == "Time":
-        sorted_meds.sort(key=lambda x: x.get('time', '00:00'))
-    elif sort_by == "Name":
-        sorted_meds.sort(key=lambda x: x.get('name', ''))
-    elif sort_by == "Type":
-        sorted_meds.sort(key=lambda x: x.get('dosageType', ''))
-    elif sort_by == "Status":
-        sorted_meds.sort(key=lambda x: x.get('taken_today', False), reverse=True)
+    sort_keys = {
+        "Time": lambda x: x.get('time', '00:00'),
+        "Name": lambda x: x.get('name', ''),
+        "Type": lambda x: x.get('dosageType', ''),
+        "Status": lambda x: ('Taken', 'Skipped', 'Pending').index(get_dose_status(x))
+    }
+    sorted_meds = get_sorted_items('medications', st.session_state.medications, sort_by, sort_keys[sort_by])
     
-    if filter_by == "Taken":
-        sorted_meds = [m for m in sorted_meds if m.get('taken_today', False)]
-    elif filter_by == "Pending":
-        sorted_meds = [m for m in sorted_meds if not m.get('taken_today', False)]
+    if filter_by != "All":
+        sorted_meds = [m for m in sorted_meds if get_dose_status(m) == filter_by]
     
     st.markdown("<br>", unsafe_allow_html=True)
     
     if sorted_meds:
-        for med in sorted_meds:
+        for med in paginate('medications', sorted_meds):
             color_hex = get_medication_color_hex(med.get('color', 'blue'))
             
             st.markdown(f"<div class='medication-card' style='border-left-color: {color_hex};'>", unsafe_allow_html=True)
@@ -2486,7 +4972,7 @@ def medications_tab():
                     st.markdown(f"**Instructions:** {med['instructions']}")
             
             with col2:
-                status = "Taken ✅" if med.get('taken_today', False) else "Pending ⏰"
+                status = {'Taken': "Taken ✅", 'Skipped': "Skipped ⏭️", 'Pending': "Pending ⏰"}[get_dose_status(med)]
                 st.markdown(f"**Status:** {status}")
                 st.markdown(
                     f"<div style='width: 40px; height: 40px; background-color: {color_hex}; "
@@ -2506,37 +4992,17 @@ def medications_tab():
                     st.rerun()
                 
                 if not med.get('taken_today', False):
-                    if st.button("✓ Take", key=f"take_med_{med['id']}", use_container_width=True):
-                        # Initialize taken_time_slots if not exists
-                        if 'taken_time_slots' not in med:
-                            med['taken_time_slots'] = []
-                        
-                        # Mark the main time as taken
-                        med_time = med.get('time', '00:00')
-                        if med_time not in med['taken_time_slots']:
-                            med['taken_time_slots'].append(med_time)
-                        
-                        # Mark all reminder times as taken as well (user is taking the medication)
-                        if med.get('reminder_times'):
-                            for slot in med['reminder_times']:
-                                if slot not in med['taken_time_slots']:
-                                    med['taken_time_slots'].append(slot)
-                        
-                        # Mark medication as taken
-                        med['taken_today'] = True
-                        
-                        play_notification_sound()
-                        update_medication_history(med['id'], 'taken')
-                        update_adherence_history()
-                        push_undo_state('medication_taken', {'med_id': med['id'], 'med_name': med['name'], 'time': med_time})
-                        save_user_data()
-                        st.rerun()
+                    # Taking from the list resolves every remaining slot of the day
+                    open_slots = [slot for slot in get_medication_slots(med) if slot not in med.get('taken_time_slots', [])]
+                    st.button("✓ Take", key=f"take_med_{med['id']}", use_container_width=True,
+                              on_click=handle_dose_action, args=(med['id'], open_slots, 'taken', True))
             
             st.markdown("</div>", unsafe_allow_html=True)
             st.markdown("<br>", unsafe_allow_html=True)
     else:
         st.info("No medications found. Add your first medication above!")
 
+@profiled('tab')
 def appointments_tab():
     """Appointments tab content"""
     st.markdown("<h3 style='color: #ffffff;'>👨‍⚕️ Doctor Appointments</h3>", unsafe_allow_html=True)
@@ -2559,7 +5025,7 @@ def appointments_tab():
         if st.button("Schedule Appointment", use_container_width=True, key="add_appt_btn"):
             if appt_doctor and appt_date:
                 new_appt = {
-                    'id': len(st.session_state.appointments) + 1,
+                    'id': max((a['id'] for a in st.session_state.appointments), default=0) + 1,
                     'doctor': appt_doctor,
                     'specialty': appt_specialty,
                     'date': appt_date.strftime("%Y-%m-%d"),
@@ -2573,6 +5039,7 @@ def appointments_tab():
                 st.session_state.appointments.append(new_appt)
                 push_undo_state('appointment_added', {'appt_index': len(st.session_state.appointments) - 1, 'doctor': appt_doctor})
                 save_user_data()
+                publish_achievement_event('appointment_added')
                 st.success(f"Appointment with Dr. {appt_doctor} scheduled!")
                 st.rerun()
             else:
@@ -2583,19 +5050,17 @@ def appointments_tab():
     filter_option = st.selectbox("Filter", ["All Appointments", "Upcoming", "Past"], key="filter_appointments")
     
     today = date.today().strftime("%Y-%m-%d")
-    filtered_appts = st.session_state.appointments.copy()
+    filtered_appts = get_sorted_items('appointments', st.session_state.appointments, 'date', lambda x: x['date'])
     
     if filter_option == "Upcoming":
         filtered_appts = [a for a in filtered_appts if a['date'] >= today]
     elif filter_option == "Past":
         filtered_appts = [a for a in filtered_appts if a['date'] < today]
     
-    filtered_appts.sort(key=lambda x: x['date'])
-    
     st.markdown("<br>", unsafe_allow_html=True)
     
     if filtered_appts:
-        for appt in filtered_appts:
+        for appt in paginate('appointments', filtered_appts):
             days = days_until(appt['date'])
             
             if days < 0:
@@ -2651,6 +5116,7 @@ def appointments_tab():
     else:
         st.info("No appointments found.")
 
+@profiled('tab')
 def side_effects_tab():
     """Side effects tab content"""
     st.markdown("<h3 style='color: #ffffff;'>⚠️ Report & Track Side Effects</h3>", unsafe_allow_html=True)
@@ -2682,7 +5148,7 @@ def side_effects_tab():
             if st.button("Report Side Effect", use_container_width=True, key="report_effect_btn"):
                 if effect_description:
                     new_effect = {
-                        'id': len(st.session_state.side_effects) + 1,
+                        'id': max((e['id'] for e in st.session_state.side_effects), default=0) + 1,
                         'medication': effect_med,
                         'severity': effect_severity,
                         'type': effect_type,
@@ -2693,6 +5159,7 @@ def side_effects_tab():
                     
                     st.session_state.side_effects.append(new_effect)
                     save_user_data()
+                    publish_achievement_event('side_effect_reported')
                     st.success("Side effect reported successfully!")
                     
                     if effect_severity == "Severe":
@@ -2710,19 +5177,18 @@ def side_effects_tab():
     with col2:
         sort_option = st.selectbox("Sort by", ["Most Recent", "Oldest First", "Severity"], key="sort_effects")
     
-    filtered_effects = st.session_state.side_effects.copy()
+    if sort_option == "Severity":
+        severity_order = {'Severe': 3, 'Moderate': 2, 'Mild': 1}
+        filtered_effects = get_sorted_items('side_effects', st.session_state.side_effects, 'severity',
+                                            lambda x: -severity_order.get(x.get('severity', 'Mild'), 0))
+    else:
+        # Most recent and oldest first walk the same date index in opposite directions
+        filtered_effects = get_sorted_items('side_effects', st.session_state.side_effects, 'date',
+                                            lambda x: x.get('date', ''), descending=sort_option == "Most Recent")
     
     if severity_filter != "All":
         filtered_effects = [e for e in filtered_effects if e.get('severity') == severity_filter]
     
-    if sort_option == "Most Recent":
-        filtered_effects.sort(key=lambda x: x.get('date', ''), reverse=True)
-    elif sort_option == "Oldest First":
-        filtered_effects.sort(key=lambda x: x.get('date', ''))
-    elif sort_option == "Severity":
-        severity_order = {'Severe': 3, 'Moderate': 2, 'Mild': 1}
-        filtered_effects.sort(key=lambda x: severity_order.get(x.get('severity', 'Mild'), 0), reverse=True)
-    
     st.markdown("<br>", unsafe_allow_html=True)
     
     if st.session_state.side_effects:
@@ -2742,9 +5208,25 @@ def side_effects_tab():
             st.metric("Severe", severe)
         
         st.markdown("<br>", unsafe_allow_html=True)
+        
+        associations = get_session_side_effect_associations()
+        patterns = associations[(associations['reports'] > 0) & (associations['relative_rate'] > 1)]
+        if not patterns.empty:
+            with st.expander("🔍 Side Effect Patterns", expanded=False):
+                st.caption("Situations where side effects were reported more often than your overall rate, per 100 medication-days, "
+                           "counting only situations with at least 14 medication-days and 2 reports. "
+                           "These are patterns, not causes - discuss them with your doctor.")
+                st.dataframe(
+                    patterns.rename(columns={
+                        'factor': 'Factor', 'group': 'When', 'reports': 'Reports', 'severe_reports': 'Severe',
+                        'days': 'Medication-Days', 'rate_per_100_days': 'Reports per 100 Days', 'relative_rate': 'Times Overall Rate'
+                    }),
+                    hide_index=True,
+                    use_container_width=True
+                )
     
     if filtered_effects:
-        for effect in filtered_effects:
+        for effect in paginate('side_effects', filtered_effects):
             severity = effect.get('severity', 'Mild')
             severity_color = get_severity_color(severity)
             severity_emoji = get_severity_emoji(severity)
@@ -2783,33 +5265,93 @@ def side_effects_tab():
         else:
             st.success("No side effects reported. Great job! 🎉")
 
-def achievements_tab():
-    """Achievements tab content"""
-    st.markdown("<h3 style='color: #ffffff;'>🏆 Your Achievements & Badges</h3>", unsafe_allow_html=True)
+def get_achievement_rules():
+    """Get the declarative achievement rules: each one lists the events it listens to and a check to run on them"""
+    def longest_streak(session):
+        return (session.get('adherence_stats') or {}).get('longest_streak', 0)
     
-    achievements_list = [
+    return [
         {'id': 'first_step', 'name': 'First Step', 'description': 'Created your MedTimer account',
-         'icon': '🎯', 'earned': True, 'category': 'Getting Started'},
+         'icon': '🎯', 'category': 'Getting Started',
+         'events': ('session_loaded',), 'check': lambda session: True},
         {'id': 'first_medication', 'name': 'Medicine Cabinet', 'description': 'Added your first medication',
-         'icon': '💊', 'earned': len(st.session_state.medications) >= 1, 'category': 'Medications'},
+         'icon': '💊', 'category': 'Medications',
+         'events': ('session_loaded', 'medication_added'), 'check': lambda session: len(session.medications) >= 1},
         {'id': 'med_master', 'name': 'Med Master', 'description': 'Added 5 or more medications',
-         'icon': '🎓', 'earned': len(st.session_state.medications) >= 5, 'category': 'Medications'},
+         'icon': '🎓', 'category': 'Medications',
+         'events': ('session_loaded', 'medication_added'), 'check': lambda session: len(session.medications) >= 5},
         {'id': 'perfect_day', 'name': 'Perfect Day', 'description': 'Took all medications on time today',
-         'icon': '⭐', 'earned': all(m.get('taken_today', False) for m in st.session_state.medications) if st.session_state.medications else False,
-         'category': 'Adherence'},
+         'icon': '⭐', 'category': 'Adherence',
+         'events': ('dose_taken',), 'check': lambda session: calculate_adherence(session.medications) >= 100},
         {'id': 'health_tracker', 'name': 'Health Tracker', 'description': 'Scheduled 3 doctor appointments',
-         'icon': '📅', 'earned': len(st.session_state.appointments) >= 3, 'category': 'Appointments'},
+         'icon': '📅', 'category': 'Appointments',
+         'events': ('session_loaded', 'appointment_added'), 'check': lambda session: len(session.appointments) >= 3},
         {'id': 'appointment_keeper', 'name': 'Appointment Keeper', 'description': 'Scheduled your first appointment',
-         'icon': '👨‍⚕️', 'earned': len(st.session_state.appointments) >= 1, 'category': 'Appointments'},
+         'icon': '👨‍⚕️', 'category': 'Appointments',
+         'events': ('session_loaded', 'appointment_added'), 'check': lambda session: len(session.appointments) >= 1},
         {'id': 'week_warrior', 'name': 'Week Warrior', 'description': 'Maintained 7 day adherence streak',
-         'icon': '🔥', 'earned': False, 'category': 'Streaks'},
+         'icon': '🔥', 'category': 'Streaks',
+         'events': ('streak_updated',), 'check': lambda session: longest_streak(session) >= 7},
         {'id': 'side_effect_reporter', 'name': 'Health Advocate', 'description': 'Reported a side effect',
-         'icon': '⚠️', 'earned': len(st.session_state.side_effects) >= 1, 'category': 'Health Monitoring'},
+         'icon': '⚠️', 'category': 'Health Monitoring',
+         'events': ('session_loaded', 'side_effect_reported'), 'check': lambda session: len(session.side_effects) >= 1},
         {'id': 'turtle_friend', 'name': 'Turtle\'s Best Friend', 'description': 'Made your turtle companion happy',
-         'icon': '🐢', 'earned': st.session_state.turtle_mood in ['happy', 'excited', 'celebrating'], 'category': 'Fun'},
+         'icon': '🐢', 'category': 'Fun',
+         'events': ('mood_changed',), 'check': lambda session: session.turtle_mood in ['happy', 'excited', 'celebrating']},
         {'id': 'consistency_king', 'name': 'Consistency King/Queen', 'description': 'Achieve 100% adherence rate',
-         'icon': '👑', 'earned': all(m.get('taken_today', False) for m in st.session_state.medications) and len(st.session_state.medications) > 0,
-         'category': 'Adherence'}
+         'icon': '👑', 'category': 'Adherence',
+         'events': ('dose_taken',), 'check': lambda session: calculate_adherence(session.medications) >= 100}
+    ]
+
+@st.cache_resource
+def get_achievement_subscriptions():
+    """Index the achievement rules by the events they listen to"""
+    subscriptions = {}
+    for rule in get_achievement_rules():
+        for event_type in rule['events']:
+            subscriptions.setdefault(event_type, []).append(rule)
+    return subscriptions
+
+def publish_achievement_event(event_type):
+    """Run the achievement rules subscribed to an event and persist any new unlocks"""
+    if not st.session_state.get('user_profile'):
+        return
+    
+    unlocked = st.session_state.achievements
+    new_unlocks = []
+    for rule in get_achievement_subscriptions().get(event_type, []):
+        if rule['id'] not in unlocked and rule['check'](st.session_state):
+            new_unlocks.append(rule)
+    if not new_unlocks:
+        return
+    
+    unlocked_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    conn = get_db_connection()
+    c = conn.cursor()
+    c.executemany('INSERT OR IGNORE INTO achievement_unlocks (username, achievement_id, unlocked_at) VALUES (?, ?, ?)',
+                  [(st.session_state.user_profile['username'], rule['id'], unlocked_at) for rule in new_unlocks])
+    conn.commit()
+    conn.close()
+    
+    for rule in new_unlocks:
+        unlocked[rule['id']] = unlocked_at
+        st.session_state.new_achievements.append(rule)
+
+def show_new_achievements():
+    """Toast achievements unlocked since the last render"""
+    for rule in st.session_state.get('new_achievements', []):
+        st.toast(f"{rule['icon']} Achievement unlocked: {rule['name']}!")
+    st.session_state.new_achievements = []
+
+@profiled('tab')
+def achievements_tab():
+    """Achievements tab content"""
+    st.markdown("<h3 style='color: #ffffff;'>🏆 Your Achievements & Badges</h3>", unsafe_allow_html=True)
+    
+    unlocked = st.session_state.achievements
+    achievements_list = [
+        dict(rule, earned=rule['id'] in unlocked, unlocked_at=unlocked.get(rule['id']))
+        for rule in get_achievement_rules()
     ]
     
     earned_count = sum(1 for a in achievements_list if a['earned'])
@@ -2837,7 +5379,7 @@ def achievements_tab():
                 opacity = "1.0"
                 border_color = "#10b981"
                 bg_gradient = "linear-gradient(135deg, #ecfdf5 0%, #d1fae5 100%)"
-                status = '<span style="color: #10b981; font-weight: 700;">✅ Earned</span>'
+                status = f'<span style="color: #10b981; font-weight: 700;">✅ Earned {achievement["unlocked_at"][:10]}</span>'
             else:
                 opacity = "0.6"
                 border_color = "#e5e7eb"
@@ -2856,6 +5398,7 @@ def achievements_tab():
             </div>
             """, unsafe_allow_html=True)
 
+@profiled('tab')
 def reports_tab():
     """Reports tab content"""
     st.markdown("<h3 style='color: #ffffff;'>📤 Generate & Download Health Reports</h3>", unsafe_allow_html=True)
@@ -2889,21 +5432,13 @@ def reports_tab():
             'side_effects': st.session_state.side_effects,
             'adherence_history': st.session_state.get('adherence_history', []),
             'start_date': start_date.strftime("%Y-%m-%d"),
-            'end_date': end_date.strftime("%Y-%m-%d")
+            'end_date': end_date.strftime("%Y-%m-%d"),
+            'timeliness': summarize_dose_timeliness(get_session_dose_timeliness(), st.session_state.medications,
+                                                    start_date=start_date.strftime("%Y-%m-%d"), end_date=end_date.strftime("%Y-%m-%d"))
         }
         
         if report_format == "PDF":
-            pdf_content = generate_pdf_report(report_data, report_type)
-            
-            st.success("PDF report generated successfully!")
-            
-            st.download_button(
-                label="⬇️ Download PDF Report",
-                data=pdf_content,
-                file_name=f"medtimer_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
-                mime="application/pdf",
-                use_container_width=True
-            )
+            st.session_state.report_job, st.session_state.report_job_reused = submit_report_job(report_data, report_type)
         else:
             report = f"""
 {'=' * 70}
@@ -2927,11 +5462,11 @@ MEDICATIONS ({len(st.session_state.medications)})
             if report_format == "CSV":
                 report += "Name,Dosage,Type,Frequency,Time,Status\n"
                 for med in st.session_state.medications:
-                    status = "Taken" if med.get('taken_today', False) else "Pending"
+                    status = get_dose_status(med)
                     report += f"{med['name']},{med['dosageAmount']},{med['dosageType']},{med['frequency']},{med['time']},{status}\n"
             else:
                 for i, med in enumerate(st.session_state.medications, 1):
-                    status = "✅ Taken" if med.get('taken_today', False) else "⏰ Pending"
+                    status = {'Taken': "✅ Taken", 'Skipped': "⏭️ Skipped", 'Pending': "⏰ Pending"}[get_dose_status(med)]
                     report += f"""
 {i}. {med['name']}
    - Dosage: {med['dosageAmount']}
@@ -2942,6 +5477,17 @@ MEDICATIONS ({len(st.session_state.medications)})
 
 """
             
+            timeliness = report_data['timeliness']
+            report += f"""
+DOSE TIMELINESS ({timeliness['doses']} timed doses)
+{'-' * 70}
+
+"""
+            if timeliness['doses']:
+                report += f"Median delay: {timeliness['median_delay']:+.0f} min | On time (within {timeliness['on_time_minutes']} min): {timeliness['on_time_pct']:.0f}%\n"
+                for row in timeliness['by_medication'].itertuples():
+                    report += f"   - {row.medication}: {row.doses} doses, median {row.median_delay:+.0f} min, {row.on_time_pct:.0f}% on time, {row.late_pct:.0f}% late\n"
+            
             report += f"""
 APPOINTMENTS ({len(st.session_state.appointments)})
 {'-' * 70}
@@ -2994,6 +5540,166 @@ Generated by MedTimer - Your Medication Management Companion
             )
             
             st.success("Report generated successfully!")
+    
+    if report_format == "PDF" and st.session_state.get('report_job'):
+        job = get_report_jobs()['jobs'].get(st.session_state.report_job)
+        building = job is not None and not job['future'].done()
+        # Only a report that is still building keeps its panel refreshing
+        dashboard_fragment('report_job', run_every=1 if building else None)(report_job_panel)(building)
+
+def get_dashboard_sections(age_category):
+    """Get the patient dashboard sections with their render, prefetch and kept widget keys"""
+    return [
+        {'key': 'dashboard', 'label': "📊 Dashboard", 'render': lambda: dashboard_overview_tab(age_category)},
+        {'key': 'medications', 'label': "💊 Medications", 'render': medications_tab,
+         'keep_keys': ['sort_meds', 'filter_meds']},
+        {'key': 'appointments', 'label': "👨‍⚕️ Appointments", 'render': appointments_tab,
+         'keep_keys': ['filter_appointments']},
+        {'key': 'side_effects', 'label': "⚠️ Side Effects", 'render': side_effects_tab,
+         'prefetch': get_session_side_effect_associations, 'keep_keys': ['severity_filter', 'sort_effects']},
+        {'key': 'achievements', 'label': "🏆 Achievements", 'render': achievements_tab},
+        {'key': 'reports', 'label': "📥 Reports", 'render': reports_tab},
+        {'key': 'analytics', 'label': "📈 Analytics", 'render': lambda: analytics_tab(age_category),
+         'prefetch': lambda: prefetch_analytics(age_category), 'keep_keys': ['adherence_trend_range']}
+    ]
+
+def select_dashboard_section():
+    """Remember the section picked in the navigation bar"""
+    st.session_state.dashboard_section = st.session_state.dashboard_section_nav
+
+def render_dashboard_navigation(sections):
+    """Show the section navigation bar and return the active section"""
+    keys = [section['key'] for section in sections]
+    if st.session_state.get('dashboard_section') not in keys:
+        st.session_state.dashboard_section = keys[0]
+    st.session_state.dashboard_section_nav = st.session_state.dashboard_section
+    
+    st.radio(
+        "Section",
+        keys,
+        format_func=lambda key: sections[keys.index(key)]['label'],
+        horizontal=True,
+        label_visibility="collapsed",
+        key="dashboard_section_nav",
+        on_change=select_dashboard_section
+    )
+    
+    active = sections[keys.index(st.session_state.dashboard_section)]
+    # Streamlit drops the state of widgets that aren't drawn, so carry hidden sections' filters over
+    for section in sections:
+        if section is not active:
+            for key in section.get('keep_keys', []):
+                if key in st.session_state:
+                    st.session_state[key] = st.session_state[key]
+    return active
+
+def render_timing_panel(mode):
+    """Record how long this rerun took and compare section and all-tab rendering"""
+    import numpy as np
+    
+    record = finish_rerun_profile(mode, st.session_state.get('dashboard_section'))
+    elapsed_ms = record['ms']
+    
+    with st.expander("⏱️ Render Timing", expanded=False):
+        st.toggle("Render all tabs on every rerun", key="dashboard_render_all",
+                  help="The classic tab layout runs every tab's code; sections only run the one you're viewing")
+        st.caption(f"This rerun: {elapsed_ms:.0f} ms ({mode.lower()})")
+        col1, col2 = st.columns(2)
+        for col, label in ((col1, 'Sections'), (col2, 'All tabs')):
+            runs = [t['ms'] for t in st.session_state.render_timings if t['mode'] == label]
+            with col:
+                st.metric(f"{label} (median)", f"{np.median(runs):.0f} ms" if runs else "—",
+                          help=f"Median over the last {len(runs)} reruns")
+
+def is_profiling_admin():
+    """Whether the signed-in user may see the profiling panel; admins are listed in MEDTIMER_ADMINS"""
+    admins = {name.strip() for name in os.environ.get('MEDTIMER_ADMINS', '').split(',') if name.strip()}
+    return (st.session_state.user_profile or {}).get('username') in admins
+
+def summarize_rerun_profiles(records):
+    """Aggregate recent reruns into per-mode, per-category and per-function timings"""
+    import numpy as np
+    
+    modes = {}
+    for record in records:
+        modes.setdefault(record['mode'], []).append(record['ms'])
+    # Reruns that never called into a category count as zero for it
+    categories = {category: [record['categories'].get(category, 0.0) for record in records]
+                  for category in {category for record in records for category in record['categories']}}
+    functions = {}
+    for record in records:
+        for name, stats in record['functions'].items():
+            total = functions.setdefault(name, {'category': stats['category'], 'calls': 0, 'ms': 0.0, 'self_ms': 0.0})
+            total['calls'] += stats['calls']
+            total['ms'] += stats['ms']
+            total['self_ms'] += stats['self_ms']
+    widgets = [record['widgets'] for record in records if record['widgets'] is not None]
+    
+    return {
+        'reruns': len(records),
+        'modes': {mode: {'reruns': len(ms), 'p50_ms': float(np.percentile(ms, 50)), 'p95_ms': float(np.percentile(ms, 95))}
+                  for mode, ms in modes.items()},
+        'categories': {category: {'mean_ms': float(np.mean(ms)), 'p95_ms': float(np.percentile(ms, 95))}
+                       for category, ms in categories.items()},
+        'functions': functions,
+        'median_widgets': float(np.median(widgets)) if widgets else None
+    }
+
+def export_rerun_metrics(summary, directory='metrics'):
+    """Append an aggregated metrics snapshot to a local JSON Lines file for offline analysis"""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, 'rerun-metrics.jsonl')
+    snapshot = {
+        'exported_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'username': st.session_state.user_profile['username'],
+        'figure_cache': get_figure_cache_stats(),
+        **summary
+    }
+    with open(path, 'a') as f:
+        f.write(json.dumps(snapshot) + '\n')
+    return path
+
+def render_profiling_panel():
+    """Admin-only breakdown of where the session's recent reruns spent their time"""
+    import pandas as pd
+    
+    records = list(st.session_state.render_timings)
+    summary = summarize_rerun_profiles(records)
+    
+    with st.expander("🧪 Profiling (admin)", expanded=False):
+        st.caption("Times are each function's own time, without the profiled calls inside it, "
+                   f"over the last {summary['reruns']} reruns of this session")
+        
+        cols = st.columns(len(summary['categories']) or 1)
+        for col, (category, timing) in zip(cols, sorted(summary['categories'].items())):
+            with col:
+                st.metric(category.title(), f"{timing['mean_ms']:.1f} ms", help=f"Mean per rerun; p95 {timing['p95_ms']:.1f} ms")
+        
+        st.dataframe(pd.DataFrame([{
+            'At': record['at'],
+            'Mode': record['mode'],
+            'Section': record['section'],
+            'Total (ms)': round(record['ms'], 1),
+            'Widgets': record['widgets'],
+            **{category.title(): round(ms, 1) for category, ms in record['categories'].items()}
+        } for record in reversed(records)]), hide_index=True, use_container_width=True)
+        
+        functions = pd.DataFrame([{
+            'Function': name,
+            'Category': stats['category'],
+            'Calls per Rerun': stats['calls'] / summary['reruns'],
+            'Own ms per Rerun': stats['self_ms'] / summary['reruns'],
+            'Total ms per Rerun': stats['ms'] / summary['reruns']
+        } for name, stats in summary['functions'].items()])
+        if not functions.empty:
+            st.dataframe(functions.sort_values('Own ms per Rerun', ascending=False).round(2), hide_index=True, use_container_width=True)
+        
+        cache = get_figure_cache_stats()
+        st.caption(f"Figure cache: {cache['entries']} figures, {cache['bytes'] / 1024:.0f} KB, "
+                   f"{cache['hit_rate']:.0%} hit rate, {cache['evictions']} evictions")
+        
+        if st.button("💾 Export Metrics", key="export_rerun_metrics"):
+            st.success(f"Metrics appended to {export_rerun_metrics(summary)}")
 
 def patient_dashboard_page():
     """Main patient dashboard with tabs"""
@@ -3002,23 +5708,22 @@ def patient_dashboard_page():
         st.rerun()
         return
     
+    sync_session_day()
+    
     age = st.session_state.user_profile.get('age', 25)
     age_category = get_age_category(age)
     greeting = get_time_of_day()
     
-    st.markdown(inject_custom_css(age_category), unsafe_allow_html=True)
-    
     col1, col2, col3 = st.columns([2, 4, 2])
     
     with col1:
         st.markdown(f"<h2 style='color: #ffffff;'>👋 {greeting}, {st.session_state.user_profile['name']}</h2>", unsafe_allow_html=True)
     
     with col2:
-        mascot_img = get_mascot_image(st.session_state.turtle_mood)
         st.markdown(
             f"""
             <div class="turtle-container" style="text-align:center;">
-                <div style="font-size: 120px;">{mascot_img}</div>
+                {get_mascot_html(st.session_state.turtle_mood, 120)}
             </div>
             """,
             unsafe_allow_html=True
@@ -3031,34 +5736,39 @@ def patient_dashboard_page():
             st.session_state.page = 'account_type_selection'
             st.rerun()
     
-    tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs([
-        "📊 Dashboard", "💊 Medications", "👨‍⚕️ Appointments",
-        "⚠️ Side Effects", "🏆 Achievements", "📥 Reports", "📈 Analytics"
-    ])
-    
-    with tab1:
-        dashboard_overview_tab(age_category)
-    
-    with tab2:
-        medications_tab()
-    
-    with tab3:
-        appointments_tab()
-    
-    with tab4:
-        side_effects_tab()
-    
-    with tab5:
-        achievements_tab()
-    
-    with tab6:
-        reports_tab()
-    
-    with tab7:
-        analytics_tab(age_category)
+    # Fragments register themselves as they draw, so dose actions know what is on screen
+    st.session_state.rendered_fragments = set()
+    st.session_state.full_rerun_requested = False
+    sections = get_dashboard_sections(age_category)
+    profiling = is_profiling_admin()
+    render_all = profiling and st.session_state.get('dashboard_render_all', False)
+    
+    if render_all:
+        tabs = st.tabs([section['label'] for section in sections])
+        for tab, section in zip(tabs, sections):
+            with tab:
+                section['render']()
+    else:
+        active = render_dashboard_navigation(sections)
+        active['render']()
+        # Hidden sections warm their caches after the visible one has drawn, once per change to their data
+        prefetch_key = get_prefetch_key()
+        if st.session_state.get('prefetched_key') != prefetch_key:
+            for section in sections:
+                if section is not active and section.get('prefetch'):
+                    section['prefetch']()
+            st.session_state.prefetched_key = prefetch_key
+    
+    show_new_achievements()
+    if profiling:
+        render_timing_panel('All tabs' if render_all else 'Sections')
+        render_profiling_panel()
 
 def caregiver_dashboard_page():
     """Main caregiver dashboard"""
+    import pandas as pd
+    import numpy as np
+    
     if not st.session_state.user_profile:
         st.session_state.page = 'caregiver_login'
         st.rerun()
@@ -3076,11 +5786,22 @@ def caregiver_dashboard_page():
             st.session_state.page = 'account_type_selection'
             st.rerun()
     
+    process_reminder_timers()
+    caregiver_username = st.session_state.user_profile['username']
+    escalations = get_escalated_reminders(caregiver_username)
+    # Connections live in the database, so escalations and the overview see the same patients as this list
+    st.session_state.connected_patients = load_connected_patients(caregiver_username)
+    
     tab1, tab2, tab3, tab4 = st.tabs(["👥 My Patients", "📊 Overview", "🔗 Connect", "⚙️ Settings"])
     
     with tab1:
-        if 'connected_patients' not in st.session_state:
-            st.session_state.connected_patients = []
+        if escalations:
+            st.markdown("<h4 style='color: #ffffff;'>🚨 Escalated Reminders</h4>", unsafe_allow_html=True)
+            for escalation in escalations:
+                st.error(f"**{escalation['patient']}** has not responded to {escalation['medication']} ({escalation['dosageAmount']}) "
+                         f"due at {format_time(escalation['time'])} on {escalation['date']} - "
+                         f"{escalation['ignored_count']} reminders ignored, escalated at {escalation['escalated_at'][11:16]}")
+            st.markdown("<br>", unsafe_allow_html=True)
         
         if st.session_state.connected_patients:
             for patient in st.session_state.connected_patients:
@@ -3090,7 +5811,7 @@ def caregiver_dashboard_page():
                 
                 with col1:
                     st.markdown(f"### 👤 {patient['name']}")
-                    st.markdown(f"**Age:** {patient['age']}")
+                    st.markdown(f"**Age:** {patient['age'] or 'N/A'}")
                     st.markdown(f"**Access Code:** {patient['access_code']}")
                     st.markdown(f"**Last Contact:** {patient.get('last_contact', 'N/A')}")
                 
@@ -3100,8 +5821,7 @@ def caregiver_dashboard_page():
                 
                 with col3:
                     if st.button("🗑️ Disconnect", key=f"disconnect_patient_{patient['id']}", use_container_width=True):
-                        st.session_state.connected_patients = [p for p in st.session_state.connected_patients if p['id'] != patient['id']]
-                        save_user_data()
+                        disconnect_caregiver(caregiver_username, patient['username'])
                         st.rerun()
                 
                 st.markdown("</div>", unsafe_allow_html=True)
@@ -3110,23 +5830,22 @@ def caregiver_dashboard_page():
             st.info("You haven't connected to any patients yet. Use the Connect tab to link with a patient using their access code.")
             
             if st.button("➕ Add Demo Patient", use_container_width=True):
-                demo_patient = {
-                    'id': 1,
-                    'name': 'Demo Patient',
-                    'age': 65,
-                    'access_code': '123456',
-                    'medications': 5,
-                    'adherence': 85,
-                    'last_contact': 'Today'
-                }
-                st.session_state.connected_patients.append(demo_patient)
-                save_user_data()
+                # The demo patient is a real patient account, connected the same way as any other
+                conn = get_db_connection()
+                conn.execute('''INSERT OR IGNORE INTO users (username, name, age, user_type, created_at)
+                                VALUES ('demo-patient', 'Demo Patient', 65, 'patient', ?)''',
+                             (datetime.now().strftime("%Y-%m-%d %H:%M:%S"),))
+                connect_caregiver(caregiver_username, get_patient_access_code('demo-patient', conn), conn)
+                conn.close()
                 st.rerun()
     
     with tab2:
-        total_patients = len(st.session_state.connected_patients)
-        total_medications = sum(p.get('medications', 0) for p in st.session_state.connected_patients)
-        avg_adherence = sum(p.get('adherence', 0) for p in st.session_state.connected_patients) / total_patients if total_patients > 0 else 0
+        # Built from the same connected_patients rows as the patient list
+        cohort = load_cohort_adherence(caregiver_username)
+        metrics = compute_cohort_metrics(cohort['matrix'])
+        total_patients = len(cohort['usernames'])
+        total_medications = int(cohort['medication_counts'].sum())
+        avg_adherence = metrics['cohort_average'] or 0
         
         col1, col2, col3, col4 = st.columns(4)
         
@@ -3155,16 +5874,41 @@ def caregiver_dashboard_page():
             """, unsafe_allow_html=True)
         
         with col4:
-            st.markdown("""
+            st.markdown(f"""
             <div class='stat-card'>
-                <div class='stat-number'>0</div>
+                <div class='stat-number'>{len(escalations) + int(metrics['at_risk'].sum())}</div>
                 <div class='stat-label'>Alerts</div>
             </div>
             """, unsafe_allow_html=True)
         
-        if total_patients > 0:
+        if cohort['usernames']:
             st.markdown("<br>", unsafe_allow_html=True)
-            st.info("Connect to patients to see detailed overview statistics.")
+            if metrics['percentiles']:
+                st.markdown(
+                    f"**30-day adherence percentiles:** "
+                    + " · ".join(f"P{p}: {value:.0f}%" for p, value in metrics['percentiles'].items())
+                )
+            
+            order = metrics['risk_order']
+            cohort_table = pd.DataFrame({
+                'Patient': np.array(cohort['names'])[order],
+                'At Risk': np.where(metrics['at_risk'][order], '⚠️', ''),
+                '7-Day %': metrics['recent'][order].round(1),
+                '30-Day %': metrics['overall'][order].round(1),
+                'Trend (pts/day)': metrics['slope'][order].round(2),
+                'Last Day %': metrics['latest'][order].round(1),
+                'Medications': cohort['medication_counts'][order],
+                'Last 30 Days': [[None if np.isnan(value) else round(value, 1) for value in cohort['matrix'][i]] for i in order]
+            })
+            st.dataframe(
+                cohort_table,
+                hide_index=True,
+                use_container_width=True,
+                column_config={
+                    'Last 30 Days': st.column_config.LineChartColumn('Last 30 Days', y_min=0, y_max=100)
+                }
+            )
+            st.caption("Patients are listed by risk: lowest 7-day adherence first. Click a column header to sort.")
         else:
             st.info("Connect to patients to see overview statistics.")
     
@@ -3179,11 +5923,12 @@ def caregiver_dashboard_page():
         with col2:
             st.markdown("<br>", unsafe_allow_html=True)
             if st.button("🔗 Connect", use_container_width=True):
-                if patient_code and len(patient_code) == 6:
-                    st.success(f"Successfully connected to patient with code: {patient_code}")
-                    st.info("In a full implementation, this would fetch and link patient data.")
-                else:
+                if not patient_code or len(patient_code) != 6:
                     st.warning("Please enter a valid 6-digit code")
+                elif connect_caregiver(caregiver_username, patient_code):
+                    st.rerun()
+                else:
+                    st.error("No patient has this access code. Please check it with your patient.")
         
         st.markdown("<br>", unsafe_allow_html=True)
         
@@ -3210,9 +5955,41 @@ def caregiver_dashboard_page():
         if profile.get('notes'):
             st.markdown(f"**Notes:** {profile['notes']}")
 
+def benchmark_cold_start(repeats=5):
+    """Time importing the app in fresh interpreters with -X importtime, against the heavy libraries it now defers"""
+    import subprocess
+    import sys
+    import numpy as np
+    
+    def import_ms(statement):
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        total_us = 0
+        for line in result.stderr.splitlines():
+            # Lines read "import time: self | cumulative | name", with nested imports indented under their parent
+            if line.startswith('import time:') and line.count('|') == 2:
+                _, cumulative, name = line.split('|')
+                if cumulative.strip().isdigit() and not name.startswith('  '):
+                    total_us += int(cumulative)
+        return total_us / 1000
+    
+    def median_ms(statement):
+        return float(np.median([import_ms(statement) - import_ms('pass') for _ in range(repeats)]))
+    
+    streamlit_ms = median_ms('import streamlit')
+    return {
+        'app_ms': median_ms('import app'),
+        'streamlit_ms': streamlit_ms,
+        # What the old top-level imports added before the login page could render
+        'deferred_ms': median_ms('import streamlit, plotly.graph_objects, plotly.express, pandas, numpy, reportlab.platypus') - streamlit_ms
+    }
+
 def main():
     """Main application router"""
+    start_rerun_profile()
     init_database()
+    start_rollover_scheduler()
+    start_push_server()
     initialize_session_state()
     
     age_category = 'adult'
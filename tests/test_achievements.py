@@ -0,0 +1,23 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+
+
+class FakeSessionState(dict):
+    __getattr__ = dict.__getitem__
+    __setattr__ = dict.__setitem__
+
+
+def test_turtle_friend_unlocks_when_first_mood_matches_the_default(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    app.init_database()
+    session = FakeSessionState(user_profile={'username': 'kai'}, turtle_mood='happy', mood_checked=False,
+                               achievements={}, new_achievements=[])
+    monkeypatch.setattr(app.st, 'session_state', session)
+
+    app.update_mascot_mood(75)
+    assert session.turtle_mood == 'happy'
+    assert 'turtle_friend' in session.achievements
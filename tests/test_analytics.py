@@ -0,0 +1,115 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+
+
+class FakeSessionState(dict):
+    __getattr__ = dict.__getitem__
+
+
+def test_weekly_heatmap_late_slots_land_in_last_bucket():
+    history = [(1, 'taken', '2026-10-19 23:10:00', '2026-10-19', '23:00')]
+    taken, scheduled = app.compute_weekly_heatmap('pat', 1, history, [(1, '23:00')], bucket_hours=8,
+                                                  days_back=7, end_date='2026-10-19')
+    assert taken.shape == (7, 3)
+    # 2026-10-19 is a Monday
+    assert taken[0, 2] == 1
+    assert scheduled[:, 2].sum() == 7
+
+
+def test_weekly_heatmap_rejects_buckets_that_do_not_divide_the_day():
+    history = [(1, 'taken', '2026-10-19 23:10:00', '2026-10-19', '23:00')]
+    with pytest.raises(ValueError):
+        app.compute_weekly_heatmap('pat', 1, history, [(1, '23:00')], bucket_hours=5,
+                                   days_back=7, end_date='2026-10-19')
+
+
+def test_dose_delay_uses_the_users_clock_not_the_servers(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    app.init_database()
+    server_offset = int(app.datetime.now().astimezone().utcoffset().total_seconds() // 60)
+    user_offset = server_offset + 330
+    monkeypatch.setattr(app.st, 'session_state', FakeSessionState(user_profile={'username': 'kai'},
+                                                                  utc_offset_minutes=user_offset))
+    local_now = app.get_local_time(user_offset)
+    slot = (local_now - app.timedelta(minutes=10)).strftime('%H:%M')
+
+    event = app.update_medication_history(1, 'taken', slot)
+    doses = app.compute_dose_timeliness('kai', 1, event['date'], [event])
+    assert event['utc_offset_minutes'] == user_offset
+    assert doses['delay_minutes'].tolist() == [10]
+
+
+def test_rollover_stamps_missed_doses_in_local_time():
+    conn = app.sqlite3.connect(':memory:')
+    app.init_database(conn)
+    conn.execute("INSERT INTO users (username, name, age, user_type) VALUES ('kai', 'Kai', 30, 'patient')")
+    conn.execute("INSERT INTO user_day_state (username, utc_offset_minutes, open_date) VALUES ('kai', 330, '2026-10-18')")
+    conn.execute("INSERT INTO medication_slots (username, medication_id, slot_time, slot_minute) VALUES ('kai', 1, '08:00', 480)")
+    app.run_midnight_rollover(conn, now=app.datetime(2026, 10, 18, 20, 0, tzinfo=app.timezone.utc))
+    row = conn.execute("SELECT action, timestamp, date, utc_offset_minutes FROM medication_history").fetchone()
+    assert row == ('missed', '2026-10-19 01:30:00', '2026-10-18', 330)
+
+
+def test_backfill_scores_medications_without_slot_rows():
+    conn = app.sqlite3.connect(':memory:')
+    app.init_database(conn)
+    conn.execute("""INSERT INTO medications (id, username, name, time, reminder_times)
+                    VALUES (1, 'kai', 'Aspirin', '08:00', '["08:00", "20:00"]')""")
+    conn.execute("""INSERT INTO medication_history (username, medication_id, action, timestamp, date, slot_time)
+                    VALUES ('kai', 1, 'taken', '2026-10-18 08:05:00', '2026-10-18', '08:00')""")
+    conn.execute("INSERT INTO adherence_history (username, date, adherence) VALUES ('kai', '2026-10-18', 100.0)")
+    result = app.backfill_dose_adherence(conn)
+    assert result['slots_added'] == 2
+    assert conn.execute("SELECT adherence FROM adherence_history").fetchone() == (50.0,)
+
+
+def test_clock_schedule_due_times_follow_the_users_offset(monkeypatch):
+    monkeypatch.setattr(app.st, 'session_state', FakeSessionState(utc_offset_minutes=330))
+    local_now = app.get_local_time(330)
+    slot = local_now.strftime('%H:%M')
+    schedule = app.get_clock_schedule([{'name': 'Aspirin', 'dosageAmount': '100mg', 'time': slot}])
+    due = app.datetime.fromtimestamp(schedule[0]['due'] / 1000, app.timezone.utc)
+    assert due.replace(tzinfo=None) + app.timedelta(minutes=330) == local_now.replace(second=0, microsecond=0)
+
+
+def test_side_effect_associations_leave_out_thinly_supported_groups():
+    import pandas as pd
+    medications = [{'id': 1, 'name': 'Aspirin', 'created_at': '2026-09-01 08:00:00'},
+                   {'id': 2, 'name': 'Ibuprofen', 'created_at': '2026-10-18 08:00:00'}]
+    side_effects = [('Aspirin', 'Mild', '2026-09-10'), ('Aspirin', 'Mild', '2026-10-01'),
+                    ('Ibuprofen', 'Mild', '2026-10-19')]
+    doses = pd.DataFrame(columns=['medication_id', 'date', 'slot_time', 'delay_minutes'])
+    associations = app.compute_side_effect_associations('kai', 1, '2026-10-19', side_effects, medications, [], doses)
+    medication_groups = associations[associations['factor'] == 'Medication']['group'].tolist()
+    assert medication_groups == ['Aspirin']
+    assert (associations['days'] >= 14).all() and (associations['reports'] >= 2).all()
+
+
+def test_timestamp_migration_runs_once():
+    conn = app.sqlite3.connect(':memory:')
+    conn.execute("""CREATE TABLE medication_history (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT, medication_id INTEGER,
+                                                     action TEXT, timestamp TEXT, date TEXT)""")
+    conn.execute("CREATE TABLE user_day_state (username TEXT PRIMARY KEY, utc_offset_minutes INTEGER, open_date TEXT)")
+    conn.execute("INSERT INTO user_day_state VALUES ('kai', 330, '2026-10-18')")
+    conn.execute("""INSERT INTO medication_history (username, medication_id, action, timestamp, date)
+                    VALUES ('kai', 1, 'missed', '2026-10-18 20:00:00', '2026-10-18')""")
+    conn.commit()
+
+    app.init_database(conn)
+    migrated = conn.execute("SELECT timestamp, utc_offset_minutes FROM medication_history").fetchall()
+    app.init_database(conn)
+    assert migrated == [('2026-10-19 01:30:00', 330)]
+    assert conn.execute("SELECT timestamp, utc_offset_minutes FROM medication_history").fetchall() == migrated
+    assert conn.execute('PRAGMA user_version').fetchone()[0] == app.SCHEMA_VERSION
+
+
+def test_new_database_starts_at_the_current_schema_version():
+    conn = app.sqlite3.connect(':memory:')
+    app.init_database(conn)
+    assert conn.execute('PRAGMA user_version').fetchone()[0] == app.SCHEMA_VERSION
@@ -0,0 +1,73 @@
+import math
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+
+
+def add_patient(conn, username, name):
+    conn.execute("INSERT INTO users (username, name, age, user_type) VALUES (?, ?, 70, 'patient')", (username, name))
+    return app.get_patient_access_code(username, conn)
+
+
+def test_connecting_by_access_code_lets_escalations_reach_the_caregiver(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    app.init_database()
+    conn = app.get_db_connection()
+    code = add_patient(conn, 'kai', 'Kai')
+    conn.execute("INSERT INTO medications (id, username, name, dosage_amount) VALUES (1, 'kai', 'Aspirin', '100mg')")
+    conn.execute("""INSERT INTO reminders (username, medication_id, reminder_time, acknowledged, date, ignored_count, escalated_at)
+                    VALUES ('kai', 1, '08:00', 0, '2026-10-19', 3, '2026-10-19 08:20:00')""")
+    conn.commit()
+
+    assert app.connect_caregiver('carer', 'nope', conn) is None
+    assert app.connect_caregiver('carer', code, conn) == 'kai'
+    assert app.connect_caregiver('carer', code, conn) == 'kai'
+    conn.close()
+
+    assert [patient['username'] for patient in app.load_connected_patients('carer')] == ['kai']
+    escalations = app.get_escalated_reminders('carer')
+    assert [(e['patient'], e['medication'], e['ignored_count']) for e in escalations] == [('Kai', 'Aspirin', 3)]
+
+    app.disconnect_caregiver('carer', 'kai')
+    assert app.get_escalated_reminders('carer') == []
+
+
+def test_access_codes_are_stable_per_patient():
+    conn = app.sqlite3.connect(':memory:')
+    app.init_database(conn)
+    code = add_patient(conn, 'kai', 'Kai')
+    assert app.get_patient_access_code('kai', conn) == code
+    assert add_patient(conn, 'ana', 'Ana') != code
+
+
+def test_cohort_metrics_come_from_connected_patients_rows():
+    conn = app.sqlite3.connect(':memory:')
+    app.init_database(conn)
+    for username, name in (('kai', 'Kai'), ('ana', 'Ana'), ('lee', 'Lee')):
+        app.connect_caregiver('carer', add_patient(conn, username, name), conn)
+    app.connect_caregiver('other', app.get_patient_access_code('lee', conn), conn)
+    app.disconnect_caregiver('carer', 'lee', conn)
+    end = app.datetime(2026, 10, 19)
+    rows = []
+    for offset in range(10):
+        day = (end - app.timedelta(days=offset)).strftime('%Y-%m-%d')
+        rows.append(('kai', day, 100.0))
+        # Ana's adherence falls by 5 points a day and she skipped logging two days ago
+        if offset != 2:
+            rows.append(('ana', day, 50.0 - 5 * (9 - offset)))
+    conn.executemany("INSERT INTO adherence_history (username, date, adherence, updated) VALUES (?, ?, ?, '')", rows)
+
+    cohort = app.load_cohort_adherence('carer', days=10, end_date='2026-10-19', conn=conn)
+    metrics = app.compute_cohort_metrics(cohort['matrix'])
+    assert cohort['usernames'] == ['ana', 'kai']
+    assert math.isnan(cohort['matrix'][0, 7])
+    ana, kai = 0, 1
+    assert metrics['overall'][kai] == 100.0
+    assert metrics['slope'][ana] == pytest.approx(-5.0)
+    assert metrics['at_risk'].tolist() == [True, False]
+    assert metrics['risk_order'][0] == ana
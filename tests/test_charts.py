@@ -0,0 +1,65 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+
+
+class FakeFigure:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def to_json(self):
+        return self.payload
+
+
+def test_figure_cache_reuses_figures_and_evicts_least_recently_used(monkeypatch):
+    cache = app.get_figure_cache.__wrapped__(max_entries=2, max_bytes=1000)
+    monkeypatch.setattr(app, 'get_figure_cache', lambda: cache)
+    builds = []
+
+    def build(name, size=100):
+        def build_figure():
+            builds.append(name)
+            return FakeFigure('x' * size)
+        return build_figure
+
+    first = app.cached_figure('line', 'a', build('a'))
+    assert app.cached_figure('line', 'a', build('a')) is first
+    app.cached_figure('line', 'b', build('b'))
+    app.cached_figure('line', 'a', build('a'))
+    # 'b' is now the least recently used, so it goes when 'c' comes in
+    app.cached_figure('line', 'c', build('c'))
+    assert list(cache['entries']) == [('line', 'a'), ('line', 'c')]
+    assert builds == ['a', 'b', 'c']
+
+    # One large figure pushes out older ones until the byte budget holds
+    app.cached_figure('pie', 'a', build('big', 950))
+    assert list(cache['entries']) == [('pie', 'a')]
+    assert cache['bytes'] == 950
+    assert app.get_figure_cache_stats() == {'entries': 1, 'bytes': 950, 'hits': 2, 'misses': 4, 'evictions': 3, 'hit_rate': 2 / 6}
+
+
+def test_lttb_keeps_the_ends_and_a_lone_spike():
+    x = np.arange(1000, dtype=float)
+    y = np.full(1000, 80.0)
+    y[437] = 5.0
+    selected = app.lttb_downsample(x, y, 50)
+    assert len(selected) == 50
+    assert selected[0] == 0 and selected[-1] == 999
+    assert np.all(np.diff(selected) > 0)
+    assert 437 in selected
+    assert app.lttb_downsample(x[:40], y[:40], 50).tolist() == list(range(40))
+
+
+def test_minmax_keeps_every_buckets_extremes():
+    y = np.random.default_rng(3).uniform(0, 100, 1000)
+    selected = app.minmax_downsample(y, 100)
+    assert len(selected) <= 100
+    assert np.all(np.diff(selected) > 0)
+    for bucket in np.array_split(np.arange(1000), 50):
+        assert bucket[np.argmin(y[bucket])] in selected
+        assert bucket[np.argmax(y[bucket])] in selected
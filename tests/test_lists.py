@@ -0,0 +1,38 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+
+
+class FakeSessionState(dict):
+    __getattr__ = dict.__getitem__
+    __setattr__ = dict.__setitem__
+
+
+def by_time(item):
+    return item['time']
+
+
+def test_sort_index_moves_only_changed_items(monkeypatch):
+    monkeypatch.setattr(app.st, 'session_state', FakeSessionState(sort_indices={}))
+    items = [{'id': i, 'time': f"{(i * 7) % 24:02d}:00"} for i in range(20)]
+
+    def expected():
+        return [item['id'] for item in sorted(items, key=lambda item: (by_time(item), item['id']))]
+
+    assert app.get_sort_index('medications', items, 'Time', by_time) == expected()
+    entries = app.st.session_state.sort_indices[('medications', 'Time')]['entries']
+
+    items[3]['time'] = '23:30'
+    del items[10]
+    items.append({'id': 99, 'time': '00:30'})
+    assert app.get_sort_index('medications', items, 'Time', by_time) == expected()
+    # A few changes are placed into the kept index rather than re-sorting into a new one
+    assert app.st.session_state.sort_indices[('medications', 'Time')]['entries'] is entries
+
+    for item in items:
+        item['time'] = '12:00' if item['id'] % 2 else '06:00'
+    assert app.get_sort_index('medications', items, 'Time', by_time) == expected()
+    assert [item['id'] for item in app.get_sorted_items('medications', items, 'Time', by_time, descending=True)] == expected()[::-1]
@@ -0,0 +1,68 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+
+
+class FakeSessionState(dict):
+    __getattr__ = dict.__getitem__
+    __setattr__ = dict.__setitem__
+
+
+class FakeClock:
+    def __init__(self):
+        self.seconds = 0.0
+
+    def __call__(self):
+        return self.seconds
+
+    def spend(self, ms):
+        self.seconds += ms / 1000
+
+
+def test_nested_calls_count_only_toward_their_own_category(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(app.time, 'perf_counter', clock)
+    monkeypatch.setattr(app.st, 'session_state', FakeSessionState(render_timings=app.deque(maxlen=50)))
+
+    @app.profiled('db')
+    def load_rows():
+        clock.spend(30)
+
+    @app.profiled('chart')
+    def build_chart():
+        clock.spend(5)
+        load_rows()
+        clock.spend(15)
+
+    @app.profiled('tab')
+    def draw_tab():
+        clock.spend(10)
+        build_chart()
+        load_rows()
+
+    app.start_rerun_profile()
+    draw_tab()
+    clock.spend(40)
+    record = app.finish_rerun_profile('Full')
+
+    assert record['ms'] == pytest.approx(130)
+    assert record['categories'] == pytest.approx({'db': 60, 'chart': 20, 'tab': 10})
+    assert record['functions']['draw_tab']['ms'] == pytest.approx(90)
+    assert record['functions']['load_rows']['calls'] == 2
+    assert list(app.st.session_state.render_timings) == [record]
+
+
+def test_calls_outside_a_rerun_are_not_timed(monkeypatch):
+    monkeypatch.setattr(app.threading.current_thread(), 'medtimer_profile', None, raising=False)
+
+    @app.profiled('db')
+    def load_rows():
+        return 'rows'
+
+    assert load_rows() == 'rows'
+    assert app.threading.current_thread().medtimer_profile is None
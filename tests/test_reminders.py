@@ -0,0 +1,66 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+
+
+def add_slot_user(conn, username, utc_offset, medication_id, slots):
+    conn.execute("INSERT INTO users (username, name, age, user_type) VALUES (?, ?, 30, 'patient')", (username, username))
+    conn.execute("INSERT INTO user_day_state (username, utc_offset_minutes, open_date) VALUES (?, ?, '2026-10-18')", (username, utc_offset))
+    conn.execute("INSERT INTO medications (id, username, name, dosage_amount, time) VALUES (?, ?, 'Aspirin', '100mg', ?)",
+                 (medication_id, username, slots[0]))
+    conn.executemany("INSERT INTO medication_slots (username, medication_id, slot_time, slot_minute) VALUES (?, ?, ?, ?)",
+                     [(username, medication_id, slot, app.time_to_minutes(slot)) for slot in slots])
+
+
+def test_due_doses_use_each_users_clock_and_skip_resolved_slots():
+    conn = app.sqlite3.connect(':memory:')
+    app.init_database(conn)
+    # At 23:50 UTC it is 23:50 for kai and 05:20 the next morning for ana
+    add_slot_user(conn, 'kai', 0, 1, ['23:55', '00:10', '12:00'])
+    add_slot_user(conn, 'ana', 330, 2, ['05:30', '05:40', '05:45', '06:30'])
+    conn.executemany("""INSERT INTO medication_history (username, medication_id, action, timestamp, date, slot_time)
+                        VALUES ('ana', 2, ?, '2026-10-19 05:00:00', '2026-10-19', ?)""",
+                     [('taken', '05:30'), ('skipped', '05:40')])
+    now = app.datetime(2026, 10, 18, 23, 50, tzinfo=app.timezone.utc)
+
+    due = app.get_due_doses(30, conn, now)
+    assert [(d['username'], d['time'], d['date'], d['minutes_until']) for d in due] == [
+        ('kai', '23:55', '2026-10-18', 5),
+        ('kai', '00:10', '2026-10-19', 20),
+        ('ana', '05:45', '2026-10-19', 25),
+    ]
+    assert [d['time'] for d in app.get_due_doses(30, conn, now, usernames=['ana'])] == ['05:45']
+    assert app.get_due_doses(30, conn, now, usernames=[]) == []
+
+
+def test_timer_wheel_fires_each_timer_once_on_its_tick():
+    wheel = app.create_timer_wheel(tick_seconds=60, num_buckets=8, now=0)
+    app.schedule_timer(wheel, 'soon', 120)
+    # 10 minutes is more than a lap of 8 buckets, so it shares a bucket with 'soon' until its own tick
+    app.schedule_timer(wheel, 'next_lap', 600)
+    app.schedule_timer(wheel, 'overdue', -300)
+    app.schedule_timer(wheel, 'cancelled', 180)
+    app.cancel_timer(wheel, 'cancelled')
+
+    assert app.advance_timer_wheel(wheel, now=59) == []
+    assert app.advance_timer_wheel(wheel, now=60) == ['overdue']
+    assert app.advance_timer_wheel(wheel, now=300) == ['soon']
+    assert app.advance_timer_wheel(wheel, now=540) == []
+    assert app.advance_timer_wheel(wheel, now=600) == ['next_lap']
+    assert wheel['locations'] == {}
+
+
+def test_rescheduling_a_timer_moves_it_and_long_gaps_catch_up():
+    wheel = app.create_timer_wheel(tick_seconds=60, num_buckets=8, now=0)
+    app.schedule_timer(wheel, 'dose', 120)
+    app.schedule_timer(wheel, 'dose', 240)
+    assert app.advance_timer_wheel(wheel, now=180) == []
+    assert app.advance_timer_wheel(wheel, now=240) == ['dose']
+
+    app.schedule_timer(wheel, 'late', 300)
+    app.schedule_timer(wheel, 'later', 900)
+    # A server asleep for more than a lap still fires everything that came due
+    assert sorted(app.advance_timer_wheel(wheel, now=3600)) == ['late', 'later']
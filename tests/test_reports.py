@@ -0,0 +1,73 @@
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+
+
+class FakeSessionState(dict):
+    __getattr__ = dict.__getitem__
+    __setattr__ = dict.__setitem__
+
+
+def make_report_data(adherence=90.0):
+    return {'start_date': '2026-10-01', 'end_date': '2026-10-18', 'profile': {'name': 'Kai'}, 'medications': [],
+            'appointments': [], 'side_effects': [], 'adherence_history': [{'date': '2026-10-18', 'adherence': adherence}]}
+
+
+def test_report_jobs_are_reused_until_the_data_changes_and_retried_after_a_failure(monkeypatch):
+    jobs = app.get_report_jobs.__wrapped__(max_workers=1, max_entries=2)
+    monkeypatch.setattr(app, 'get_report_jobs', lambda: jobs)
+    monkeypatch.setattr(app.st, 'session_state', FakeSessionState(history_version=0))
+    builds = []
+
+    def generate_pdf_report(report_data, report_type):
+        builds.append(report_type)
+        if builds.count(report_type) == 1 and report_type == 'Flaky Report':
+            raise RuntimeError('font missing')
+        return b'%PDF'
+    monkeypatch.setattr(app, 'generate_pdf_report', generate_pdf_report)
+
+    key, reused = app.submit_report_job(make_report_data(), 'Complete Health Report')
+    assert not reused
+    assert app.submit_report_job(make_report_data(), 'Complete Health Report') == (key, True)
+    assert jobs['jobs'][key]['future'].result() == b'%PDF'
+
+    # A dose logged since then changes the history version, so the report is built again
+    app.st.session_state.history_version = 1
+    changed_key, reused = app.submit_report_job(make_report_data(), 'Complete Health Report')
+    assert changed_key != key and not reused
+
+    flaky_key, _ = app.submit_report_job(make_report_data(), 'Flaky Report')
+    assert isinstance(jobs['jobs'][flaky_key]['future'].exception(), RuntimeError)
+    assert app.submit_report_job(make_report_data(), 'Flaky Report') == (flaky_key, False)
+    assert jobs['jobs'][flaky_key]['future'].result() == b'%PDF'
+    assert builds == ['Complete Health Report', 'Complete Health Report', 'Flaky Report', 'Flaky Report']
+    jobs['pool'].shutdown()
+
+
+def test_finished_reports_are_dropped_oldest_first_but_building_ones_are_kept(monkeypatch):
+    jobs = app.get_report_jobs.__wrapped__(max_workers=2, max_entries=2)
+    monkeypatch.setattr(app, 'get_report_jobs', lambda: jobs)
+    monkeypatch.setattr(app.st, 'session_state', FakeSessionState(history_version=0))
+    release = threading.Event()
+
+    def generate_pdf_report(report_data, report_type):
+        if report_type == 'Slow Report':
+            release.wait(5)
+        return b'%PDF'
+    monkeypatch.setattr(app, 'generate_pdf_report', generate_pdf_report)
+
+    slow_key, _ = app.submit_report_job(make_report_data(), 'Slow Report')
+    for adherence in (80.0, 70.0):
+        key, _ = app.submit_report_job(make_report_data(adherence), 'Complete Health Report')
+        jobs['jobs'][key]['future'].result()
+    assert slow_key in jobs['jobs'] and len(jobs['jobs']) == 3
+
+    release.set()
+    jobs['jobs'][slow_key]['future'].result()
+    app.submit_report_job(make_report_data(60.0), 'Complete Health Report')
+    assert slow_key not in jobs['jobs'] and len(jobs['jobs']) == 2
+    jobs['pool'].shutdown()
@@ -0,0 +1,97 @@
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+
+
+class FakeSessionState(dict):
+    __getattr__ = dict.__getitem__
+    __setattr__ = dict.__setitem__
+
+
+def offset_for_local_noon():
+    """UTC offset, in minutes, at which it is about noon for the user right now"""
+    now = app.datetime.now(app.timezone.utc)
+    return 720 - (now.hour * 60 + now.minute)
+
+
+def test_status_lists_follow_the_users_clock(monkeypatch):
+    medication = {'id': 1, 'name': 'Aspirin', 'dosageAmount': '100mg', 'time': '11:00',
+                  'reminder_times': ['11:00', '12:00', '13:00'], 'taken_time_slots': []}
+    monkeypatch.setattr(app.st, 'session_state', FakeSessionState(utc_offset_minutes=offset_for_local_noon(),
+                                                                  medications=[medication]))
+
+    missed, upcoming, taken = app.categorize_medications_by_status()
+    assert '11:00' in [dose['time'] for dose in missed]
+    assert [dose['time'] for dose in upcoming] == ['13:00']
+    assert app.check_due_medications([medication]) == [medication]
+
+
+def test_clock_counts_down_to_slots_still_ahead_for_the_user(monkeypatch):
+    medication = {'id': 1, 'name': 'Aspirin', 'dosageAmount': '100mg', 'time': '11:00',
+                  'reminder_times': ['11:00', '13:00'], 'taken_time_slots': []}
+    monkeypatch.setattr(app.st, 'session_state', FakeSessionState(utc_offset_minutes=offset_for_local_noon(),
+                                                                  medications=[medication]))
+
+    missed, upcoming, taken = app.categorize_medications_by_status()
+    schedule = app.get_clock_schedule(upcoming)
+    minutes_ahead = (schedule[0]['due'] / 1000 - app.time.time()) / 60
+    assert [dose['time'] for dose in schedule] == ['01:00 PM']
+    assert 58 <= minutes_ahead <= 61
+
+
+def test_skipped_slots_are_resolved_but_not_taken(monkeypatch):
+    offset = offset_for_local_noon()
+    medication = {'id': 1, 'name': 'Aspirin', 'dosageAmount': '100mg', 'time': '08:00', 'reminder_times': ['08:00', '10:00']}
+    monkeypatch.setattr(app.st, 'session_state', FakeSessionState(utc_offset_minutes=offset, medications=[medication]))
+    today = app.get_local_date(offset)
+    events = [{'medication_id': 1, 'slot_time': '08:00', 'action': 'taken', 'date': today},
+              {'medication_id': 1, 'slot_time': '10:00', 'action': 'skipped', 'date': today}]
+    app.st.session_state.dose_status = app.rebuild_dose_status(events, [medication])
+    app.refresh_medication_flags()
+
+    assert medication['taken_time_slots'] == ['08:00']
+    assert medication['skipped_time_slots'] == ['10:00']
+    assert not medication['taken_today']
+    assert app.get_dose_status(medication) == 'Skipped'
+    assert app.calculate_adherence([medication]) == 50
+    missed, upcoming, taken = app.categorize_medications_by_status()
+    assert (missed, upcoming, taken) == ([], [], [])
+
+    app.apply_dose_event(app.st.session_state.dose_status, {'medication_id': 1, 'slot_time': '10:00', 'action': 'untaken', 'date': today})
+    app.refresh_medication_flags()
+    assert app.get_dose_status(medication) == 'Pending'
+    assert [dose['time'] for dose in app.categorize_medications_by_status()[0]] == ['10:00']
+
+
+def test_conflicts_wrap_midnight_and_skip_same_medication_pairs():
+    medications = [{'name': 'A', 'time': '23:50'},
+                   {'name': 'B', 'time': '00:10', 'reminder_times': ['00:10', '12:00']},
+                   {'name': 'C', 'time': '12:20'},
+                   {'name': 'D', 'time': '18:00', 'reminder_times': ['18:00', '18:10']}]
+    conflicts = app.find_schedule_conflicts(medications)
+    assert sorted((c['first'], c['first_time'], c['second'], c['second_time'], c['gap_minutes']) for c in conflicts) == [
+        ('A', '23:50', 'B', '00:10', 20),
+        ('B', '12:00', 'C', '12:20', 20),
+    ]
+
+
+def test_conflicts_match_comparing_every_pair():
+    rng = random.Random(7)
+    medications = [{'name': f"M{index}", 'reminder_times': [f"{rng.randrange(24):02d}:{rng.randrange(60):02d}" for _ in range(3)]}
+                   for index in range(40)]
+    slots = [(index, slot) for index, med in enumerate(medications) for slot in app.get_medication_slots(med)]
+    expected = set()
+    for a, (first_index, first) in enumerate(slots):
+        for second_index, second in slots[a + 1:]:
+            gap = abs(app.time_to_minutes(first) - app.time_to_minutes(second))
+            if first_index != second_index and min(gap, 1440 - gap) < 30:
+                expected.add(frozenset([(first_index, first), (second_index, second)]))
+
+    found = [frozenset([(c['first_index'], c['first_time']), (c['second_index'], c['second_time'])])
+             for c in app.find_schedule_conflicts(medications)]
+    assert len(found) == len(set(found))
+    assert set(found) == expected